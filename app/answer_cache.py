@@ -0,0 +1,165 @@
+##Two-level (memory + disk) cache for Q&A answers
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+from app.storage import data_dir
+
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_DISK_BYTES = int(os.environ.get("ANSWER_CACHE_DISK_BYTES", str(100 * 1024 * 1024)))
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+def answer_key(doc_hash: str, question: str, model_version: str) -> str:
+    raw = f"{doc_hash}\x00{normalize_question(question)}\x00{model_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    In-process LRU in front of an on-disk store of JSON answers.
+
+    Both levels expire entries after `ttl` seconds. The memory level holds at
+    most `max_entries`; the disk level evicts its oldest files once it grows
+    past `max_disk_bytes`.
+    """
+
+    def __init__(self, disk_dir: Path | None, max_entries: int = ANSWER_CACHE_SIZE,
+                 ttl: float = ANSWER_CACHE_TTL, max_disk_bytes: int = ANSWER_CACHE_DISK_BYTES):
+        self.disk_dir = disk_dir
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = Lock()
+        self._disk_bytes: int | None = None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return value
+                del self._memory[key]
+
+        if self.disk_dir is not None:
+            path = self._path(key)
+            try:
+                stored = json.loads(path.read_text())
+                if stored["expires"] > now:
+                    self._remember(key, stored["expires"], stored["value"])
+                    with self._lock:
+                        self.hits_disk += 1
+                    return stored["value"]
+                self._remove(path)
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: dict) -> None:
+        expires = time.time() + self.ttl
+        self._remember(key, expires, value)
+        if self.disk_dir is None:
+            return
+        try:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({"expires": expires, "value": value}).encode("utf-8")
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            path.write_bytes(payload)
+            self._track_disk(len(payload) - replaced)
+        except Exception as e:
+            print(f"Could not write answer cache entry: {e}")
+
+    def _remember(self, key: str, expires: float, value: dict) -> None:
+        with self._lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_files(self) -> list[Path]:
+        return list(self.disk_dir.glob("*/*.json")) if self.disk_dir.exists() else []
+
+    def _remove(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+        return size
+
+    def _track_disk(self, added: int) -> None:
+        """Account for `added` bytes on disk (negative when an entry shrank), evicting if over budget."""
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self._disk_files())
+            else:
+                self._disk_bytes += added
+            over = self._disk_bytes > self.max_disk_bytes
+        if not over:
+            return
+        # Over budget: every entry shares one TTL, so the oldest files are also
+        # the first to expire; drop them until usage is back under 90% of budget
+        files = sorted(self._disk_files(), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            with self._lock:
+                if self._disk_bytes <= self.max_disk_bytes * 0.9:
+                    break
+            if self._remove(path):
+                with self._lock:
+                    self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "entries_memory": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            }
+
+
+_answer_cache = None
+
+def get_answer_cache():
+    global _answer_cache
+    if _answer_cache is None:
+        disk_dir = data_dir() / "cache" / "answers"
+        _answer_cache = AnswerCache(disk_dir)
+    return _answer_cache
@@ -0,0 +1,208 @@
+##Bulk clause analysis of archived contracts, resumable and parallel
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.parser import stream_pdf
+
+
+def collect_pdfs(target: str) -> list[Path]:
+    """PDFs under a directory (recursively) or matching a glob, in a stable order."""
+    path = Path(target)
+    if path.is_dir():
+        files = path.rglob("*")
+    else:
+        files = (Path(p) for p in glob.glob(target, recursive=True))
+    return sorted(p for p in files if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of the file bytes, the same doc_hash /analyze records."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class JsonlSink:
+    """One JSON record per line, flushed as each file finishes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        needs_newline = False
+        if path.exists() and path.stat().st_size:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._f = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            # The previous run died mid-line; start clean after the partial record
+            self._f.write("\n")
+
+    def done_hashes(self) -> set[str]:
+        done = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "done":
+                    done.add(record["doc_hash"])
+        return done
+
+    def write(self, record: dict) -> None:
+        self._f.write(json.dumps(record) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class SqliteSink:
+    """Records in a `results` table keyed by doc_hash, committed as each file finishes."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "doc_hash TEXT PRIMARY KEY, path TEXT, status TEXT, pages INTEGER, "
+            "seconds REAL, clauses TEXT, highlighted TEXT, error TEXT)"
+        )
+        self._db.commit()
+
+    def done_hashes(self) -> set[str]:
+        return {row[0] for row in self._db.execute("SELECT doc_hash FROM results WHERE status = 'done'")}
+
+    def write(self, record: dict) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (record["doc_hash"], record["path"], record["status"], record.get("pages", 0),
+             record.get("seconds", 0.0), json.dumps(record.get("clauses", [])),
+             record.get("highlighted"), record.get("error")),
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def open_sink(output: str):
+    path = Path(output)
+    if path.suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteSink(path)
+    return JsonlSink(path)
+
+
+def analyze_file(path: str, doc_hash: str, highlight_dir: str | None = None) -> dict:
+    """Analyze one PDF in a pool worker and return its output record."""
+    started = time.perf_counter()
+    record = {"path": path, "doc_hash": doc_hash}
+    highlighted = str(Path(highlight_dir) / f"{doc_hash}_highlighted.pdf") if highlight_dir else None
+    try:
+        # The parser reports progress per page; keep batch output to one line per file
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Page text is not kept; pages are released as soon as they are scanned
+            clauses, pages = stream_pdf(path, lambda text: None, highlight=highlighted is not None,
+                                        highlighted_path=highlighted)
+        record.update(status="done", pages=pages, clauses=clauses)
+        if highlighted and os.path.exists(highlighted):
+            record["highlighted"] = highlighted
+    except Exception as e:
+        record.update(status="error", pages=0, clauses=[], error=str(e))
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(target: str, output: str, workers: int | None = None,
+              highlight_dir: str | None = None) -> dict:
+    """
+    Analyze every PDF under `target`, streaming one record per file to `output`.
+
+    Files whose content hash already has a finished record in `output` are
+    skipped, so an interrupted run resumes where it stopped. Returns totals
+    including pages per second.
+    """
+    files = collect_pdfs(target)
+    sink = open_sink(output)
+    done = sink.done_hashes()
+    if highlight_dir:
+        Path(highlight_dir).mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    totals = {"files": len(files), "analyzed": 0, "skipped": 0, "errors": 0, "pages": 0}
+    started = time.perf_counter()
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path in files:
+                doc_hash = file_hash(path)
+                if doc_hash in done:
+                    totals["skipped"] += 1
+                    continue
+                done.add(doc_hash)
+                # Keep a bounded number of files in flight, however large the archive
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _record(sink, finished, totals, started)
+                pending.add(pool.submit(analyze_file, str(path), doc_hash, highlight_dir))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _record(sink, finished, totals, started)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 3)
+    totals["pages_per_second"] = round(totals["pages"] / elapsed, 2) if elapsed else 0.0
+    return totals
+
+
+def _record(sink, finished, totals: dict, started: float) -> None:
+    for future in finished:
+        record = future.result()
+        sink.write(record)
+        if record["status"] == "done":
+            totals["analyzed"] += 1
+            totals["pages"] += record["pages"]
+        else:
+            totals["errors"] += 1
+        elapsed = time.perf_counter() - started
+        rate = totals["pages"] / elapsed if elapsed else 0.0
+        count = totals["analyzed"] + totals["errors"] + totals["skipped"]
+        print(f"[{count}/{totals['files']}] {record['status']:5} {record['pages']:4} pages "
+              f"{record['seconds']:7.2f}s  {rate:7.1f} pages/s  {record['path']}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Analyze a directory of contracts into JSONL or SQLite")
+    ap.add_argument("target", help="directory to scan recursively, or a glob such as 'archive/**/*.pdf'")
+    ap.add_argument("-o", "--output", default="batch_results.jsonl",
+                    help="output file; .db/.sqlite writes SQLite, anything else JSONL (default: batch_results.jsonl)")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--highlight", metavar="DIR", default=None,
+                    help="also write highlighted PDFs into DIR (slower)")
+    args = ap.parse_args(argv)
+
+    try:
+        totals = run_batch(args.target, args.output, args.workers, args.highlight)
+    except KeyboardInterrupt:
+        print("Interrupted - finished files are saved; run the same command again to resume")
+        raise SystemExit(130)
+    print(f"{totals['analyzed']} analyzed, {totals['skipped']} skipped, {totals['errors']} errors, "
+          f"{totals['pages']} pages in {totals['seconds']:.1f}s ({totals['pages_per_second']} pages/s)")
+
+
+if __name__ == "__main__":
+    main()
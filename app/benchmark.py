@@ -0,0 +1,297 @@
+##Benchmark harness for the analysis pipeline over synthetic contracts
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from uuid import uuid4
+
+import fitz
+
+from app.synthetic import generate_contract
+
+STAGES = ["extract", "detect", "highlight_save", "context_builders", "analyze_end_to_end"]
+
+# Questions run through the Q&A context builders, one per context strategy
+BENCH_QUESTIONS = [
+    "What are the payment terms?",
+    "How can this agreement be terminated?",
+    "What is the liability of the contractor?",
+    "What confidential information is protected?",
+    "What is this contract about?",
+    "Which state's courts handle disputes?",
+]
+
+# Stages faster than this are too noisy to flag as regressions
+REGRESSION_FLOOR_SECONDS = 0.01
+
+
+def _quiet():
+    # The parser prints per page; keep that out of the timings and the report
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _extract(pdf_path: str):
+    doc = fitz.open(pdf_path)
+    page_data = [(i, None, page.get_text()) for i, page in enumerate(doc, start=1)]
+    doc.close()
+    return page_data
+
+
+def bench_extract(pdf_path: str, state: dict) -> None:
+    state["page_data"] = _extract(pdf_path)
+
+
+def bench_detect(pdf_path: str, state: dict) -> None:
+    from app.parser import _detect_legal_clauses_fallback
+    page_data = state.setdefault("page_data", _extract(pdf_path))
+    with _quiet():
+        state["clauses"] = _detect_legal_clauses_fallback("\n".join(t for _, _, t in page_data) + "\n", page_data)
+
+
+def bench_highlight_save(pdf_path: str, state: dict) -> None:
+    from app.parser import _highlight_clause_in_pdf
+    clauses = state.get("clauses")
+    if clauses is None:
+        bench_detect(pdf_path, state)
+        clauses = state["clauses"]
+    doc = fitz.open(pdf_path)
+    with _quiet():
+        for clause in clauses:
+            _highlight_clause_in_pdf(doc, clause["page"], clause["text"], clause["type"])
+    with tempfile.TemporaryDirectory() as tmp:
+        doc.save(os.path.join(tmp, "highlighted.pdf"))
+    doc.close()
+
+
+def bench_context_builders(pdf_path: str, state: dict) -> None:
+    from app.doc_index import DocumentIndex
+    from app.llm_generator import LLMGenerator
+    page_data = state.setdefault("page_data", _extract(pdf_path))
+    text = "\n".join(t for _, _, t in page_data)
+    # A fresh index each run, so index and BM25 construction are part of the timing
+    doc = DocumentIndex(text)
+    generator = LLMGenerator()
+    generator.topic_contexts(doc)
+    for question in BENCH_QUESTIONS:
+        generator._create_multiple_contexts(text, question, doc)
+
+
+def bench_analyze_end_to_end(pdf_path: str, state: dict, timeout: float = 600.0) -> None:
+    client = state["client"]
+    with open(pdf_path, "rb") as f:
+        response = client.post("/analyze", files={"pdf": (os.path.basename(pdf_path), f.read(), "application/pdf")})
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/result/{job_id}").json()["status"]
+        if status in ("done", "partial", "error"):
+            return
+        time.sleep(0.005)
+    raise TimeoutError(f"/analyze did not finish within {timeout}s")
+
+
+_BENCHES = {
+    "extract": bench_extract,
+    "detect": bench_detect,
+    "highlight_save": bench_highlight_save,
+    "context_builders": bench_context_builders,
+    "analyze_end_to_end": bench_analyze_end_to_end,
+}
+
+
+@contextlib.contextmanager
+def _scratch_data_dir():
+    """A temporary DATA_DIR for the app, restored on exit."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        previous = os.environ.get("DATA_DIR")
+        os.environ["DATA_DIR"] = data_dir
+        try:
+            yield data_dir
+        finally:
+            if previous is None:
+                os.environ.pop("DATA_DIR", None)
+            else:
+                os.environ["DATA_DIR"] = previous
+
+
+@contextlib.contextmanager
+def _api_client():
+    """The API with its worker running, storing jobs in a scratch DATA_DIR."""
+    with _scratch_data_dir():
+        from fastapi.testclient import TestClient
+        from app.main import app
+        with _quiet(), TestClient(app) as client:
+            yield client
+
+
+def run_benchmark(page_counts: list[int], stages: list[str] = STAGES, repeat: int = 3,
+                  corpus_dir: str | None = None) -> dict:
+    """
+    Time each stage on synthetic contracts of the given page counts.
+
+    Every stage runs `repeat` times per document, after one warm-up run, and
+    the median is reported in seconds. Generated PDFs are kept in `corpus_dir`
+    when given, so later runs time the same files.
+    """
+    unknown = set(stages) - set(_BENCHES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    results: dict[str, dict[str, float]] = {}
+    with contextlib.ExitStack() as stack:
+        corpus = Path(corpus_dir) if corpus_dir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        client = stack.enter_context(_api_client()) if "analyze_end_to_end" in stages else None
+
+        for pages in page_counts:
+            pdf_path = corpus / f"contract_{pages}p.pdf"
+            if not pdf_path.exists():
+                generate_contract(pdf_path, pages)
+            timings = {}
+            for stage in stages:
+                runs = []
+                # One untimed run first, so imports and first-use loads are not measured
+                for run in range(repeat + 1):
+                    state = {"client": client}
+                    if stage in ("highlight_save", "context_builders"):
+                        # Inputs come from earlier stages and are not part of this one's time
+                        bench_detect(str(pdf_path), state)
+                    started = time.perf_counter()
+                    _BENCHES[stage](str(pdf_path), state)
+                    if run:
+                        runs.append(time.perf_counter() - started)
+                timings[stage] = round(statistics.median(runs), 6)
+            results[str(pages)] = timings
+            print(f"{pages:5} pages  " + "  ".join(f"{s}={t:.4f}s" for s, t in timings.items()), file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def bench_result_serving(pages: int = 40, number: int = 2000) -> dict[str, dict[str, float]]:
+    """
+    Microseconds to serve one GET /result payload, the old way and the current one.
+
+    "reparse" is what the endpoint used to do: json.loads of the stored text,
+    then FastAPI's jsonable_encoder and json.dumps. "current" calls get_result
+    as the route does. Both run on a polled result (no clauses yet) and on a
+    finished one with the clauses of a synthetic contract.
+    """
+    from fastapi.encoders import jsonable_encoder
+    with _scratch_data_dir() as data_dir:
+        from app import main
+        from app.parser import stream_pdf
+        from app.text_store import TextStoreWriter, text_store_path
+        polled, done = str(uuid4()), str(uuid4())
+        pdf_path = generate_contract(Path(data_dir) / "contract.pdf", pages)
+        with _quiet(), TextStoreWriter(text_store_path(done)) as writer:
+            clauses, _ = stream_pdf(str(pdf_path), writer.add_page, highlight=False)
+        main._write_result(main.Result(job_id=polled, status="processing", doc_hash="0" * 64))
+        main._write_result(main.Result(job_id=done, status="done", clauses=clauses, doc_hash="0" * 64))
+
+        timings = {}
+        for label, job_id in (("polled", polled), ("done", done)):
+            # The same payload in the old stored form, clause text inline
+            old_path = Path(data_dir) / f"{job_id}.old.json"
+            old_path.write_text(json.dumps(main._read_result(job_id)))
+
+            def reparse():
+                data = json.loads(old_path.read_text())
+                return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+            def current():
+                return main.get_result(job_id, None, 0, None).body
+
+            timings[label] = {name: round(timeit.timeit(fn, number=number) / number * 1e6, 2)
+                              for name, fn in (("reparse", reparse), ("current", current))}
+        return timings
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25,
+            floor: float = REGRESSION_FLOOR_SECONDS) -> list[dict]:
+    """
+    Stages slower than the baseline by more than `tolerance` (a fraction).
+
+    Only page counts and stages present in both runs are compared, and
+    differences under `floor` seconds are ignored as noise.
+    """
+    regressions = []
+    for pages, timings in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(pages, {})
+        for stage, seconds in timings.items():
+            before = base.get(stage)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > floor:
+                regressions.append({
+                    "pages": int(pages),
+                    "stage": stage,
+                    "baseline": before,
+                    "current": seconds,
+                    "change": round(seconds / before - 1, 3) if before else None,
+                })
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the CLAWS analysis pipeline on synthetic contracts")
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100],
+                    help="page counts to benchmark (default: 1 10 100)")
+    ap.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="stages to time (default: all)")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per stage; the median is kept (default: 3)")
+    ap.add_argument("--corpus", default=None, help="directory to keep generated PDFs in between runs")
+    ap.add_argument("-o", "--output", default="benchmark.json", help="where to write results (default: benchmark.json)")
+    ap.add_argument("--baseline", default=None, help="baseline results to compare against")
+    ap.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="slowdown fraction that counts as a regression (default: 0.25)")
+    ap.add_argument("--serving", action="store_true",
+                    help="only compare /result serving, old reparse path against the current one")
+    args = ap.parse_args(argv)
+
+    if args.serving:
+        for label, timings in bench_result_serving().items():
+            print(f"{label:7} result  reparse={timings['reparse']:.1f}us  current={timings['current']:.1f}us  "
+                  f"({timings['reparse'] / timings['current']:.1f}x)")
+        return
+
+    # Model confirmation runs after /result reports done and would only add noise
+    os.environ.setdefault("CLAUSE_CONFIRM_BUDGET_SECONDS", "0")
+    report = run_benchmark(args.pages, args.stages, args.repeat, args.corpus)
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}")
+
+    if not args.baseline:
+        return
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline {baseline_path}")
+        return
+    regressions = compare(report, json.loads(baseline_path.read_text()), args.tolerance)
+    for r in regressions:
+        change = f" (+{r['change']:.0%})" if r["change"] is not None else ""
+        print(f"REGRESSION {r['stage']} at {r['pages']} pages: {r['baseline']:.4f}s -> {r['current']:.4f}s{change}")
+    if regressions:
+        raise SystemExit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
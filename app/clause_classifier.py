@@ -0,0 +1,105 @@
+##Second detection tier: the CUAD Q&A model confirms regex clause candidates
+import os
+import re
+import time
+
+from app.knowledge_base import CLAUSE_CONFIRM_DETAILS, LEGAL_KNOWLEDGE_BASE
+from app.parser import LEGAL_PATTERNS
+
+# Seconds of model calls each job may spend on confirmation; 0 keeps regex results only
+CLAUSE_CONFIRM_BUDGET_SECONDS = float(os.environ.get("CLAUSE_CONFIRM_BUDGET_SECONDS", "30"))
+# Candidates per model call; small batches let /explain requests run in between
+CLAUSE_CONFIRM_BATCH = int(os.environ.get("CLAUSE_CONFIRM_BATCH", "4"))
+# Lowest model score that still confirms a candidate
+CLAUSE_CONFIRM_MIN_SCORE = float(os.environ.get("CLAUSE_CONFIRM_MIN_SCORE", "0.01"))
+# Page text on each side of the regex hit handed to the model, in characters
+CLAUSE_CONTEXT_CHARS = 600
+
+
+def clause_question(clause_type: str) -> str:
+    """The question the CUAD model was trained on for a clause category."""
+    details = CLAUSE_CONFIRM_DETAILS.get(clause_type, f"Which parts of the contract are about {clause_type}?")
+    return (f'Highlight the parts (if any) of this contract related to "{clause_type}" '
+            f'that should be reviewed by a lawyer. Details: {details}')
+
+
+def candidate_context(clause: dict, page_text: str) -> str:
+    """Page text around the regex hit behind a candidate, sized for one model pass."""
+    for pattern in LEGAL_PATTERNS.get(clause['type'], []):
+        match = re.search(pattern, page_text)
+        if match:
+            start = max(0, match.start() - CLAUSE_CONTEXT_CHARS)
+            return page_text[start:match.end() + CLAUSE_CONTEXT_CHARS]
+    return clause['text']
+
+
+def _answer_span(clause: dict, answer: str, page_text: str) -> dict:
+    """Page offsets of a model answer, so stored results can rebuild its text."""
+    start = page_text.find(answer, max(0, page_text.find(candidate_context(clause, page_text))))
+    if start < 0:
+        return {}
+    return {"start": start, "end": start + len(answer)}
+
+
+def confirm_clauses(candidates: list[dict], page_text, run_batch,
+                    budget_seconds: float = CLAUSE_CONFIRM_BUDGET_SECONDS,
+                    batch_size: int = CLAUSE_CONFIRM_BATCH) -> tuple[list[dict], dict]:
+    """
+    Confirm or drop regex candidates with the Q&A model, within a compute budget.
+
+    `page_text(page)` returns a page's text and `run_batch(questions, contexts)`
+    returns (answer, score) pairs, or None when no model is available. Types
+    with a risk entry in LEGAL_KNOWLEDGE_BASE are checked first, so they are
+    covered when the budget runs out. Confirmed candidates take the model's
+    span and score, rejected ones are dropped and unchecked ones keep their
+    regex result. A confirmed span found in the page also takes its offsets.
+
+    Returns the clauses in their original order and a detection summary.
+    """
+    order = sorted(range(len(candidates)), key=lambda i: candidates[i]['type'] not in LEGAL_KNOWLEDGE_BASE)
+    verdicts: dict[int, tuple[str, float]] = {}
+    spent = 0.0
+    status = "confirmed"
+
+    for first in range(0, len(order), batch_size):
+        if spent >= budget_seconds:
+            status = "partial"
+            break
+        batch = order[first:first + batch_size]
+        questions = [clause_question(candidates[i]['type']) for i in batch]
+        contexts = [candidate_context(candidates[i], page_text(candidates[i]['page'])) for i in batch]
+        started = time.monotonic()
+        results = run_batch(questions, contexts)
+        spent += time.monotonic() - started
+        if results is None:
+            status = "unavailable"
+            break
+        for i, (answer, score) in zip(batch, results):
+            verdicts[i] = (answer.strip(), score)
+
+    clauses = []
+    confirmed = rejected = 0
+    for i, clause in enumerate(candidates):
+        if i not in verdicts:
+            clauses.append(clause)
+            continue
+        answer, score = verdicts[i]
+        if answer and score >= CLAUSE_CONFIRM_MIN_SCORE:
+            confirmed += 1
+            if len(answer) > 20:
+                span = _answer_span(clause, answer, page_text(clause['page']))
+                # Without offsets the stored result can only rebuild the regex text
+                text = re.sub(r'\s+', ' ', answer) if span else clause['text']
+            else:
+                span, text = {}, clause['text']
+            clauses.append({**clause, **span, "text": text, "score": round(float(score), 4)})
+        else:
+            rejected += 1
+
+    return clauses, {
+        "status": status,
+        "confirmed": confirmed,
+        "rejected": rejected,
+        "unchecked": len(candidates) - len(verdicts),
+        "model_seconds": round(spent, 3),
+    }
@@ -0,0 +1,59 @@
+##Columnar result storage for clauses: offsets into the job's page text instead of copies of it
+from app.parser import clause_text
+
+# Attributes a materialized clause can carry; text is the only one read from the page
+CLAUSE_FIELDS = ("type", "page", "start", "end", "score", "text")
+_COLUMNS = ("type", "page", "start", "end", "score")
+
+
+def pack_clauses(clauses: list[dict]) -> dict:
+    """
+    Clauses as parallel arrays, with types stored as ids into a `types` table.
+
+    Text and bbox are not stored; text is rebuilt from the page span
+    [start, end) by unpack_clauses.
+    """
+    types: list[str] = []
+    type_ids: dict[str, int] = {}
+    columns = {"types": types, **{name: [] for name in _COLUMNS}}
+    for clause in clauses:
+        if clause["type"] not in type_ids:
+            type_ids[clause["type"]] = len(types)
+            types.append(clause["type"])
+        columns["type"].append(type_ids[clause["type"]])
+        columns["page"].append(clause["page"])
+        columns["start"].append(clause.get("start", 0))
+        columns["end"].append(clause.get("end", 0))
+        columns["score"].append(clause["score"])
+    return columns
+
+
+def clause_count(columns) -> int:
+    return len(columns) if isinstance(columns, list) else len(columns.get("type", []))
+
+
+def unpack_clauses(columns, page_text=None, fields=CLAUSE_FIELDS, offset: int = 0,
+                   limit: int | None = None) -> list[dict]:
+    """
+    Clause dicts for clauses [offset, offset + limit) with only `fields` set.
+
+    `page_text(page)` supplies page text and is called only when "text" is
+    requested. Results written before this format hold plain clause dicts,
+    which are sliced and filtered the same way.
+    """
+    stop = None if limit is None else offset + limit
+    if isinstance(columns, list):
+        return [{k: clause[k] for k in fields if k in clause} for clause in columns[offset:stop]]
+
+    types = columns.get("types", [])
+    wanted = [name for name in _COLUMNS if name in fields]
+    clauses = []
+    for i in range(clause_count(columns))[offset:stop]:
+        clause = {name: columns[name][i] for name in wanted}
+        if "type" in clause:
+            clause["type"] = types[clause["type"]]
+        if "text" in fields:
+            page = page_text(columns["page"][i]) if page_text else ""
+            clause["text"] = clause_text(page, columns["start"][i], columns["end"][i])
+        clauses.append(clause)
+    return clauses
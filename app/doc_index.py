@@ -0,0 +1,125 @@
+##Per-document sentence index shared by the Q&A context builders
+import os
+import re
+from collections import OrderedDict
+from threading import Lock
+
+from app.keyword_matcher import get_keyword_matcher
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+
+DOC_INDEX_CACHE_SIZE = int(os.environ.get("DOC_INDEX_CACHE_SIZE", "32"))
+
+
+class DocumentIndex:
+    """
+    Sentences of a document split once, with lowercased forms, token sets and offsets.
+
+    Sentences are split on the same `[.!?]+` boundaries the context builders
+    always used, so every builder can query this index instead of re-splitting
+    and re-lowercasing the full text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.sentences: list[str] = []
+        self.lowered: list[str] = []
+        self.tokens: list[set[str]] = []
+        self.offsets: list[int] = []
+        # Sentences longer than 20 characters, the cut-off most builders use
+        self.long_ids: list[int] = []
+        # BM25 sentence and chunk indexes, built lazily by app.retrieval
+        self.bm25 = None
+        self.chunks = None
+        # Pre-tokenized model windows loaded by app.token_windows (False when none stored)
+        self.token_windows = None
+        # Question-independent topic contexts, precomputed at analysis time when available
+        self.topic_contexts: dict[str, str] | None = None
+        self._category_hits: list[dict[str, int]] | None = None
+
+        pos = 0
+        for match in _SENTENCE_SPLIT.finditer(text):
+            self._add(text, pos, match.start())
+            pos = match.end()
+        self._add(text, pos, len(text))
+
+    def _add(self, text: str, start: int, end: int) -> None:
+        raw = text[start:end]
+        sentence = raw.strip()
+        if not sentence:
+            return
+        lowered = sentence.lower()
+        idx = len(self.sentences)
+        self.sentences.append(sentence)
+        self.lowered.append(lowered)
+        self.tokens.append(set(lowered.split()))
+        self.offsets.append(start + (len(raw) - len(raw.lstrip())))
+        if len(sentence) > 20:
+            self.long_ids.append(idx)
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def matching(self, keywords, ids=None, limit: int | None = None) -> list[int]:
+        """Ids of sentences (optionally restricted to `ids`) containing any keyword, in order."""
+        if ids is None:
+            ids = range(len(self.sentences))
+        found = []
+        for i in ids:
+            lowered = self.lowered[i]
+            if any(keyword in lowered for keyword in keywords):
+                found.append(i)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def category_hits(self) -> list[dict[str, int]]:
+        """Keyword hit counts per category for every sentence, from one matcher scan each."""
+        if self._category_hits is None:
+            matcher = get_keyword_matcher()
+            self._category_hits = [matcher.scan(lowered) for lowered in self.lowered]
+        return self._category_hits
+
+    def with_category(self, category: str, ids=None, limit: int | None = None) -> list[int]:
+        """Ids of sentences (optionally restricted to `ids`) with hits for a matcher category."""
+        hits = self.category_hits()
+        if ids is None:
+            ids = range(len(self.sentences))
+        found = []
+        for i in ids:
+            if category in hits[i]:
+                found.append(i)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def join(self, ids) -> str:
+        return " ".join(self.sentences[i] for i in ids)
+
+
+_index_cache: "OrderedDict[tuple[str | None, str], DocumentIndex]" = OrderedDict()
+_index_lock = Lock()
+
+
+def get_document_index(text: str, job_id: str | None = None) -> DocumentIndex:
+    """Return the cached index for this job's text, building it on first use."""
+    key = (job_id, text)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = DocumentIndex(text)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > DOC_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def drop_document_index(job_id: str) -> None:
+    """Forget every cached index belonging to a job."""
+    with _index_lock:
+        for key in [k for k in _index_cache if k[0] == job_id]:
+            del _index_cache[key]
@@ -0,0 +1,31 @@
+##JSON encoding for result files and responses: orjson when installed, the stdlib otherwise
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib writes the same JSON, only slower
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON; both encoders write the same separators and escapes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with dumps, skipping FastAPI's jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,213 @@
+##Dedicated, bounded executor for model inference and async explain jobs
+import json
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Lock, Semaphore
+from uuid import uuid4
+
+from app.storage import data_dir
+
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "16"))
+EXPLAIN_DEADLINE_SECONDS = float(os.environ.get("EXPLAIN_DEADLINE_SECONDS", "20"))
+# Finished async explain jobs are kept this long for polling
+EXPLAIN_JOB_RETENTION_SECONDS = float(os.environ.get("EXPLAIN_JOB_RETENTION_SECONDS", "600"))
+
+# Explain ids become file names under DATA_DIR/explain
+_SAFE_ID = re.compile(r"[\w-]+")
+
+
+class InferenceBusy(Exception):
+    """Raised when the inference queue is full."""
+
+
+class InferenceExecutor:
+    """
+    Thread pool reserved for model inference, separate from FastAPI's threadpool.
+
+    At most `queue_size` calls may be queued or running; beyond that `submit`
+    raises InferenceBusy so callers can fall back instead of piling up work.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, queue_size: int = INFERENCE_QUEUE_SIZE):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._slots = Semaphore(queue_size)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise InferenceBusy()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+class ExplainJob:
+    """
+    An /explain request running in the background, polled by id.
+
+    With a `state_dir` the job's state is also kept in files, so API workers
+    other than the one running it can poll and cancel it: `<id>.json` while it
+    is queued or running, then `<id>.done.json`. The done file is created
+    exclusively, so the first worker to finish or cancel the job decides its
+    outcome, and the worker running it stops at its next check.
+    """
+
+    def __init__(self, request, deadline_seconds: float, state_dir: Path | None = None):
+        self.id = str(uuid4())
+        self.request = request
+        self.created = time.time()
+        self.deadline = time.monotonic() + deadline_seconds
+        self.state_dir = state_dir
+        self.stop = Event()
+        self.future: Future | None = None
+        self.status = "queued"
+        self.response: dict | None = None
+        self.finished: float | None = None
+
+    @classmethod
+    def load(cls, state_dir: Path, explain_id: str) -> "ExplainJob | None":
+        """A job started by another API worker, from its state files; its request is a dict."""
+        try:
+            state = json.loads((state_dir / f"{explain_id}.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        job = cls(state["request"], state["deadline_at"] - time.time(), state_dir)
+        job.id = explain_id
+        job.created = state["created"]
+        job.status = state["status"]
+        return job.refresh()
+
+    def _path(self, suffix: str) -> Path:
+        return self.state_dir / f"{self.id}{suffix}"
+
+    def _request_dict(self) -> dict:
+        return self.request if isinstance(self.request, dict) else self.request.model_dump()
+
+    def save(self) -> None:
+        if self.state_dir is None:
+            return
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = {"explain_id": self.id, "status": self.status, "request": self._request_dict(),
+                 "created": self.created, "deadline_at": time.time() + self.deadline - time.monotonic()}
+        tmp = self._path(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._path(".json"))
+
+    def start(self) -> None:
+        self.status = "running"
+        self.save()
+
+    def refresh(self) -> "ExplainJob":
+        """Pick up an outcome recorded by another API worker."""
+        if self.finished is None and self.state_dir is not None:
+            try:
+                done = json.loads(self._path(".done.json").read_text())
+            except (FileNotFoundError, ValueError):
+                return self
+            self.status, self.response, self.finished = done["status"], done["response"], done["finished"]
+        return self
+
+    def should_stop(self) -> bool:
+        """Cooperative check used by inference between model passes."""
+        return (self.stop.is_set() or time.monotonic() > self.deadline
+                or (self.state_dir is not None and self._path(".done.json").exists()))
+
+    def finish(self, status: str, response: dict | None) -> None:
+        if self.finished is not None:
+            return
+        finished = time.time()
+        if self.state_dir is not None:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(f".{os.getpid()}.done.tmp")
+            tmp.write_text(json.dumps({"status": status, "response": response, "finished": finished}))
+            try:
+                # link() fails if the done file exists: another worker finished the job first
+                os.link(tmp, self._path(".done.json"))
+            except FileExistsError:
+                self.refresh()
+                return
+            finally:
+                tmp.unlink(missing_ok=True)
+        self.status = status
+        self.response = response
+        self.finished = finished
+
+    def to_dict(self) -> dict:
+        return {"explain_id": self.id, "status": self.status, "response": self.response}
+
+
+class ExplainJobs:
+    """
+    Registry of async explain jobs, pruned as finished jobs age out.
+
+    Jobs started here are kept in memory; their state files under
+    DATA_DIR/explain let every API worker of a deployment find them.
+    """
+
+    def __init__(self, retention: float = EXPLAIN_JOB_RETENTION_SECONDS, state_dir: Path | None = None):
+        self.retention = retention
+        self._state_dir = state_dir
+        self._jobs: dict[str, ExplainJob] = {}
+        self._lock = Lock()
+        self._files_pruned = 0.0
+
+    @property
+    def state_dir(self) -> Path:
+        return self._state_dir if self._state_dir is not None else data_dir() / "explain"
+
+    def new(self, request, deadline_seconds: float) -> ExplainJob:
+        return ExplainJob(request, deadline_seconds, self.state_dir)
+
+    def add(self, job: ExplainJob) -> None:
+        job.save()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+
+    def get(self, explain_id: str) -> ExplainJob | None:
+        with self._lock:
+            job = self._jobs.get(explain_id)
+        if job is not None:
+            return job.refresh()
+        if not _SAFE_ID.fullmatch(explain_id):
+            return None
+        return ExplainJob.load(self.state_dir, explain_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        for explain_id in [k for k, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[explain_id]
+        # State files of every worker's jobs, checked at most once a minute
+        if time.time() - self._files_pruned < 60 or not self.state_dir.is_dir():
+            return
+        self._files_pruned = time.time()
+        with os.scandir(self.state_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+_inference_executor = None
+_explain_jobs = None
+
+def get_inference_executor():
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = InferenceExecutor()
+    return _inference_executor
+
+def get_explain_jobs():
+    global _explain_jobs
+    if _explain_jobs is None:
+        _explain_jobs = ExplainJobs()
+    return _explain_jobs
@@ -0,0 +1,157 @@
+##Single process that owns the Q&A model and serves API workers over a Unix socket
+import argparse
+import os
+from multiprocessing.connection import Client, Listener
+from threading import Semaphore, Thread
+
+from app.inference import INFERENCE_WORKERS
+from app.llm_generator import LLMGenerator
+
+# Set in every API worker to use the shared inference process instead of a local model
+QA_INFERENCE_SOCKET = os.environ.get("QA_INFERENCE_SOCKET", "")
+# Optional shared secret; the socket itself is created readable by its owner only
+QA_INFERENCE_AUTHKEY = os.environ.get("QA_INFERENCE_AUTHKEY", "")
+
+_METHODS = ("generate_explanation", "generate_explanations", "answer_pairs")
+
+
+def _authkey() -> bytes | None:
+    return QA_INFERENCE_AUTHKEY.encode("utf-8") or None
+
+
+class RemoteLLMGenerator(LLMGenerator):
+    """
+    LLMGenerator whose model calls run in the inference server.
+
+    The tokenizer and the document-only helpers (topic contexts, pre-tokenizing)
+    still run locally; they need no model weights. Each call uses its own
+    connection, and hanging up is how a caller cancels: the server checks the
+    connection between model passes, like any other `should_stop`.
+    """
+
+    def __init__(self, socket_path: str):
+        super().__init__()
+        self.socket_path = socket_path
+
+    def load_model(self):
+        # Weights live in the inference server only
+        return False
+
+    def model_loaded(self):
+        # The server loaded its model at startup; without one answer_pairs returns None
+        return True
+
+    def _call(self, method, *args, should_stop=None, **kwargs):
+        with Client(self.socket_path, family="AF_UNIX", authkey=_authkey()) as conn:
+            conn.send((method, args, kwargs))
+            while not conn.poll(0.05):
+                if should_stop and should_stop():
+                    return None
+            status, value = conn.recv()
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    def generate_explanation(self, clause_text, question, job_id=None, should_stop=None, trace=None,
+                             topic_contexts=None):
+        try:
+            result = self._call("generate_explanation", clause_text, question, job_id,
+                                topic_contexts=topic_contexts, should_stop=should_stop)
+        except Exception as e:
+            print(f"Inference server error: {e}")
+            return "No explanation available"
+        if result is None:
+            return "No explanation available"
+        answer, ran = result
+        if trace is not None:
+            trace.extend(ran)
+        return answer
+
+    def generate_explanations(self, clause_text, questions, job_id=None, should_stop=None, traces=None,
+                              topic_contexts=None):
+        try:
+            result = self._call("generate_explanations", clause_text, questions, job_id,
+                                topic_contexts=topic_contexts, should_stop=should_stop)
+        except Exception as e:
+            print(f"Inference server error: {e}")
+            return ["No explanation available"] * len(questions)
+        if result is None:
+            return ["No explanation available"] * len(questions)
+        answers, ran = result
+        if traces is not None:
+            traces.extend(ran)
+        return answers
+
+    def answer_pairs(self, questions, contexts):
+        try:
+            return self._call("answer_pairs", questions, contexts)
+        except Exception as e:
+            print(f"Inference server error: {e}")
+            return None
+
+
+def _handle(generator, conn, slots: Semaphore) -> None:
+    with conn:
+        try:
+            method, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        if method not in _METHODS:
+            conn.send(("error", f"Unknown method: {method}"))
+            return
+        with slots:
+            # The client only sends one message, so anything readable means it hung up
+            if conn.poll():
+                return
+            ran = []
+            try:
+                if method == "generate_explanation":
+                    value = (generator.generate_explanation(*args, trace=ran, should_stop=conn.poll, **kwargs), ran)
+                elif method == "generate_explanations":
+                    value = (generator.generate_explanations(*args, traces=ran, should_stop=conn.poll, **kwargs), ran)
+                else:
+                    value = generator.answer_pairs(*args, **kwargs)
+                reply = ("ok", value)
+            except Exception as e:
+                reply = ("error", str(e))
+        try:
+            conn.send(reply)
+        except OSError:
+            pass
+
+
+def serve(socket_path: str, generator=None, workers: int = INFERENCE_WORKERS, ready=None) -> None:
+    """Load the model once and answer API workers until the process exits."""
+    if generator is None:
+        generator = LLMGenerator()
+        if not generator.load_model():
+            print("Inference server running without a model - answers will fall back to rules")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    slots = Semaphore(workers)
+    with Listener(socket_path, family="AF_UNIX", authkey=_authkey()) as listener:
+        os.chmod(socket_path, 0o600)
+        print(f"Inference server listening on {socket_path}")
+        if ready is not None:
+            ready.set()
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"Rejected inference connection: {e}")
+                continue
+            Thread(target=_handle, args=(generator, conn, slots), daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Q&A model to API workers over a Unix socket.")
+    parser.add_argument("--socket", default=QA_INFERENCE_SOCKET or "/tmp/claws-inference.sock",
+                        help="Unix socket path; set QA_INFERENCE_SOCKET to the same path for the API")
+    parser.add_argument("--workers", type=int, default=INFERENCE_WORKERS,
+                        help="Model calls run concurrently")
+    args = parser.parse_args(argv)
+    serve(args.socket, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+##Background cleanup of per-job files under DATA_DIR, by age and a total-bytes budget
+import os
+import time
+from pathlib import Path
+from threading import Lock
+
+from app.fast_json import loads
+from app.storage import JOB_KINDS, data_dir, iter_job_files, job_file, job_id_of
+
+# Jobs not accessed for this long are deleted; 0 (the default) keeps them
+DATA_TTL_SECONDS = float(os.environ.get("DATA_TTL_SECONDS", "0"))
+# Total size of job files before least-recently-accessed jobs are evicted; 0 disables
+DATA_MAX_BYTES = int(os.environ.get("DATA_MAX_BYTES", "0"))
+JANITOR_INTERVAL_SECONDS = float(os.environ.get("JANITOR_INTERVAL_SECONDS", "300"))
+# Access times are recorded at most this often per job, so polling does not write on every request
+ACCESS_RESOLUTION_SECONDS = 60.0
+
+# Kinds of job files the janitor deletes; pins are what protects a job
+SWEPT_KINDS = tuple(kind for kind in JOB_KINDS if kind != "pins")
+
+
+class Janitor:
+    """
+    Deletes every file of a job at once, when the job expires or space runs out.
+
+    A job's last access is the newest mtime among its files; touch() bumps it
+    when the API serves the job. Jobs past `ttl` are removed first, then, while
+    the job files total more than `max_bytes`, the least recently accessed
+    ones until usage is back under 90% of the budget. Pinned jobs, jobs whose
+    stored result is queued or processing (in whichever API worker runs them)
+    and the active jobs passed to sweep() are never removed.
+    """
+
+    def __init__(self, data_dir: Path, ttl: float = DATA_TTL_SECONDS, max_bytes: int = DATA_MAX_BYTES):
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._touched: dict[str, float] = {}
+        self.bytes_used: int | None = None
+        self.jobs = 0
+        self.bytes_reclaimed = 0
+        self.jobs_evicted = 0
+        self.last_sweep: float | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 or self.max_bytes > 0
+
+    def _pin_path(self, job_id: str) -> Path:
+        return job_file("pins", job_id, job_id, self.data_dir)
+
+    def pin(self, job_id: str) -> None:
+        path = self._pin_path(job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+    def unpin(self, job_id: str) -> None:
+        self._pin_path(job_id).unlink(missing_ok=True)
+
+    def is_pinned(self, job_id: str) -> bool:
+        return self._pin_path(job_id).exists()
+
+    def touch(self, job_id: str, path: Path) -> None:
+        """Record an access to a job by bumping the mtime of one of its files."""
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(job_id, 0.0) < ACCESS_RESOLUTION_SECONDS:
+                return
+            self._touched[job_id] = now
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _scan(self) -> dict[str, list[tuple[Path, int, float]]]:
+        jobs: dict[str, list[tuple[Path, int, float]]] = {}
+        for kind in SWEPT_KINDS:
+            for entry in iter_job_files(kind, self.data_dir):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                jobs.setdefault(job_id_of(entry.name), []).append((Path(entry.path), st.st_size, st.st_mtime))
+        return jobs
+
+    def _in_progress(self, job_id: str, files: list[tuple[Path, int, float]]) -> bool:
+        """Whether the job's stored result says it is still queued or running."""
+        for path, _, _ in files:
+            if path.name == f"{job_id}.json":
+                try:
+                    data = loads(path.read_bytes())
+                except (OSError, ValueError):
+                    return False
+                return isinstance(data, dict) and data.get("status") in ("queued", "processing")
+        return False
+
+    def _evict(self, job_id: str, files: list[tuple[Path, int, float]]) -> int:
+        freed = 0
+        for path, size, _ in files:
+            try:
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._touched.pop(job_id, None)
+        return freed
+
+    def sweep(self, active=frozenset(), now: float | None = None) -> list[str]:
+        """One cleanup pass, leaving the `active` job ids alone; returns the evicted job ids."""
+        now = time.time() if now is None else now
+        jobs = self._scan()
+        sizes = {job_id: sum(size for _, size, _ in files) for job_id, files in jobs.items()}
+        last_access = {job_id: max(mtime for _, _, mtime in files) for job_id, files in jobs.items()}
+        used = sum(sizes.values())
+
+        candidates = sorted((job_id for job_id in jobs if job_id not in active and not self.is_pinned(job_id)),
+                            key=last_access.get)
+        over_budget = self.max_bytes > 0 and used > self.max_bytes
+        evicted = []
+        for job_id in candidates:
+            expired = self.ttl > 0 and now - last_access[job_id] > self.ttl
+            if over_budget and used <= self.max_bytes * 0.9:
+                over_budget = False
+            # Oldest first: once a job is neither expired nor needed for space, no later one is
+            if not expired and not over_budget:
+                break
+            # Only read for eviction candidates, so a sweep does not parse every result
+            if self._in_progress(job_id, jobs[job_id]):
+                continue
+            freed = self._evict(job_id, jobs[job_id])
+            used -= sizes[job_id]
+            evicted.append(job_id)
+            with self._lock:
+                self.bytes_reclaimed += freed
+                self.jobs_evicted += 1
+
+        with self._lock:
+            self.bytes_used = used
+            self.jobs = len(jobs) - len(evicted)
+            self.last_sweep = now
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "jobs": self.jobs,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "jobs_evicted": self.jobs_evicted,
+                "last_sweep": self.last_sweep,
+            }
+
+
+_janitor = None
+
+def get_janitor():
+    global _janitor
+    if _janitor is None:
+        _janitor = Janitor(data_dir())
+    return _janitor
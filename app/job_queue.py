@@ -0,0 +1,44 @@
+##Shortest-job-first queue for analysis jobs, with aging so large jobs still run
+import heapq
+import itertools
+import os
+import queue
+import time
+
+# Every second a job waits counts as this many pages fewer
+JOB_AGING_PAGES_PER_SECOND = float(os.environ.get("JOB_AGING_PAGES_PER_SECOND", "5"))
+# Pages one level of the /analyze priority parameter is worth
+JOB_PRIORITY_STEP_PAGES = float(os.environ.get("JOB_PRIORITY_STEP_PAGES", "100"))
+
+
+def job_cost(pages: int, priority: int = 0) -> float:
+    """Scheduling cost of a job before aging; lower runs sooner."""
+    return pages - priority * JOB_PRIORITY_STEP_PAGES
+
+
+class JobQueue(queue.Queue):
+    """
+    queue.Queue that hands out the cheapest analysis job first.
+
+    Entries are put as `(item, pages, priority)` and `get` returns the item.
+    Waiting lowers a job's cost by JOB_AGING_PAGES_PER_SECOND per second, so a
+    600-page job waits at most about two minutes behind a stream of small ones
+    at the default rate. All queued jobs age at the same rate, so their order
+    only depends on cost plus aging times the time they were put, a key that
+    is fixed on put and fits a plain heap. Equal keys are served in FIFO order.
+    """
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._seq = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, entry):
+        item, pages, priority = entry
+        key = job_cost(pages, priority) + JOB_AGING_PAGES_PER_SECOND * time.monotonic()
+        heapq.heappush(self.queue, (key, next(self._seq), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[-1]
@@ -0,0 +1,94 @@
+##Aho-Corasick matcher for the legal keyword lists
+from collections import deque
+
+from app.knowledge_base import (
+    LEGAL_TERMS,
+    TOPIC_KEYWORDS,
+    GENERAL_QUESTION_PATTERNS,
+    QUESTION_CLAUSE_KEYWORDS,
+)
+
+
+class KeywordMatcher:
+    """
+    Multi-keyword substring matcher built on an Aho-Corasick automaton.
+
+    `scan` walks the text once and counts keyword hits per category, giving
+    the same answer as `any(keyword in text ...)` for every list at once.
+    Keywords are matched as plain lowercase substrings, like the checks
+    they replace.
+    """
+
+    def __init__(self, categories: dict[str, list[str]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self._add(keyword.lower(), category)
+        self._link()
+
+    def _add(self, keyword: str, category: str) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        if category not in self._out[state]:
+            self._out[state] = self._out[state] + (category,)
+
+    def _link(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in self._goto[state].items():
+                pending.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + tuple(
+                    c for c in self._out[self._fail[nxt]] if c not in self._out[nxt]
+                )
+
+    def scan(self, text: str) -> dict[str, int]:
+        """Count keyword hits per category in a single pass over lowercase text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        counts: dict[str, int] = {}
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for category in out[state]:
+                    counts[category] = counts.get(category, 0) + 1
+        return counts
+
+
+def _default_categories() -> dict[str, list[str]]:
+    categories: dict[str, list[str]] = {}
+    for term, variations in LEGAL_TERMS.items():
+        categories[f"legal:{term}"] = variations
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        categories[f"topic:{topic}"] = keywords
+    categories["question:GENERAL_CONTRACT"] = GENERAL_QUESTION_PATTERNS
+    for clause_type, keywords in QUESTION_CLAUSE_KEYWORDS.items():
+        categories[f"question:{clause_type}"] = keywords
+    return categories
+
+
+_keyword_matcher = None
+
+def get_keyword_matcher():
+    global _keyword_matcher
+    if _keyword_matcher is None:
+        _keyword_matcher = KeywordMatcher(_default_categories())
+    return _keyword_matcher
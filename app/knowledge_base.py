@@ -35,4 +35,75 @@ LEGAL_KNOWLEDGE_BASE = {
         "source": "Risk Management Guidelines",
         "examples": ["act of god", "beyond control", "unforeseeable"]
     }
-}
\ No newline at end of file
+}
+
+# Keyword expansions used to widen questions before retrieval
+LEGAL_TERMS = {
+    'contract_about': ['agreement', 'contract', 'terms', 'conditions', 'purpose', 'scope', 'objectives'],
+    'parties': ['party', 'parties', 'between', 'company', 'corporation', 'entity', 'person'],
+    'termination': ['terminate', 'end', 'expire', 'cancel', 'termination', 'duration'],
+    'liability': ['liability', 'liable', 'responsible', 'damages', 'indemnify', 'indemnification'],
+    'payment': ['payment', 'pay', 'fee', 'cost', 'price', 'compensation', 'remuneration'],
+    'confidentiality': ['confidential', 'secret', 'proprietary', 'non-disclosure', 'privacy'],
+    'assignment': ['assign', 'transfer', 'delegate', 'assignment', 'novation'],
+    'governing_law': ['governing law', 'jurisdiction', 'legal', 'court', 'venue'],
+    'force_majeure': ['force majeure', 'act of god', 'unforeseeable', 'circumstances'],
+    'warranty': ['warranty', 'warrant', 'guarantee', 'represent', 'representation'],
+    'breach': ['breach', 'violate', 'default', 'non-compliance', 'failure'],
+    'remedy': ['remedy', 'damages', 'injunction', 'specific performance', 'relief']
+}
+
+# Sentence keywords behind each topic-focused Q&A context
+TOPIC_KEYWORDS = {
+    'payment': ['payment', 'pay', 'fee', 'cost', 'price', 'compensation', 'remuneration',
+                'amount', 'dollar', 'currency', 'invoice', 'billing', 'charge'],
+    'termination': ['termination', 'terminate', 'end', 'expire', 'cancel', 'duration',
+                    'period', 'term', 'validity'],
+    'liability': ['liability', 'liable', 'responsible', 'damages', 'indemnify',
+                  'indemnification', 'hold harmless', 'defend', 'breach'],
+    'confidentiality': ['confidential', 'secret', 'proprietary', 'non-disclosure',
+                        'privacy', 'information', 'data'],
+    'summary_intro': ['agreement', 'contract', 'terms', 'conditions'],
+    'summary_parties': ['party', 'parties', 'between', 'company', 'corporation'],
+    'summary_scope': ['purpose', 'scope', 'objectives', 'services', 'products']
+}
+
+# Phrases that mark a question as being about the contract as a whole
+GENERAL_QUESTION_PATTERNS = [
+    'what is the contract about', 'what is this contract', 'contract about', 'contract summary',
+    'explain the contract', 'what are the risks', 'contract risks', 'overall risks',
+    'what does this contract', 'contract purpose', 'contract overview', 'contract details',
+    'what is this agreement', 'agreement about', 'what does the agreement', 'agreement summary',
+    'tell me about this contract', 'describe the contract', 'contract analysis'
+]
+
+# Question keywords routed to a clause type, checked in this order
+QUESTION_CLAUSE_KEYWORDS = {
+    'Anti-Assignment': ['assignment', 'assign', 'transfer'],
+    'Governing Law': ['governing', 'law', 'jurisdiction'],
+    'Termination': ['termination', 'terminate', 'end'],
+    'Confidentiality': ['confidential', 'proprietary', 'secret'],
+    'Indemnification': ['indemnify', 'indemnification', 'liability'],
+    'Force Majeure': ['force majeure', 'act of god', 'disaster']
+}
+
+# CUAD-style question details used by the model to confirm regex clause candidates
+CLAUSE_CONFIRM_DETAILS = {
+    "Document Name": "The name of the contract",
+    "Parties": "The two or more parties who signed the contract",
+    "Effective Date": "The date when the contract is effective",
+    "Governing Law": "Which state/country's law governs the interpretation of the contract?",
+    "Termination": "Under what conditions can a party terminate this contract, and when does it expire?",
+    "Confidentiality": "What information must a party keep confidential, and for how long?",
+    "Anti-Assignment": "Is consent or notice required of a party if the contract is assigned to a third party?",
+    "Indemnification": "Does a party have to indemnify, defend or hold harmless the other party?",
+    "Force Majeure": "Is a party excused from performance because of events beyond its control?",
+    "Dispute Resolution": "How are disputes between the parties resolved, e.g. by arbitration or in court?",
+    "Severability": "Does the rest of the contract survive if a provision is held invalid?",
+    "Entire Agreement": "Does this contract supersede all prior agreements between the parties?",
+    "Amendment": "How can this contract be amended or modified?",
+    "Waiver": "Does failing to enforce a provision waive a party's rights?",
+    "Notices": "How and where must notices under this contract be given?",
+    "Assignment": "Can a party assign or transfer its rights and obligations under this contract?",
+    "Insurance": "Is there a requirement for insurance that must be maintained by one party for the benefit of the counterparty?"
+}
@@ -1,5 +1,57 @@
+import os
+import time
 import torch
 import logging
+from pathlib import Path
+from app.doc_index import get_document_index
+from app.retrieval import QA_TOP_CHUNKS, build_query, get_bm25_index, get_chunk_index
+from app.token_windows import get_token_windows
+
+QA_MODEL_NAME = os.environ.get("QA_MODEL_NAME", "Rakib/roberta-base-on-cuad")
+
+
+def model_dir() -> Path | None:
+    """Local snapshot directory created by `python -m app.model_snapshot`, if configured."""
+    path = os.environ.get("QA_MODEL_DIR")
+    return Path(path) if path else None
+
+
+def model_version() -> str:
+    """Identity of the configured Q&A model, used to key cached answers."""
+    local_dir = model_dir()
+    return f"dir:{local_dir.resolve()}" if local_dir is not None else QA_MODEL_NAME
+
+
+# Cascade settings: stop once an answer is this confident or the budget is spent
+QA_EARLY_EXIT_SCORE = float(os.environ.get("QA_EARLY_EXIT_SCORE", "0.9"))
+QA_TIME_BUDGET_SECONDS = float(os.environ.get("QA_TIME_BUDGET_SECONDS", "10"))
+# Question/context pairs per forward pass in batched answering
+QA_BATCH_SIZE = int(os.environ.get("QA_BATCH_SIZE", "8"))
+# Intra-op threads for this process's model; 0 keeps torch's default (all cores)
+QA_TORCH_THREADS = int(os.environ.get("QA_TORCH_THREADS", "0"))
+# After a failed load, callers get no model for this long instead of each retrying the hub
+QA_LOAD_RETRY_SECONDS = float(os.environ.get("QA_LOAD_RETRY_SECONDS", "300"))
+
+# Short, topic-focused contexts first; long whole-document windows last
+CONTEXT_PRIORITY = [
+    'payment_focused', 'termination_focused', 'liability_focused', 'confidentiality_focused',
+    'general_summary', 'relevant_clauses', 'keyword_matches', 'document_windows',
+    'retrieved_passage', 'document_start',
+]
+
+
+def _failed_recently(failed_at):
+    return failed_at is not None and time.monotonic() - failed_at < QA_LOAD_RETRY_SECONDS
+
+
+def _context_order(item):
+    # sorted() is stable, so retrieved passages keep their BM25 rank order
+    name = item[0]
+    for rank, prefix in enumerate(CONTEXT_PRIORITY):
+        if name.startswith(prefix):
+            return rank
+    return len(CONTEXT_PRIORITY)
+
 
 class LLMGenerator:
     def __init__(self):
@@ -7,24 +59,68 @@ class LLMGenerator:
         self.tokenizer = None
         self.pipeline = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._tokenizer_failed = None
+        self._model_failed = None
         
+    def _model_source(self):
+        local_dir = model_dir()
+        if local_dir is not None:
+            # Offline snapshot: never touch the hub, and load the safetensors
+            # weights through mmap so worker processes share page-cache pages.
+            return str(local_dir), {"local_files_only": True, "use_safetensors": True}
+        return QA_MODEL_NAME, {}
+    
+    def tokenizer_available(self):
+        """Whether a tokenizer is loaded or can be loaded from a local snapshot, without the hub."""
+        return self.tokenizer is not None or model_dir() is not None
+    
+    def load_tokenizer(self):
+        """Load only the fast tokenizer, e.g. to pre-tokenize documents at analysis time."""
+        if self.tokenizer is not None:
+            return True
+        if _failed_recently(self._tokenizer_failed):
+            return False
+        try:
+            from transformers import AutoTokenizer
+            
+            source, load_kwargs = self._model_source()
+            load_kwargs.pop("use_safetensors", None)
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                source,
+                use_fast=True,
+                **load_kwargs
+            )
+            return True
+        except Exception as e:
+            self._tokenizer_failed = time.monotonic()
+            print(f"Failed to load tokenizer: {e}")
+            return False
+    
+    def model_loaded(self):
+        """Whether answers can run now, without loading the model first."""
+        return self.pipeline is not None
+    
     def load_model(self):
+        if _failed_recently(self._model_failed):
+            return False
         try:
             print("Loading RoBERTa legal Q&A model...")
             
-            from transformers import pipeline, AutoTokenizer, AutoModelForQuestionAnswering
+            from transformers import pipeline, AutoModelForQuestionAnswering
             import torch
             
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                "Rakib/roberta-base-on-cuad",
-                use_fast=True 
-            )
+            source, load_kwargs = self._model_source()
+            if not self.load_tokenizer():
+                self._model_failed = time.monotonic()
+                return False
+            if QA_TORCH_THREADS:
+                torch.set_num_threads(QA_TORCH_THREADS)
             
             self.model = AutoModelForQuestionAnswering.from_pretrained(
-                "Rakib/roberta-base-on-cuad",
+                source,
                 torch_dtype=torch.float16 if self.device == "cuda" else torch.float32, 
-                low_cpu_mem_usage=True  # 
+                low_cpu_mem_usage=True,
+                **load_kwargs
             )
             
             self.model.to(self.device)
@@ -38,14 +134,25 @@ class LLMGenerator:
                 device=0 if self.device == "cuda" else -1
             )
             
-            print("RoBERTa legal Q&A model loaded successfully")
+            print(f"RoBERTa legal Q&A model loaded successfully from {source}")
             return True
         except Exception as e:
+            self._model_failed = time.monotonic()
             print(f"Failed to load RoBERTa legal model: {e}")
             print("LLM functionality will be disabled - using rule-based responses only")
             return False
     
-    def generate_explanation(self, clause_text, question):
+    def generate_explanation(self, clause_text, question, job_id=None, should_stop=None, trace=None,
+                             topic_contexts=None):
+        """
+        Answer a question from the document, trying contexts cheapest-first.
+
+        Contexts run in CONTEXT_PRIORITY order and evaluation stops once an answer
+        reaches QA_EARLY_EXIT_SCORE, the QA_TIME_BUDGET_SECONDS budget is spent or
+        `should_stop` returns True. Names of the contexts that ran are appended to
+        `trace` when a list is passed. `topic_contexts` are the contexts stored with
+        the job result by the analysis worker; without them they are built here.
+        """
         if not self.pipeline:
             if not self.model:
                 self.load_model()
@@ -54,286 +161,361 @@ class LLMGenerator:
         
         try:
            
-            contexts = self._create_multiple_contexts(clause_text, question)
+            doc = get_document_index(clause_text, job_id)
+            if topic_contexts:
+                doc.topic_contexts = topic_contexts
+            windows = get_token_windows(doc, job_id)
             
             best_answer = None
             best_score = 0
             best_method = ""
+            started = time.monotonic()
          
-            for context_name, context_text in contexts.items():
-                if not context_text.strip():
+            for context_name, context_text in self._plan_contexts(question, doc, job_id, windows):
+                # Deadline passed or request cancelled: keep the best answer so far
+                if should_stop and should_stop():
+                    break
+                if QA_TIME_BUDGET_SECONDS and time.monotonic() - started > QA_TIME_BUDGET_SECONDS:
+                    break
+                if context_text is not None and not context_text.strip():
                     continue
                     
                 try:
-                    result = self.pipeline(
-                        question=question,
-                        context=context_text,
-                        max_answer_len=400,
-                        handle_impossible_answer=True
-                    )
+                    if context_text is None:
+                        answers = self._answer_from_windows(question, doc.text, windows)
+                    else:
+                        result = self.pipeline(
+                            question=question,
+                            context=context_text,
+                            max_answer_len=400,
+                            handle_impossible_answer=True
+                        )
+                        answers = [(context_name, result['answer'], result.get('score', 0))]
+                    if trace is not None:
+                        trace.append(context_name)
                     
-                    if result['answer'] and result['answer'].strip() != "":
-                        score = result.get('score', 0)
-                        
-                       
-                        if score > 0.01: 
-                            if score > best_score:
-                                best_answer = result['answer']
-                                best_score = score
-                                best_method = context_name
+                    for method, answer, score in answers:
+                        if answer and answer.strip() != "":
+                            
+                           
+                            if score > 0.01: 
+                                if score > best_score:
+                                    best_answer = answer
+                                    best_score = score
+                                    best_method = method
                                 
                 except Exception as e:
                     print(f"Error with {context_name}: {e}")
                     continue
+                
+                if best_score >= QA_EARLY_EXIT_SCORE:
+                    break
             
          
-            if best_answer:
-               
-                if best_score > 0.7:
-                    response = f"**High Confidence Answer:** {best_answer}"
-                elif best_score > 0.3:
-                    response = f"**Answer:** {best_answer}"
-                else:
-                    response = f"**Answer (Low Confidence):** {best_answer}"
+            return self._format_answer(doc, question, best_answer, best_score, best_method)
                 
-                response += f"\n\n*Source: {best_method} analysis (confidence: {best_score:.2f})*"
-                return response
-            
-            # If no answer found, try to extract relevant information manually
-            relevant_info = self._extract_relevant_info_manually(clause_text, question)
-            if relevant_info:
-                return f"**Answer:** {relevant_info}\n\n*Source: Manual extraction*"
+        except Exception as e:
+            print(f"LLM generation error: {e}")
+            return "No explanation available"
+    
+    def generate_explanations(self, clause_text, questions, job_id=None, should_stop=None, traces=None,
+                              topic_contexts=None):
+        """
+        Answer many questions about one document with batched model passes.
+
+        The document and its indexes are loaded once. The cascade runs in rounds:
+        each round feeds the next context of every question that has not yet
+        reached QA_EARLY_EXIT_SCORE to the pipeline as a single batch. Duplicate
+        questions are answered once. Returns answers in the order asked.
+        """
+        if not self.pipeline:
+            if not self.model:
+                self.load_model()
+            if not self.pipeline:
+                return ["No explanation available"] * len(questions)
+        
+        try:
+            doc = get_document_index(clause_text, job_id)
+            if topic_contexts:
+                doc.topic_contexts = topic_contexts
+            windows = get_token_windows(doc, job_id)
+            unique = list(dict.fromkeys(questions))
+            plans = {q: self._plan_contexts(q, doc, job_id, windows) for q in unique}
+            best = {q: (None, 0, "") for q in unique}
+            ran = {q: [] for q in unique}
+            started = time.monotonic()
             
-            return "I couldn't find specific information about your question in this contract. The contract may not contain details about this topic, or the information might be worded differently than expected."
+            for step in range(max((len(plan) for plan in plans.values()), default=0)):
+                if should_stop and should_stop():
+                    break
+                if QA_TIME_BUDGET_SECONDS and time.monotonic() - started > QA_TIME_BUDGET_SECONDS:
+                    break
+                pending = [(q, plans[q][step]) for q in unique
+                           if step < len(plans[q]) and best[q][1] < QA_EARLY_EXIT_SCORE]
+                if not pending:
+                    break
+                
+                answers = []
+                batch = [(q, name, text) for q, (name, text) in pending if text is not None and text.strip()]
+                if batch:
+                    try:
+                        results = self.pipeline(
+                            question=[q for q, _, _ in batch],
+                            context=[text for _, _, text in batch],
+                            max_answer_len=400,
+                            handle_impossible_answer=True,
+                            batch_size=QA_BATCH_SIZE
+                        )
+                        if isinstance(results, dict):
+                            results = [results]
+                        for (q, name, _), result in zip(batch, results):
+                            ran[q].append(name)
+                            answers.append((q, name, result['answer'], result.get('score', 0)))
+                    except Exception as e:
+                        print(f"Error with batched contexts: {e}")
+                for q, (name, text) in pending:
+                    if text is None:
+                        try:
+                            ran[q].append(name)
+                            answers.extend((q, method, answer, score)
+                                           for method, answer, score in self._answer_from_windows(q, doc.text, windows))
+                        except Exception as e:
+                            print(f"Error with pre-tokenized windows: {e}")
                 
+                for q, method, answer, score in answers:
+                    if answer and answer.strip() != "" and score > 0.01 and score > best[q][1]:
+                        best[q] = (answer, score, method)
+            
+            if traces is not None:
+                traces.extend(list(ran[q]) for q in questions)
+            return [self._format_answer(doc, q, *best[q]) for q in questions]
+        
         except Exception as e:
             print(f"LLM generation error: {e}")
-            return "No explanation available"
+            return ["No explanation available"] * len(questions)
+    
+    def answer_pairs(self, questions, contexts):
+        """Best (answer, score) for each question/context pair in one batched call, or None without a model."""
+        # Background callers only: never start a model load for them
+        if not self.pipeline:
+            return None
+        results = self.pipeline(
+            question=questions,
+            context=contexts,
+            max_answer_len=400,
+            handle_impossible_answer=True,
+            batch_size=QA_BATCH_SIZE
+        )
+        if isinstance(results, dict):
+            results = [results]
+        return [(result['answer'], result.get('score', 0)) for result in results]
     
-    def _create_multiple_contexts(self, full_text, question):
+    def _plan_contexts(self, question, doc, job_id, windows):
+        """Contexts for a question as (name, text) pairs in cascade order; text None means the stored windows"""
+        contexts = self._create_multiple_contexts(doc.text, question, doc, job_id,
+                                                  retrieve_passages=windows is None)
+        if windows is not None:
+            # Windows tokenized at analysis time: only the question is encoded here
+            contexts['document_windows'] = None
+        return sorted(contexts.items(), key=_context_order)
+    
+    def _format_answer(self, doc, question, best_answer, best_score, best_method):
+        if best_answer:
+           
+            if best_score > 0.7:
+                response = f"**High Confidence Answer:** {best_answer}"
+            elif best_score > 0.3:
+                response = f"**Answer:** {best_answer}"
+            else:
+                response = f"**Answer (Low Confidence):** {best_answer}"
+            
+            response += f"\n\n*Source: {best_method} analysis (confidence: {best_score:.2f})*"
+            return response
+        
+        # If no answer found, try to extract relevant information manually
+        relevant_info = self._extract_relevant_info_manually(doc, question)
+        if relevant_info:
+            return f"**Answer:** {relevant_info}\n\n*Source: Manual extraction*"
+        
+        return "I couldn't find specific information about your question in this contract. The contract may not contain details about this topic, or the information might be worded differently than expected."
+    
+    def _answer_from_windows(self, question, text, windows):
+        """Answer from the top pre-tokenized windows in one batched forward pass"""
+        selected = windows.top_windows(text, question, QA_TOP_CHUNKS)
+        if not selected:
+            return []
+        
+        q_ids = self.tokenizer(question, add_special_tokens=False)["input_ids"][:64]
+        rows, ctx_ranges = [], []
+        for w in selected:
+            ctx_ids = windows.window_ids(w)
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(q_ids, ctx_ids)
+            # RoBERTa/BERT pairs end with a single separator after the context
+            ctx_start = len(input_ids) - len(ctx_ids) - 1
+            rows.append(input_ids)
+            ctx_ranges.append((ctx_start, ctx_start + len(ctx_ids)))
+        
+        width = max(len(r) for r in rows)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(rows), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for r, row in enumerate(rows):
+            input_ids[r, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[r, :len(row)] = 1
+        
+        with torch.no_grad():
+            output = self.model(input_ids=input_ids.to(self.device),
+                                attention_mask=attention_mask.to(self.device))
+        start_logits = output.start_logits.float().cpu()
+        end_logits = output.end_logits.float().cpu()
+        
+        answers = []
+        for r, w in enumerate(selected):
+            ctx_start, ctx_end = ctx_ranges[r]
+            # Like the pipeline with handle_impossible_answer: softmax over the
+            # context plus the leading token, which stands for "no answer"
+            keep = torch.zeros(width, dtype=torch.bool)
+            keep[0] = True
+            keep[ctx_start:ctx_end] = True
+            p_start = torch.softmax(start_logits[r].masked_fill(~keep, -1e4), dim=-1)
+            p_end = torch.softmax(end_logits[r].masked_fill(~keep, -1e4), dim=-1)
+            
+            span = torch.outer(p_start[ctx_start:ctx_end], p_end[ctx_start:ctx_end])
+            span = torch.triu(span) - torch.triu(span, diagonal=400)
+            best = int(torch.argmax(span))
+            i, j = divmod(best, span.shape[1])
+            score = float(span[i, j])
+            if score < float(p_start[0] * p_end[0]):
+                continue
+            
+            first = int(windows.windows[w][0])
+            answer = text[windows.offsets[first + i][0]:windows.offsets[first + j][1]].strip()
+            if answer:
+                answers.append((f'document_window_{w}', answer, score))
+        return answers
+    
+    def _create_multiple_contexts(self, full_text, question, doc=None, job_id=None, retrieve_passages=True):
         """Create multiple context strategies for better answer finding"""
-        import re
+        if doc is None:
+            doc = get_document_index(full_text)
         
         contexts = {}
         question_lower = question.lower()
         
     
-        contexts['full_document'] = full_text[:4000] 
+        # Retrieve-then-read: only the best-matching windows of the whole document
+        # reach the model, so cost stays fixed however long the contract is
+        if retrieve_passages:
+            for rank, chunk in enumerate(get_chunk_index(doc).top_chunks(question), start=1):
+                contexts[f'retrieved_passage_{rank}'] = chunk
         
         
-        relevant_clauses = self._find_relevant_clauses(full_text, question)
+        relevant_clauses = self._find_relevant_clauses(doc, question, job_id)
         if relevant_clauses:
             contexts['relevant_clauses'] = " ".join(relevant_clauses[:5])
         
  
+        topics = self.topic_contexts(doc)
         if 'payment' in question_lower:
-            contexts['payment_focused'] = self._extract_payment_context(full_text)
+            contexts['payment_focused'] = topics['payment_focused']
         elif 'termination' in question_lower:
-            contexts['termination_focused'] = self._extract_termination_context(full_text)
+            contexts['termination_focused'] = topics['termination_focused']
         elif 'liability' in question_lower or 'damage' in question_lower:
-            contexts['liability_focused'] = self._extract_liability_context(full_text)
+            contexts['liability_focused'] = topics['liability_focused']
         elif 'confidential' in question_lower:
-            contexts['confidentiality_focused'] = self._extract_confidentiality_context(full_text)
+            contexts['confidentiality_focused'] = topics['confidentiality_focused']
         elif 'what is' in question_lower or 'about' in question_lower:
-            contexts['general_summary'] = self._create_summary_context(full_text)
+            contexts['general_summary'] = topics['general_summary']
         
        
-        sentences = re.split(r'[.!?]+', full_text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-        contexts['document_start'] = " ".join(sentences[:10])
+        contexts['document_start'] = doc.join(doc.long_ids[:10])
         
 
         question_words = [w for w in question_lower.split() if len(w) > 3]
-        keyword_sentences = []
-        for sentence in sentences:
-            if any(word in sentence.lower() for word in question_words):
-                keyword_sentences.append(sentence)
-        if keyword_sentences:
-            contexts['keyword_matches'] = " ".join(keyword_sentences[:8])
+        keyword_ids = doc.matching(question_words, doc.long_ids, limit=8)
+        if keyword_ids:
+            contexts['keyword_matches'] = doc.join(keyword_ids)
         
         return contexts
     
-    def _extract_payment_context(self, full_text):
-        """Extract payment-related information"""
-        import re
-        sentences = re.split(r'[.!?]+', full_text)
-        payment_sentences = []
+    def topic_contexts(self, doc):
+        """
+        Topic contexts that depend only on the document, keyed by context name.
         
-        payment_keywords = ['payment', 'pay', 'fee', 'cost', 'price', 'compensation', 'remuneration', 
-                           'amount', 'dollar', 'currency', 'invoice', 'billing', 'charge']
-        
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in payment_keywords):
-                payment_sentences.append(sentence)
-        
-        return " ".join(payment_sentences[:10])
+        The analysis worker stores these with the job result; otherwise they are
+        built on first use and kept on the DocumentIndex.
+        """
+        if doc.topic_contexts is None:
+            doc.topic_contexts = {
+                'payment_focused': self._extract_payment_context(doc),
+                'termination_focused': self._extract_termination_context(doc),
+                'liability_focused': self._extract_liability_context(doc),
+                'confidentiality_focused': self._extract_confidentiality_context(doc),
+                'general_summary': self._create_summary_context(doc),
+            }
+        return doc.topic_contexts
+    
+    def _extract_payment_context(self, doc):
+        """Extract payment-related information"""
+        return doc.join(doc.with_category('topic:payment', limit=10))
     
-    def _extract_termination_context(self, full_text):
+    def _extract_termination_context(self, doc):
         """Extract termination-related information"""
-        import re
-        sentences = re.split(r'[.!?]+', full_text)
-        termination_sentences = []
-        
-        termination_keywords = ['termination', 'terminate', 'end', 'expire', 'cancel', 'duration', 
-                               'period', 'term', 'validity']
-        
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in termination_keywords):
-                termination_sentences.append(sentence)
-        
-        return " ".join(termination_sentences[:10])
+        return doc.join(doc.with_category('topic:termination', limit=10))
     
-    def _extract_liability_context(self, full_text):
+    def _extract_liability_context(self, doc):
         """Extract liability-related information"""
-        import re
-        sentences = re.split(r'[.!?]+', full_text)
-        liability_sentences = []
-        
-        liability_keywords = ['liability', 'liable', 'responsible', 'damages', 'indemnify', 
-                             'indemnification', 'hold harmless', 'defend', 'breach']
-        
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in liability_keywords):
-                liability_sentences.append(sentence)
-        
-        return " ".join(liability_sentences[:10])
+        return doc.join(doc.with_category('topic:liability', limit=10))
     
-    def _extract_confidentiality_context(self, full_text):
+    def _extract_confidentiality_context(self, doc):
         """Extract confidentiality-related information"""
-        import re
-        sentences = re.split(r'[.!?]+', full_text)
-        confidentiality_sentences = []
-        
-        confidentiality_keywords = ['confidential', 'secret', 'proprietary', 'non-disclosure', 
-                                   'privacy', 'information', 'data']
-        
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in confidentiality_keywords):
-                confidentiality_sentences.append(sentence)
-        
-        return " ".join(confidentiality_sentences[:10])
+        return doc.join(doc.with_category('topic:confidentiality', limit=10))
     
-    def _extract_relevant_info_manually(self, full_text, question):
+    def _extract_relevant_info_manually(self, doc, question):
         """Manually extract relevant information when AI fails"""
-        import re
-        question_lower = question.lower()
+        question_words = [w for w in question.lower().split() if len(w) > 3]
         
-
-        sentences = re.split(r'[.!?]+', full_text)
-        relevant_sentences = []
-        
-        question_words = [w for w in question_lower.split() if len(w) > 3]
-        
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            if any(word in sentence_lower for word in question_words):
-                relevant_sentences.append(sentence.strip())
-        
-        if relevant_sentences:
-         
-            return " ".join(relevant_sentences[:3])
+        relevant_ids = doc.matching(question_words, limit=3)
+        if relevant_ids:
+            return doc.join(relevant_ids)
         
         return None
     
-    def _create_summary_context(self, full_text):
+    def _create_summary_context(self, doc):
         """Create a summary context for general questions"""
-        import re
-        
-      
-        sentences = re.split(r'[.!?]+', full_text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-        
-    
-        key_phrases = []
+        key_ids = []
      
-        for sentence in sentences[:10]:
-            if any(word in sentence.lower() for word in ['agreement', 'contract', 'terms', 'conditions']):
-                key_phrases.append(sentence)
-                break
+        key_ids.extend(doc.with_category('topic:summary_intro', doc.long_ids[:10], limit=1))
     
-        for sentence in sentences:
-            if any(word in sentence.lower() for word in ['party', 'parties', 'between', 'company', 'corporation']):
-                key_phrases.append(sentence)
-                if len(key_phrases) >= 2:
-                    break
- 
-        for sentence in sentences:
-            if any(word in sentence.lower() for word in ['purpose', 'scope', 'objectives', 'services', 'products']):
-                key_phrases.append(sentence)
+        for i in doc.with_category('topic:summary_parties', doc.long_ids):
+            key_ids.append(i)
+            if len(key_ids) >= 2:
                 break
+ 
+        key_ids.extend(doc.with_category('topic:summary_scope', doc.long_ids, limit=1))
   
-        if key_phrases:
-            return " ".join(key_phrases[:5])  
+        if key_ids:
+            return doc.join(key_ids[:5])  
         else:
            
-            return " ".join(sentences[:3])
+            return doc.join(doc.long_ids[:3])
     
-    def _find_relevant_clauses(self, full_text, question):
-        """Find the most relevant clauses for the question using keyword matching"""
-        import re
-
-        sentences = re.split(r'[.!?]+', full_text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-
-        question_lower = question.lower()
-        keywords = []
-        
-        # Enhanced legal term mappings
-        legal_terms = {
-            'contract_about': ['agreement', 'contract', 'terms', 'conditions', 'purpose', 'scope', 'objectives'],
-            'parties': ['party', 'parties', 'between', 'company', 'corporation', 'entity', 'person'],
-            'termination': ['terminate', 'end', 'expire', 'cancel', 'termination', 'duration'],
-            'liability': ['liability', 'liable', 'responsible', 'damages', 'indemnify', 'indemnification'],
-            'payment': ['payment', 'pay', 'fee', 'cost', 'price', 'compensation', 'remuneration'],
-            'confidentiality': ['confidential', 'secret', 'proprietary', 'non-disclosure', 'privacy'],
-            'assignment': ['assign', 'transfer', 'delegate', 'assignment', 'novation'],
-            'governing_law': ['governing law', 'jurisdiction', 'legal', 'court', 'venue'],
-            'force_majeure': ['force majeure', 'act of god', 'unforeseeable', 'circumstances'],
-            'warranty': ['warranty', 'warrant', 'guarantee', 'represent', 'representation'],
-            'breach': ['breach', 'violate', 'default', 'non-compliance', 'failure'],
-            'remedy': ['remedy', 'damages', 'injunction', 'specific performance', 'relief']
-        }
-    
-        for term, variations in legal_terms.items():
-            if any(v in question_lower for v in variations):
-                keywords.extend(variations)
-  
-        question_words = [w for w in question_lower.split() if len(w) > 2]  
-        keywords.extend(question_words)
-      
-        if "what is" in question_lower or "about" in question_lower:
-            keywords.extend(['agreement', 'contract', 'document', 'terms', 'conditions', 'purpose'])
-    
-        scored_sentences = []
-        for sentence in sentences:
-            score = 0
-            sentence_lower = sentence.lower()
-            
-            for keyword in keywords:
-                if keyword in sentence_lower:
-                    score += 1
-               
-                    if keyword in sentence_lower.split():
-                        score += 2
-                   
-                    if sentence_lower.startswith(keyword):
-                        score += 1
-            
-       
-            if any(word in sentence_lower for word in ['agreement', 'contract', 'terms', 'conditions']):
-                score += 3
-            
-            if score > 0:
-                scored_sentences.append((score, sentence))
-        
-    
-        scored_sentences.sort(key=lambda x: x[0], reverse=True)
-        return [sentence for score, sentence in scored_sentences[:8]]  
+    def _find_relevant_clauses(self, doc, question, job_id=None):
+        """Find the most relevant clauses for the question using BM25 retrieval"""
+        query = build_query(question)
+        hits = get_bm25_index(doc, job_id).search(query, k=8)
+        return [doc.sentences[i] for score, i in hits]
 
 _llm_generator = None
 
 def get_llm_generator():
     global _llm_generator
     if _llm_generator is None:
-        _llm_generator = LLMGenerator()
+        socket_path = os.environ.get("QA_INFERENCE_SOCKET")
+        if socket_path:
+            # Deployments with several API workers share one model process
+            from app.inference_server import RemoteLLMGenerator
+            _llm_generator = RemoteLLMGenerator(socket_path)
+        else:
+            _llm_generator = LLMGenerator()
     return _llm_generator
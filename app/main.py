@@ -1,17 +1,34 @@
-from fastapi import FastAPI,UploadFile, HTTPException, Response
-from fastapi.responses import FileResponse
+from fastapi import FastAPI,UploadFile, HTTPException, Response, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from uuid import uuid4
 from pydantic import BaseModel
 from pathlib import Path
 import time
 import os
 import queue
-from threading import Thread
+import asyncio
+from threading import Thread, Event
 import json
+import hashlib
 import fitz
-from app.parser import parse_pdf
-from app.qa_system import parse_question, get_policy_explanation, retrieve_clause, generate_answer, generate_contract_summary
-from app.llm_generator import get_llm_generator
+from functools import lru_cache
+from app.parser import PdfOpenError, redetect_clauses, stream_pdf
+from app.qa_system import parse_question, get_policy_explanation, retrieve_clause, generate_answer, generate_contract_summary, generate_rule_based_answer, is_summary_question, summarize_clauses
+from app.doc_index import DocumentIndex
+from app.llm_generator import get_llm_generator, model_version
+from app.answer_cache import answer_key, get_answer_cache
+from app.inference import EXPLAIN_DEADLINE_SECONDS, ExplainJob, InferenceBusy, get_explain_jobs, get_inference_executor
+from app.retrieval import get_bm25_index
+from app.token_windows import TokenWindows, token_windows_path
+from app.text_store import TextStore, TextStoreWriter, text_store_path
+from app.clause_classifier import CLAUSE_CONFIRM_BUDGET_SECONDS, confirm_clauses
+from app.profiling import profiled, read_profiles
+from app.job_queue import JobQueue
+from app.clause_columns import CLAUSE_FIELDS, clause_count, pack_clauses, unpack_clauses
+from app.fast_json import FastJSONResponse, dumps, loads
+from app.janitor import JANITOR_INTERVAL_SECONDS, get_janitor
+from app.storage import job_file
 # CUAD model removed - using rule-based legal detection instead
 
 
@@ -21,18 +38,28 @@ class AnalyzeResponse(BaseModel):
     job_id: str
     filename: str
     status: str
+    pages: int = 0
 
 class Clause(BaseModel):
     type: str
-    text: str
     page: int
-    bbox : list[float]
+    # Character span of the clause in its page's stored text
+    start: int = 0
+    end: int = 0
     score : float
+    text: str = ""
 
 class Result(BaseModel):
     job_id: str
     status: str
     clauses: list[Clause] = []
+    doc_hash: str = ""
+    # Model confirmation of the regex clauses: status "pending", "confirmed", "partial",
+    # "unavailable" or "regex" when disabled, with confirmed/rejected/unchecked counts
+    detection: dict = {}
+    # Why a "partial" or "cancelled" job stopped early: "time_budget", "page_limit" or "cancelled"
+    stop_reason: str = ""
+    pages_scanned: int = 0
 
 class Annotation(BaseModel):
     id: str
@@ -62,32 +89,131 @@ class HighlightTextRequest(BaseModel):
 class QARequest(BaseModel):
     question: str
     job_id: str
+    deadline_seconds: float | None = None
 
 class QAResponse(BaseModel):
     answer: str
     clause_text: str = ""
     clause_type: str = ""
     page: int = 0
+    contexts_run: list[str] = []
+    tier: str = "model"  # "retrieval" when answered without the Q&A model
+    explain_id: str | None = None  # tiered mode: poll for the model answer
+
+class ExplainBatchRequest(BaseModel):
+    questions: list[str]
+    deadline_seconds: float | None = None
+
+class ExplainBatchResponse(BaseModel):
+    job_id: str
+    answers: list[QAResponse]
+
+class ExplainJobResponse(BaseModel):
+    explain_id: str
+    status: str
+    response: QAResponse | None = None
 
 
 
-def data_dir() -> Path:
-    return Path(os.environ.get("DATA_DIR", "data"))
+# Per-job limits, so one pathological upload cannot hold the worker (0 disables)
+JOB_TIME_BUDGET_SECONDS = float(os.environ.get("JOB_TIME_BUDGET_SECONDS", "300"))
+JOB_MAX_PAGES = int(os.environ.get("JOB_MAX_PAGES", "5000"))
+
+# Shortest job first by page count; entries are ((job_id, pdf_path, doc_hash, profile), pages, priority)
+_job_q: "queue.Queue[tuple[str, Path, str, bool]]" = JobQueue()
+# Cancellation flag of every queued or running job, set by DELETE /jobs/{job_id}
+_job_cancel: dict[str, Event] = {}
+_confirm_q: "queue.Queue[str]" = queue.Queue()
+# Results with no clauses are stored exactly as /result returns them, starting with this
+_NO_CLAUSES_PREFIX = b'{"clause_count":0,'
+
+def _result_path(job_id: str) -> Path:
+    return job_file("results", job_id, f"{job_id}.json")
+
+def _contexts_path(job_id: str) -> Path:
+    return job_file("results", job_id, f"{job_id}.contexts.json")
+
+def _upload_path(job_id: str, highlighted: bool = False) -> Path:
+    return job_file("uploads", job_id, f"{job_id}_highlighted.pdf" if highlighted else f"{job_id}.pdf")
 
-_job_q: "queue.Queue[tuple[str, Path]]" = queue.Queue() 
 def _write_result(obj: Result) -> None:
-    results_dir=data_dir() / "results"
-    results_dir.mkdir(parents= True, exist_ok = True)
-    (results_dir/ f"{obj.job_id}.json").write_text(obj.model_dump_json())
+    path = _result_path(obj.job_id)
+    path.parent.mkdir(parents= True, exist_ok = True)
+    # Write then rename, so a concurrent /result never reads a half-written file
+    tmp = path.with_name(path.name + ".tmp")
+    data = {"clause_count": len(obj.clauses), **obj.model_dump()}
+    # Clauses are stored as offset columns; their text is rebuilt from the text store on read
+    data["clauses"] = pack_clauses(data["clauses"]) if obj.clauses else []
+    tmp.write_bytes(dumps(data))
+    os.replace(tmp, path)
 
-def _read_result(job_id: str) -> dict | None:
-    path= data_dir()/ "results"/ f"{job_id}.json"
-    if not path.exists():
+def _write_contexts(job_id: str, precomputed: dict) -> None:
+    """Store Q&A material beside the result, where /result polls never read it."""
+    path = _contexts_path(job_id)
+    path.parent.mkdir(parents= True, exist_ok = True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(dumps(precomputed))
+    os.replace(tmp, path)
+
+def _read_contexts(job_id: str) -> dict:
+    """A job's topic contexts and summary, empty when they were never computed."""
+    try:
+        return loads(_contexts_path(job_id).read_bytes() or b"{}")
+    except FileNotFoundError:
+        return {}
+
+def _count_pages(content: bytes) -> int:
+    """Page count from the PDF's page tree, without parsing any page."""
+    try:
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            return len(doc)
+    except Exception:
+        return 0
+
+def _load_result(job_id: str) -> dict | None:
+    """A job's result as stored, with clauses still in columns."""
+    try:
+        return loads(_result_path(job_id).read_bytes() or b"{}")
+    except FileNotFoundError:
         return None
-    return json.loads(path.read_text() or "{}")
+
+def _touch(job_id: str) -> None:
+    """Mark a job as recently used, so the janitor evicts it last."""
+    get_janitor().touch(job_id, _result_path(job_id))
+
+def _read_result(job_id: str) -> dict | None:
+    """A job's result with clause dicts, text included."""
+    _touch(job_id)
+    data = _load_result(job_id)
+    if data and "clauses" in data:
+        data["clauses"] = unpack_clauses(data["clauses"], _page_text(job_id))
+    return data
+
+def _page_text(job_id: str):
+    def page(page_num: int) -> str:
+        try:
+            return _open_text_store(job_id).page(page_num)
+        except (FileNotFoundError, ValueError):
+            return ""
+    return page
+
+@lru_cache(maxsize=16)
+def _open_text_store(job_id: str) -> TextStore:
+    return TextStore(text_store_path(job_id))
+
+def _read_document_text(job_id: str) -> str:
+    """Full extracted text of a job, read from its text store without touching the PDF."""
+    try:
+        return _open_text_store(job_id).full_text()
+    except (FileNotFoundError, ValueError):
+        return ""
+
+def _cacheable(result_data: dict) -> bool:
+    """Answers are cached only once the job's clauses are final."""
+    return result_data.get('status') in ('done', 'partial') and result_data.get('detection', {}).get('status') != 'pending'
 
 def __ann_path(job_id: str) -> Path:
-    return data_dir() / "annotations" / f"{job_id}.annoatations.json"
+    return job_file("annotations", job_id, f"{job_id}.annoatations.json")
 
 def _read_annotations(job_id: str) -> list[dict]:
     p = __ann_path(job_id)
@@ -113,30 +239,208 @@ def _rgba_to_components(rgba: str) -> tuple[float,float,float,float]:
 
 
 
+def _pretokenize(job_id: str, text: str) -> None:
+    """Tokenize the document once so Q&A only has to encode the question."""
+    llm_generator = get_llm_generator()
+    # Never wait on a hub download here: the one analysis thread would hold every queued job
+    if not text.strip() or not llm_generator.tokenizer_available():
+        return
+    try:
+        if llm_generator.load_tokenizer():
+            TokenWindows.build(llm_generator.tokenizer, text).save(token_windows_path(job_id))
+    except Exception as e:
+        print(f"Could not pre-tokenize job {job_id}: {e}")
+
+
+def _precompute_answers(job_id: str, text: str, clauses: list[dict], contexts: bool = True) -> dict:
+    """
+    Topic contexts (unless `contexts` is False) and the contract summary, so
+    /explain only looks them up. Stored with _write_contexts, not in the result.
+    With the contexts the job's BM25 index is built and saved, so the first
+    question loads it. The document index is built for this call only, so
+    nothing of the document stays cached.
+    """
+    precomputed = {"summary": summarize_clauses(clauses)}
+    if contexts and text.strip():
+        try:
+            doc = DocumentIndex(text)
+            precomputed["topic_contexts"] = get_llm_generator().topic_contexts(doc)
+            get_bm25_index(doc, job_id)
+        except Exception as e:
+            print(f"Could not precompute topic contexts for job {job_id}: {e}")
+    return precomputed
+
+
+class _JobBudget:
+    """Stop check run by stream_pdf before each page: cancellation, page limit, then wall clock."""
+
+    def __init__(self, cancel: Event):
+        self.cancel = cancel
+        self.deadline = time.monotonic() + JOB_TIME_BUDGET_SECONDS if JOB_TIME_BUDGET_SECONDS > 0 else None
+        self.pages = 0
+        self.reason = ""
+
+    def __call__(self) -> bool:
+        if self.cancel.is_set():
+            self.reason = "cancelled"
+        elif JOB_MAX_PAGES > 0 and self.pages >= JOB_MAX_PAGES:
+            self.reason = "page_limit"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "time_budget"
+        else:
+            self.pages += 1
+            return False
+        return True
+
+    def time_left(self) -> bool:
+        return self.deadline is None or time.monotonic() < self.deadline
+
+
+def _post_process(job_id: str, clauses: list[dict], budget: _JobBudget) -> None:
+    """
+    Pre-tokenize the stored text and precompute Q&A material within the job's budget.
+
+    The text is read from an uncached store and dropped on return. Token windows
+    and topic contexts cover the whole document, so peak memory here is O(document);
+    parsing before it is O(page).
+    """
+    store = TextStore(text_store_path(job_id))
+    try:
+        text = store.read_text()
+    finally:
+        store.close()
+    # Post-processing counts against the same budget; /explain builds what is skipped on demand
+    if budget.time_left():
+        _pretokenize(job_id, text)
+    _write_contexts(job_id, _precompute_answers(job_id, text, clauses, contexts=budget.time_left()))
+
+
 def _worker():
     while True:
         try:
-            job_id, pdf_path = _job_q.get()
-            _write_result(Result(job_id=job_id, status="processing",clauses=[]))
-            clauses= parse_pdf(str(pdf_path))
-            _write_result(Result(job_id=job_id, status="done",clauses=clauses))
+            job_id, pdf_path, doc_hash, profile = _job_q.get()
+            cancel = _job_cancel.get(job_id) or Event()
+            if cancel.is_set():
+                # Cancelled while queued; DELETE already wrote the result
+                continue
+            _write_result(Result(job_id=job_id, status="processing",clauses=[], doc_hash=doc_hash))
+            budget = _JobBudget(cancel)
+            with profiled(job_id, "analyze", profile):
+                # Pages go straight to the text store; only clauses stay in memory while parsing
+                with TextStoreWriter(text_store_path(job_id)) as writer:
+                    try:
+                        clauses, pages = stream_pdf(str(_upload_path(job_id)), writer.add_page, should_stop=budget,
+                                                    highlighted_path=str(_upload_path(job_id, highlighted=True)))
+                    except PdfOpenError as e:
+                        # An unreadable upload finishes with no clauses, as it always has
+                        print(f"Job {job_id}: {e}")
+                        clauses, pages = [], 0
+                if budget.reason == "cancelled" or cancel.is_set():
+                    _write_result(Result(job_id=job_id, status="cancelled", clauses=clauses, doc_hash=doc_hash,
+                                         stop_reason="cancelled", pages_scanned=pages))
+                    continue
+                _post_process(job_id, clauses, budget)
+            # Over budget: keep what the scanned pages gave rather than failing the job
+            result = Result(job_id=job_id, status="partial" if budget.reason else "done", clauses=clauses,
+                            doc_hash=doc_hash, detection=_initial_detection(clauses),
+                            stop_reason=budget.reason, pages_scanned=pages)
+            _write_result(result)
+            _queue_confirmation(result)
         except Exception as e:
-            _write_result(Result(job_id=job_id, status="error",clauses=[]))
+            _write_result(Result(job_id=job_id, status="error",clauses=[], doc_hash=doc_hash))
             print(f"Error processing job {job_id}: {e}")
         finally:
+            _job_cancel.pop(job_id, None)
             _job_q.task_done()
             time.sleep(0.01)
 
 
+def _initial_detection(clauses: list[dict]) -> dict:
+    if CLAUSE_CONFIRM_BUDGET_SECONDS <= 0 or not clauses:
+        return {"status": "regex"}
+    # Confirmation never loads the model; until /explain has loaded it the regex clauses stand
+    if not get_llm_generator().model_loaded():
+        return _unavailable_detection(clauses)
+    return {"status": "pending"}
+
+
+def _unavailable_detection(clauses: list[dict]) -> dict:
+    return {"status": "unavailable", "confirmed": 0, "rejected": 0, "unchecked": len(clauses), "model_seconds": 0.0}
+
+
+def _queue_confirmation(result: Result) -> None:
+    """Hand a written result's regex candidates to the model tier."""
+    if result.detection.get("status") == "pending":
+        _confirm_q.put(result.job_id)
+
+
+def _run_confirm_batch(questions: list[str], contexts: list[str]):
+    """One confirmation batch on the inference executor, waiting while /explain traffic fills it."""
+    generator = get_llm_generator()
+    while True:
+        try:
+            future = get_inference_executor().submit(generator.answer_pairs, questions, contexts)
+            break
+        except InferenceBusy:
+            time.sleep(0.5)
+    return future.result()
+
+
+def _confirm_job(job_id: str) -> None:
+    data = _read_result(job_id)
+    if not data or data.get('status') not in ('done', 'partial'):
+        return
+    candidates = data.get('clauses', [])
+    if not get_llm_generator().model_loaded():
+        # Never queue on the inference executor just to find there is no model
+        clauses, detection = candidates, _unavailable_detection(candidates)
+    else:
+        clauses, detection = confirm_clauses(candidates, _open_text_store(job_id).page, _run_confirm_batch)
+    current = _read_result(job_id)
+    # Redetected while the model was busy: those clauses have their own confirmation queued
+    if not current or current.get('clauses') != candidates:
+        return
+    _write_contexts(job_id, {**_read_contexts(job_id), "summary": summarize_clauses(clauses)})
+    _write_result(Result(**{**current, "clauses": clauses, "detection": detection}))
+
+
+def _janitor_worker():
+    while True:
+        try:
+            # Jobs queued or running here keep their files; other workers' jobs are seen by result status
+            if get_janitor().sweep(active=set(_job_cancel)):
+                # Evicted jobs may still have their text store mapped
+                _open_text_store.cache_clear()
+        except Exception as e:
+            print(f"Janitor sweep failed: {e}")
+        time.sleep(JANITOR_INTERVAL_SECONDS)
+
+
+def _confirm_worker():
+    while True:
+        job_id = _confirm_q.get()
+        try:
+            _confirm_job(job_id)
+        except Exception as e:
+            print(f"Error confirming clauses for job {job_id}: {e}")
+        finally:
+            _confirm_q.task_done()
+
+
 
 
 @app.get("/healthz")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics():
+    return {"answer_cache": get_answer_cache().stats(), "jobs_queued": _job_q.qsize(),
+            "storage": get_janitor().stats()}
+
 @app.post("/highlight_text/{job_id}")
 def highlight_text(job_id: str, req: HighlightTextRequest):
-    pdf_path = data_dir() / "uploads" / f"{job_id}.pdf"
+    pdf_path = _upload_path(job_id)
     if not pdf_path.exists():
         raise HTTPException(status_code=404, detail="Unknown job_id")
     try:
@@ -163,31 +467,145 @@ def highlight_text(job_id: str, req: HighlightTextRequest):
         doc.close()
 
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(pdf:UploadFile):
+async def analyze(pdf:UploadFile, profile: bool = Query(False), priority: int = Query(0, ge=-10, le=10)):
+    """
+    Queue a PDF for analysis.
+    
+    Jobs run shortest first by page count, with waiting jobs gaining ground
+    over time. priority moves a job ahead (positive) or back (negative) by
+    JOB_PRIORITY_STEP_PAGES pages per level.
+    """
     if pdf.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     job_id= str(uuid4())
-    base= data_dir()
-    uploads= base/ "uploads"
-    uploads.mkdir(parents= True, exist_ok= True)
-    dest= uploads/ f"{job_id}.pdf"
-    dest.write_bytes(await pdf.read())
-    _write_result(Result(job_id=job_id, status="queued",clauses=[]))
-    _job_q.put((job_id, dest))
-    return AnalyzeResponse(job_id=job_id, filename=pdf.filename, status="queued")
+    dest= _upload_path(job_id)
+    dest.parent.mkdir(parents= True, exist_ok= True)
+    content = await pdf.read()
+    dest.write_bytes(content)
+    doc_hash = hashlib.sha256(content).hexdigest()
+    pages = await run_in_threadpool(_count_pages, content)
+    _write_result(Result(job_id=job_id, status="queued",clauses=[], doc_hash=doc_hash))
+    _job_cancel[job_id] = Event()
+    _job_q.put(((job_id, dest, doc_hash, profile), pages, priority))
+    return AnalyzeResponse(job_id=job_id, filename=pdf.filename, status="queued", pages=pages)
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancel a queued or running analysis.
+    
+    A queued job is marked cancelled at once. A running job stops before its
+    next page and then reports "cancelled" from /result. Only the API worker
+    process that accepted the upload can cancel it.
+    """
+    data = _load_result(job_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    status = data.get('status')
+    if status not in ('queued', 'processing'):
+        raise HTTPException(status_code=409, detail=f"Job is already {status}")
+    cancel = _job_cancel.get(job_id)
+    if cancel is None:
+        # Cancellation flags live in the API worker process that accepted the upload
+        raise HTTPException(status_code=409, detail=f"Job is {status} in another worker process; "
+                                                    "send the cancellation to the worker that accepted it")
+    cancel.set()
+    if status == 'queued':
+        result = Result(job_id=job_id, status="cancelled", doc_hash=data.get("doc_hash", ""),
+                        stop_reason="cancelled")
+        _write_result(result)
+        return result
+    return data
+
+@app.put("/jobs/{job_id}/pin")
+def pin_job(job_id: str):
+    """Keep a job's files through janitor sweeps, e.g. while it is under review."""
+    if _load_result(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    get_janitor().pin(job_id)
+    return {"job_id": job_id, "pinned": True}
+
+@app.delete("/jobs/{job_id}/pin")
+def unpin_job(job_id: str):
+    get_janitor().unpin(job_id)
+    return {"job_id": job_id, "pinned": False}
+
+@app.get("/profile/{job_id}")
+def get_profile(job_id: str):
+    """Profiles captured for a job with ?profile=1 or PROFILE_JOBS, keyed by analyze/explain."""
+    profiles = read_profiles(job_id)
+    if not profiles:
+        raise HTTPException(status_code=404, detail="No profile for this job_id")
+    return {"job_id": job_id, "profiles": profiles}
 
 @app.get("/result/{job_id}")
-def get_result(job_id: str):
-    data = _read_result(job_id)
+def get_result(job_id: str, fields: str | None = Query(None), offset: int = Query(0, ge=0),
+               limit: int | None = Query(None, ge=1)):
+    """
+    A job's status and results.
+    
+    fields is a comma-separated list of result keys; "clauses.<name>" selects
+    clause attributes (type, page, start, end, score, text) and "clauses" all
+    of them. Clause text is read from the stored pages only when selected.
+    offset and limit page through the clauses; clause_count is their total.
+    """
+    try:
+        raw = _result_path(job_id).read_bytes()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    _touch(job_id)
+    # Queued and running jobs, what pollers mostly see, are served as stored
+    if raw.startswith(_NO_CLAUSES_PREFIX) and fields is None and offset == 0 and limit is None:
+        return Response(raw, media_type="application/json")
+    data = loads(raw or b"{}")
     if not data:
         raise HTTPException(status_code=404, detail="Unknown job_id")
-    return data
+    
+    clause_fields = CLAUSE_FIELDS
+    if fields is not None:
+        selected = {f.strip() for f in fields.split(",") if f.strip()}
+        nested = {f for f in selected if f.startswith("clauses.")}
+        if nested:
+            clause_fields = tuple(f for f in CLAUSE_FIELDS if f"clauses.{f}" in nested)
+            selected = (selected - nested) | {"clauses"}
+        unknown = (selected - set(Result.model_fields) - {"clause_count"}) | (nested - {f"clauses.{f}" for f in CLAUSE_FIELDS})
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        data = {k: v for k, v in data.items() if k in selected or k == "job_id"}
+    
+    if "clauses" in data:
+        data["clause_count"] = clause_count(data["clauses"])
+        data["clauses"] = unpack_clauses(data["clauses"], _page_text(job_id), clause_fields, offset, limit)
+    return FastJSONResponse(data)
+
+@app.post("/redetect/{job_id}")
+def redetect(job_id: str):
+    data = _load_result(job_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    status = data.get("status", "")
+    if status in ("queued", "processing"):
+        raise HTTPException(status_code=409, detail=f"Job is still {status}")
+    try:
+        store = _open_text_store(job_id)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=409, detail="No stored text for this job")
+    clauses = redetect_clauses(store)
+    _write_contexts(job_id, _precompute_answers(job_id, store.full_text(), clauses))
+    # Only the clauses change: a partial or cancelled job keeps why and where it stopped
+    result = Result(job_id=job_id, status=status, clauses=clauses, doc_hash=data.get("doc_hash", ""),
+                    detection=_initial_detection(clauses) if status in ("done", "partial") else {},
+                    stop_reason=data.get("stop_reason", ""), pages_scanned=data.get("pages_scanned", 0))
+    _write_result(result)
+    _queue_confirmation(result)
+    return result
 
 @app.get("/pdf/{job_id}")
 def get_pdf(job_id: str):
    
-    highlighted_pdf_path = data_dir() / "uploads" / f"{job_id}_highlighted.pdf"
-    original_pdf_path = data_dir() / "uploads" / f"{job_id}.pdf"
+    highlighted_pdf_path = _upload_path(job_id, highlighted=True)
+    original_pdf_path = _upload_path(job_id)
+    _touch(job_id)
     
     if highlighted_pdf_path.exists():
         print(f"📄 Serving highlighted PDF: {highlighted_pdf_path}")
@@ -219,13 +637,13 @@ app.add_middleware(
 
 @app.get("/annotations/{job_id}")
 def get_annotations(job_id: str):
-    if _read_result(job_id) is None:
+    if _load_result(job_id) is None:
         raise HTTPException(status_code=404, detail="Unknown job_id")
     return {"items": _read_annotations(job_id)}
 
 @app.post("/annotations/{job_id}")
 def post_annotations(job_id: str, request: AnnotationRequest):
-    if _read_result(job_id) is None:
+    if _load_result(job_id) is None:
         raise HTTPException(status_code=404, detail="Unknown job_id")
     items= _read_annotations(job_id)
     if request.action == "add" and request.annotation:
@@ -243,7 +661,7 @@ def post_annotations(job_id: str, request: AnnotationRequest):
 
 @app.post("/annotate_pdf/{job_id}")
 def annotate_pdf(job_id: str, payload: AnnotatePayload):
-    pdf_path = data_dir() / "uploads" / f"{job_id}.pdf"
+    pdf_path = _upload_path(job_id)
     if not pdf_path.exists():
         raise HTTPException(status_code=404, detail="Unknown job_id")
     try:
@@ -268,102 +686,372 @@ def annotate_pdf(job_id: str, payload: AnnotatePayload):
         doc.close()
     return {"status": "ok"}
 
-@app.post("/explain", response_model=QAResponse)
-def explain_clause(request: QARequest):
+@app.post("/explain", response_model=QAResponse | ExplainJobResponse)
+async def explain_clause(request: QARequest, async_mode: bool = Query(False, alias="async"),
+                         mode: str = Query("full"), profile: bool = Query(False)):
+    """
+    Answer a question about an analyzed contract.
+    
+    mode=full waits for the model (up to the deadline), mode=fast answers from
+    retrieval only, and mode=tiered returns the fast answer at once together with
+    an explain_id that receives the model answer when it is ready. profile=1
+    profiles the model path into data/profiles/<job_id>.explain.*.
+    """
+    if mode not in ("full", "fast", "tiered"):
+        raise HTTPException(status_code=400, detail="mode must be full, fast or tiered")
+    deadline = request.deadline_seconds or EXPLAIN_DEADLINE_SECONDS
+    
+    if mode == "fast":
+        return await run_in_threadpool(_rule_based_response, request)
+    
+    # Cached and model-free answers never queue behind inference
+    answered = await run_in_threadpool(lambda: _answer_without_model(request, _read_result(request.job_id)))
+    if answered is not None:
+        if async_mode and mode != "tiered":
+            job = get_explain_jobs().new(request, deadline)
+            get_explain_jobs().add(job)
+            job.finish("done", answered.model_dump())
+            return ExplainJobResponse(**job.to_dict())
+        return answered
+    
+    if mode == "tiered":
+        response = await run_in_threadpool(_rule_based_response, request)
+        try:
+            response.explain_id = _start_explain_job(request, deadline, profile).id
+        except InferenceBusy:
+            pass
+        return response
+    
+    if async_mode:
+        try:
+            job = _start_explain_job(request, deadline, profile)
+        except InferenceBusy:
+            raise HTTPException(status_code=503, detail="Inference queue is full")
+        return ExplainJobResponse(explain_id=job.id, status=job.status)
+    
+    stop = Event()
     try:
-        clause_type = parse_question(request.question)
-        
-        result_path = data_dir() / "results" / f"{request.job_id}.json"
-        if not result_path.exists():
+        future = get_inference_executor().submit(_explain, request, stop.is_set, profile)
+    except InferenceBusy:
+        return await run_in_threadpool(_rule_based_response, request)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline)
+    except asyncio.TimeoutError:
+        # Let the inference thread stop at its next check and answer from rules now
+        stop.set()
+        return await run_in_threadpool(_rule_based_response, request)
+
+@app.post("/explain_batch/{job_id}", response_model=ExplainBatchResponse)
+async def explain_batch(job_id: str, request: ExplainBatchRequest):
+    """Answer a checklist of questions about one contract, sharing document load and inference."""
+    deadline = request.deadline_seconds or EXPLAIN_DEADLINE_SECONDS
+    answers = await run_in_threadpool(_answer_batch_without_model, job_id, request.questions)
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    if pending:
+        questions = [request.questions[i] for i in pending]
+        stop = Event()
+        try:
+            future = get_inference_executor().submit(_explain_batch, job_id, questions, stop.is_set)
+            modelled = await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline)
+        except (InferenceBusy, asyncio.TimeoutError):
+            stop.set()
+            modelled = await run_in_threadpool(
+                lambda: [_rule_based_response(QARequest(question=q, job_id=job_id)) for q in questions]
+            )
+        for i, answer in zip(pending, modelled):
+            answers[i] = answer
+    return ExplainBatchResponse(job_id=job_id, answers=answers)
+
+def _answer_batch_without_model(job_id: str, questions: list[str]) -> list[QAResponse | None]:
+    result_data = _read_result(job_id)
+    return [_answer_without_model(QARequest(question=q, job_id=job_id), result_data) for q in questions]
+
+def _explain_batch(job_id: str, questions: list[str], should_stop=None) -> list[QAResponse]:
+    result_data = _read_result(job_id)
+    if not result_data:
+        return [QAResponse(answer="No contract analysis found. Please upload and analyze a contract first.")
+                for _ in questions]
+    
+    done = _cacheable(result_data)
+    cache = get_answer_cache()
+    doc_key = result_data.get('doc_hash') or job_id
+    answers: list[QAResponse | None] = [None] * len(questions)
+    
+    # General questions over the full text share one batched model run;
+    # everything else goes through the single-question path
+    document_text = _read_document_text(job_id) if result_data.get('clauses') else ""
+    batched = []
+    for i, question in enumerate(questions):
+        cached = cache.get(answer_key(doc_key, question, model_version())) if done else None
+        if cached is not None:
+            answers[i] = QAResponse(**cached)
+        elif document_text.strip() and parse_question(question) == 'GENERAL_QUESTION':
+            batched.append(i)
+        else:
+            answers[i] = _answer_question(QARequest(question=question, job_id=job_id), result_data, should_stop)
+    
+    if batched:
+        traces = []
+        texts = get_llm_generator().generate_explanations(
+            document_text, [questions[i] for i in batched], job_id, should_stop, traces,
+            _read_contexts(job_id).get('topic_contexts')
+        )
+        for i, answer, contexts_run in zip(batched, texts, traces or [[] for _ in batched]):
+            if not answer or answer == "No explanation available":
+                answer = "I can help you understand this contract. Try asking about specific clauses like 'What are the risks with the assignment clause?' or 'Tell me about the termination clause.'"
+            answers[i] = QAResponse(answer=answer, clause_text="", clause_type="General Question",
+                                    page=0, contexts_run=contexts_run)
+    
+    if done and not (should_stop and should_stop()):
+        for question, response in zip(questions, answers):
+            cache.put(answer_key(doc_key, question, model_version()), response.model_dump())
+    return answers
+
+def _start_explain_job(request: QARequest, deadline: float, profile: bool = False) -> ExplainJob:
+    job = get_explain_jobs().new(request, deadline)
+    job.future = get_inference_executor().submit(_run_explain_job, job, profile)
+    get_explain_jobs().add(job)
+    return job
+
+@app.get("/explain/{explain_id}", response_model=ExplainJobResponse)
+def get_explain_job(explain_id: str):
+    job = _poll_explain_job(explain_id)
+    return ExplainJobResponse(**job.to_dict())
+
+@app.get("/explain/{explain_id}/stream")
+async def stream_explain_job(explain_id: str):
+    if get_explain_jobs().get(explain_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown explain_id")
+    
+    async def events():
+        last = None
+        while True:
+            # Past the deadline polling builds the rule-based answer, which reads files
+            current = await run_in_threadpool(_poll_explain_job, explain_id)
+            if current.status != last:
+                last = current.status
+                yield f"data: {json.dumps(current.to_dict())}\n\n"
+            if current.finished is not None:
+                return
+            await asyncio.sleep(0.1)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.delete("/explain/{explain_id}", response_model=ExplainJobResponse)
+def cancel_explain_job(explain_id: str):
+    job = _poll_explain_job(explain_id)
+    if job.finished is None:
+        job.stop.set()
+        if job.future is not None:
+            job.future.cancel()
+        job.finish("cancelled", None)
+    return ExplainJobResponse(**job.to_dict())
+
+def _poll_explain_job(explain_id: str) -> ExplainJob:
+    job = get_explain_jobs().get(explain_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown explain_id")
+    if job.finished is None and time.monotonic() > job.deadline:
+        job.stop.set()
+        # Jobs started by another API worker carry their request as a dict
+        request = job.request if isinstance(job.request, QARequest) else QARequest(**job.request)
+        job.finish("done", _rule_based_response(request).model_dump())
+    return job
+
+def _run_explain_job(job: ExplainJob, profile: bool = False) -> None:
+    if job.should_stop():
+        return
+    job.start()
+    try:
+        response = _explain(job.request, job.should_stop, profile)
+        job.finish("done", response.model_dump())
+    except Exception as e:
+        job.finish("error", QAResponse(answer=f"Error processing question: {str(e)}").model_dump())
+
+def _rule_based_response(request: QARequest) -> QAResponse:
+    """Model-free answer used when inference is busy or misses its deadline."""
+    result_data = _read_result(request.job_id)
+    if not result_data:
+        return QAResponse(answer="No contract analysis found. Please upload and analyze a contract first.")
+    clause_type = parse_question(request.question)
+    detected_clauses = result_data.get('clauses', [])
+    answer = generate_rule_based_answer(clause_type, detected_clauses, request.question,
+                                        _read_document_text(request.job_id), request.job_id,
+                                        _read_contexts(request.job_id).get('summary'))
+    clause = retrieve_clause(clause_type, detected_clauses)
+    labels = {'GENERAL_CONTRACT': "General Contract", 'GENERAL_QUESTION': "General Question"}
+    return QAResponse(
+        answer=answer,
+        clause_text=clause['text'] if clause else "",
+        clause_type=labels.get(clause_type, clause_type),
+        page=clause['page'] if clause else 0,
+        tier="retrieval"
+    )
+
+def _needs_model(question: str, detected_clauses: list[dict]) -> bool:
+    """Whether _answer_question runs the Q&A model for this question."""
+    clause_type = parse_question(question)
+    if not clause_type or not detected_clauses:
+        return False
+    if clause_type == 'GENERAL_CONTRACT':
+        return not is_summary_question(question)
+    if clause_type == 'GENERAL_QUESTION':
+        return True
+    if get_policy_explanation(clause_type):
+        return False
+    clause = retrieve_clause(clause_type, detected_clauses)
+    return bool(clause and clause['text'])
+
+def _answer_without_model(request: QARequest, result_data: dict | None) -> QAResponse | None:
+    """
+    A cached or model-free answer, run on the request thread; None when the
+    question has to go to the inference executor. Answers built here are
+    tier "retrieval"; cached ones keep the tier they were stored with.
+    """
+    try:
+        if not result_data:
+            return QAResponse(answer="No contract analysis found. Please upload and analyze a contract first.",
+                              tier="retrieval")
+        cacheable = _cacheable(result_data)
+        key = answer_key(result_data.get('doc_hash') or request.job_id, request.question, model_version())
+        if cacheable:
+            cached = get_answer_cache().get(key)
+            if cached is not None:
+                return QAResponse(**cached)
+        if _needs_model(request.question, result_data.get('clauses', [])):
+            return None
+        response = _answer_question(request, result_data)
+        response.tier = "retrieval"
+        if cacheable:
+            get_answer_cache().put(key, response.model_dump())
+        return response
+    except Exception as e:
+        return QAResponse(answer=f"Error processing question: {str(e)}")
+
+def _explain(request: QARequest, should_stop=None, profile: bool = False) -> QAResponse:
+    with profiled(request.job_id, "explain", profile):
+        return _explain_cached(request, should_stop)
+
+def _explain_cached(request: QARequest, should_stop=None) -> QAResponse:
+    try:
+        result_data = _read_result(request.job_id)
+        if not result_data:
             return QAResponse(answer="No contract analysis found. Please upload and analyze a contract first.")
         
-        with open(result_path, 'r') as f:
-            result_data = json.load(f)
+        # Only finished analyses are cached; clauses change until detection completes
+        if not _cacheable(result_data):
+            return _answer_question(request, result_data, should_stop)
         
-        detected_clauses = result_data.get('clauses', [])
+        cache = get_answer_cache()
+        key = answer_key(result_data.get('doc_hash') or request.job_id, request.question, model_version())
+        cached = cache.get(key)
+        if cached is not None:
+            return QAResponse(**cached)
         
-        if clause_type == 'GENERAL_CONTRACT':
-            answer = generate_contract_summary(detected_clauses, request.question)
-            return QAResponse(
-                answer=answer,
-                clause_text="",
-                clause_type="General Contract",
-                page=0
-            )
-        
-       
-        elif clause_type == 'GENERAL_QUESTION':
-            if detected_clauses:
-             
+        response = _answer_question(request, result_data, should_stop)
+        # Answers cut short by a deadline or cancellation are not worth keeping
+        if not (should_stop and should_stop()):
+            cache.put(key, response.model_dump())
+        return response
+    
+    except Exception as e:
+        return QAResponse(answer=f"Error processing question: {str(e)}")
+
+
+def _answer_question(request: QARequest, result_data: dict, should_stop=None) -> QAResponse:
+    clause_type = parse_question(request.question)
+    
+    detected_clauses = result_data.get('clauses', [])
+    contexts_run = []
+    
+    if clause_type == 'GENERAL_CONTRACT':
+        answer = generate_contract_summary(detected_clauses, request.question, should_stop, contexts_run,
+                                           _read_contexts(request.job_id).get('summary'))
+        return QAResponse(
+            answer=answer,
+            clause_text="",
+            clause_type="General Contract",
+            page=0,
+            contexts_run=contexts_run
+        )
+    
+   
+    elif clause_type == 'GENERAL_QUESTION':
+        if detected_clauses:
+            # Retrieve from the whole document when it is available, not just clause snippets
+            prompt = _read_document_text(request.job_id)
+            topic_contexts = _read_contexts(request.job_id).get('topic_contexts')
+            if not prompt.strip():
+                topic_contexts = None
                 context = "Contract clauses detected:\n"
                 for clause in detected_clauses[:10]:  
                     context += f"- {clause.get('type', 'Unknown')}: {clause.get('text', '')[:100]}...\n"
-                
-                llm_generator = get_llm_generator()
                 prompt = f"{context}\n\nQuestion: {request.question}\n\nAnswer:"
-                answer = llm_generator.generate_explanation(prompt, request.question)
-                
-                if answer and answer != "No explanation available":
-                    return QAResponse(
-                        answer=answer,
-                        clause_text="",
-                        clause_type="General Question",
-                        page=0
-                    )
-                else:
-                    return QAResponse(
-                        answer="I can help you understand this contract. Try asking about specific clauses like 'What are the risks with the assignment clause?' or 'Tell me about the termination clause.'",
-                        clause_text="",
-                        clause_type="General Question",
-                        page=0
-                    )
+            
+            llm_generator = get_llm_generator()
+            answer = llm_generator.generate_explanation(prompt, request.question, request.job_id, should_stop,
+                                                        contexts_run, topic_contexts)
+            
+            if answer and answer != "No explanation available":
+                return QAResponse(
+                    answer=answer,
+                    clause_text="",
+                    clause_type="General Question",
+                    page=0,
+                    contexts_run=contexts_run
+                )
             else:
                 return QAResponse(
-                    answer="No contract clauses were detected. Please ensure the contract was properly analyzed.",
+                    answer="I can help you understand this contract. Try asking about specific clauses like 'What are the risks with the assignment clause?' or 'Tell me about the termination clause.'",
                     clause_text="",
                     clause_type="General Question",
                     page=0
                 )
-        
-        elif clause_type:
-            clause = retrieve_clause(clause_type, detected_clauses)
-            policy = get_policy_explanation(clause_type)
-            
-            if not policy:
-                
-                clause_text = clause['text'] if clause else ""
-                if clause_text:
-                    llm_generator = get_llm_generator()
-                    llm_answer = llm_generator.generate_explanation(clause_text, request.question)
-                    if llm_answer != "No explanation available":
-                        answer = f"LLM Analysis: {llm_answer}"
-                    else:
-                        answer = f"No risk information available for {clause_type} clauses."
-                else:
-                    answer = f"No {clause_type} clause found in the contract."
-            else:
-                clause_text = clause['text'] if clause else ""
-                answer = generate_answer(clause_text, policy, request.question)
-            
-            clause_page = clause['page'] if clause else 0
-            
-            return QAResponse(
-                answer=answer,
-                clause_text=clause_text,
-                clause_type=clause_type,
-                page=clause_page
-            )
-        
         else:
             return QAResponse(
-                answer="I can help you understand this contract. Try asking about specific clauses or general questions like 'What is this contract about?'",
+                answer="No contract clauses were detected. Please ensure the contract was properly analyzed.",
                 clause_text="",
-                clause_type="Unknown",
+                clause_type="General Question",
                 page=0
             )
+    
+    elif clause_type:
+        clause = retrieve_clause(clause_type, detected_clauses)
+        policy = get_policy_explanation(clause_type)
+        
+        if not policy:
             
-    except Exception as e:
-        return QAResponse(answer=f"Error processing question: {str(e)}")
+            clause_text = clause['text'] if clause else ""
+            if clause_text:
+                llm_generator = get_llm_generator()
+                llm_answer = llm_generator.generate_explanation(clause_text, request.question, request.job_id, should_stop, contexts_run)
+                if llm_answer != "No explanation available":
+                    answer = f"LLM Analysis: {llm_answer}"
+                else:
+                    answer = f"No risk information available for {clause_type} clauses."
+            else:
+                answer = f"No {clause_type} clause found in the contract."
+        else:
+            clause_text = clause['text'] if clause else ""
+            answer = generate_answer(clause_text, policy, request.question)
+        
+        clause_page = clause['page'] if clause else 0
+        
+        return QAResponse(
+            answer=answer,
+            clause_text=clause_text,
+            clause_type=clause_type,
+            page=clause_page,
+            contexts_run=contexts_run
+        )
+    
+    else:
+        return QAResponse(
+            answer="I can help you understand this contract. Try asking about specific clauses or general questions like 'What is this contract about?'",
+            clause_text="",
+            clause_type="Unknown",
+            page=0
+        )
 
 
 @app.on_event("startup")
@@ -372,6 +1060,10 @@ def _start_worker():
     print("RoBERTa legal Q&A model will load on first use")
     t= Thread(target= _worker, daemon= True)
     t.start()
+    Thread(target=_confirm_worker, daemon=True).start()
+    # With no TTL and no byte budget there is nothing to sweep; skip scanning DATA_DIR
+    if get_janitor().enabled:
+        Thread(target=_janitor_worker, daemon=True).start()
 
 
 
@@ -0,0 +1,45 @@
+##One-time snapshot of the Q&A model into a local safetensors directory
+import argparse
+from pathlib import Path
+
+from app.llm_generator import QA_MODEL_NAME
+
+
+def snapshot_model(output_dir: str, model_name: str = QA_MODEL_NAME) -> Path:
+    """
+    Download the Q&A model and tokenizer once and save them for offline use.
+
+    Args:
+        output_dir: Directory to write the snapshot into
+        model_name: Hub model id to snapshot
+
+    Returns:
+        Path of the written snapshot directory
+    """
+    from transformers import AutoTokenizer, AutoModelForQuestionAnswering
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    tokenizer.save_pretrained(str(out))
+
+    model = AutoModelForQuestionAnswering.from_pretrained(model_name)
+    # safetensors can be memory-mapped on load, unlike pickled .bin weights
+    model.save_pretrained(str(out), safe_serialization=True)
+
+    print(f"Saved {model_name} snapshot to {out}")
+    print(f"Set QA_MODEL_DIR={out} to load it offline")
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Snapshot the CLAWS Q&A model for offline loading")
+    ap.add_argument("output_dir", help="directory to write the snapshot into")
+    ap.add_argument("--model", default=QA_MODEL_NAME, help=f"hub model id (default: {QA_MODEL_NAME})")
+    args = ap.parse_args(argv)
+    snapshot_model(args.output_dir, args.model)
+
+
+if __name__ == "__main__":
+    main()
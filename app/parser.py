@@ -1,8 +1,10 @@
 ##PDF parser using pattern-based legal clause detection
 import fitz
-from typing import List
 import re
 
+class PdfOpenError(Exception):
+    """Raised by stream_pdf when the file cannot be opened as a PDF."""
+
 def parse_pdf(pdf_path: str) -> list[dict]:
     """
     Parse PDF using pattern-based legal clause detection.
@@ -11,31 +13,90 @@ def parse_pdf(pdf_path: str) -> list[dict]:
         pdf_path: Path to the PDF file
         
     Returns:
-        List of detected clauses with type, text, page, bbox, and score
+        List of detected clauses with type, text, page, start/end page offsets, and score
+        (bbox is always the [0, 0, 0, 0] placeholder)
     """
     try:
-        doc = fitz.open(pdf_path)
-    except Exception:
+        clauses, _ = stream_pdf(pdf_path, lambda text: None)
+    except PdfOpenError:
         return []
+    return clauses
 
-    full_text = ""
-    page_data = []
+def analyze_pdf(pdf_path: str, highlight: bool = True,
+                highlighted_path: str | None = None) -> tuple[list[dict], list[str]]:
+    """
+    Parse PDF and also return the extracted text of each page.
     
-    for page_index, page in enumerate(doc, start=1):
+    Args:
+        pdf_path: Path to the PDF file
+        highlight: Whether to write a copy of the PDF with the clauses highlighted
+        highlighted_path: Where to write it (default: next to the PDF, as `<name>_highlighted.pdf`)
+        
+    Returns:
+        Tuple of (detected clauses, page texts in page order)
+        
+    Raises:
+        PdfOpenError: If the file cannot be opened as a PDF
+    """
+    page_texts = []
+    clauses, _ = stream_pdf(pdf_path, page_texts.append, highlight, highlighted_path)
+    return clauses, page_texts
+
+def stream_pdf(pdf_path: str, page_sink, highlight: bool = True,
+               highlighted_path: str | None = None, should_stop=None) -> tuple[list[dict], int]:
+    """
+    Parse PDF one page at a time, in memory bounded by a single page.
+    
+    Each page's text is handed to `page_sink` and clause detection runs on it
+    straight away, so neither the page object nor its text outlives its turn.
+    Only the clauses found so far are kept.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        page_sink: Called with each page's text in page order ("" if extraction fails)
+        highlight: Whether to write a copy of the PDF with the clauses highlighted
+        highlighted_path: Where to write it (default: next to the PDF, as `<name>_highlighted.pdf`)
+        should_stop: Checked before each page; when it returns True the remaining
+            pages are skipped and the clauses found so far are kept
+        
+    Returns:
+        Tuple of (detected clauses, pages scanned)
+        
+    Raises:
+        PdfOpenError: If the file cannot be opened as a PDF
+    """
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        raise PdfOpenError(f"Cannot open {pdf_path}: {e}") from e
+
+    detected_clauses = []
+    page_count = 0
+    has_text = False
+    
+    for page_index in range(1, len(doc) + 1):
+        if should_stop and should_stop():
+            break
+        page_count = page_index
         try:
-            page_text = page.get_text()
-            full_text += page_text + "\n"
-            page_data.append((page_index, page, page_text))
+            page_text = doc[page_index - 1].get_text()
         except Exception:
+            page_sink("")
             continue
+        page_sink(page_text)
+        
+        if not has_text and page_text.strip():
+            has_text = True
+            # Use pattern-based detection
+            print("Using pattern-based clause detection...")
+        # Detection keeps the first MAX_CLAUSES in page order; later pages cannot add any
+        if has_text and len(detected_clauses) < MAX_CLAUSES:
+            detected_clauses.extend(_detect_legal_clauses_fallback(page_text, [(page_index, None, page_text)]))
     
-    if not full_text.strip():
+    detected_clauses = detected_clauses[:MAX_CLAUSES]
+    if not has_text or not highlight:
         doc.close()
-        return []
-    
-    # Use pattern-based detection
-    print("Using pattern-based clause detection...")
-    detected_clauses = _detect_legal_clauses_fallback(full_text, page_data)
+        return detected_clauses, page_count
     
     # Add highlights to PDF
     for clause in detected_clauses:
@@ -45,14 +106,31 @@ def parse_pdf(pdf_path: str) -> list[dict]:
             print(f"Could not highlight {clause['type']}: {e}")
     
     try:
-        highlighted_pdf_path = pdf_path.replace('.pdf', '_highlighted.pdf')
+        highlighted_pdf_path = highlighted_path or pdf_path.replace('.pdf', '_highlighted.pdf')
         doc.save(highlighted_pdf_path)
         print(f"Highlighted PDF saved to: {highlighted_pdf_path}")
     except Exception as e:
         print(f"Failed to save highlighted PDF: {e}")
     
     doc.close()
-    return detected_clauses
+    return detected_clauses, page_count
+
+def redetect_clauses(store) -> list[dict]:
+    """
+    Re-run clause detection on a job's stored text, without reopening the PDF.
+    
+    Args:
+        store: TextStore holding the job's extracted page text
+        
+    Returns:
+        List of detected clauses with type, text, page, start/end page offsets, and score
+        (bbox is always the [0, 0, 0, 0] placeholder)
+    """
+    page_data = store.page_data()
+    full_text = "".join(page_text + "\n" for _, _, page_text in page_data)
+    if not full_text.strip():
+        return []
+    return _detect_legal_clauses_fallback(full_text, page_data)
 
 def _get_text_bbox(doc, page_num, text):
     """Get bounding box for text on a specific page."""
@@ -86,51 +164,60 @@ def _highlight_clause_in_pdf(doc, page_num, text, clause_type):
     except Exception as e:
         print(f"Could not highlight {clause_type} on page {page_num}: {e}")
 
+# Most clauses a document yields, the first ones in page order
+MAX_CLAUSES = 30
+
+# Regex patterns per clause type; each page yields at most one candidate per type
+LEGAL_PATTERNS = {
+    "Document Name": [r"(?i)(agreement|contract|license|terms)"],
+    "Parties": [r"(?i)(party|parties|company|corporation)"],
+    "Effective Date": [r"(?i)(effective\s+date|commencement)"],
+    "Governing Law": [r"(?i)(governing\s+law|jurisdiction)"],
+    "Termination": [r"(?i)(termination|expiration)"],
+    "Confidentiality": [r"(?i)(confidential|proprietary)"],
+    "Anti-Assignment": [r"(?i)(assignment|transfer)"],
+    "Indemnification": [r"(?i)(indemnify|hold\s+harmless)"],
+    "Force Majeure": [r"(?i)(force\s+majeure|act\s+of\s+god)"],
+    "Dispute Resolution": [r"(?i)(dispute|arbitration)"],
+    "Severability": [r"(?i)(severability|invalid)"],
+    "Entire Agreement": [r"(?i)(entire\s+agreement)"],
+    "Amendment": [r"(?i)(amendment|modification)"],
+    "Waiver": [r"(?i)(waiver|waive)"],
+    "Notices": [r"(?i)(notice|notification)"],
+    "Assignment": [r"(?i)(assign|assignment)"],
+    "Insurance": [r"(?i)(insurance|coverage)"]
+}
+
+def clause_text(page_text: str, start: int, end: int) -> str:
+    """A clause's display text: its span of the page with whitespace collapsed."""
+    return re.sub(r'\s+', ' ', page_text[start:end].strip())
+
 def _detect_legal_clauses_fallback(full_text, page_data):
     """Fallback legal clause detection using patterns."""
     clauses = []
     
-    legal_patterns = {
-        "Document Name": [r"(?i)(agreement|contract|license|terms)"],
-        "Parties": [r"(?i)(party|parties|company|corporation)"],
-        "Effective Date": [r"(?i)(effective\s+date|commencement)"],
-        "Governing Law": [r"(?i)(governing\s+law|jurisdiction)"],
-        "Termination": [r"(?i)(termination|expiration)"],
-        "Confidentiality": [r"(?i)(confidential|proprietary)"],
-        "Anti-Assignment": [r"(?i)(assignment|transfer)"],
-        "Indemnification": [r"(?i)(indemnify|hold\s+harmless)"],
-        "Force Majeure": [r"(?i)(force\s+majeure|act\s+of\s+god)"],
-        "Dispute Resolution": [r"(?i)(dispute|arbitration)"],
-        "Severability": [r"(?i)(severability|invalid)"],
-        "Entire Agreement": [r"(?i)(entire\s+agreement)"],
-        "Amendment": [r"(?i)(amendment|modification)"],
-        "Waiver": [r"(?i)(waiver|waive)"],
-        "Notices": [r"(?i)(notice|notification)"],
-        "Assignment": [r"(?i)(assign|assignment)"],
-        "Insurance": [r"(?i)(insurance|coverage)"]
-    }
-    
     for page_index, page_obj, page_text in page_data:
         print(f"Fallback analyzing page {page_index} for legal clauses...")
         
-        for clause_type, patterns in legal_patterns.items():
+        for clause_type, patterns in LEGAL_PATTERNS.items():
             for pattern in patterns:
                 matches = re.finditer(pattern, page_text, re.IGNORECASE | re.MULTILINE)
                 for match in matches:
                     start = max(0, match.start() - 50)
                     end = min(len(page_text), match.end() + 50)
-                    context = page_text[start:end].strip()
-                    context = re.sub(r'\s+', ' ', context)
+                    context = clause_text(page_text, start, end)
                     
                     if len(context) > 20:
                         clauses.append({
                             "type": clause_type,
                             "text": context,
                             "page": page_index,
+                            "start": start,
+                            "end": end,
                             "bbox": [0, 0, 0, 0],
                             "score": 0.8
                         })
                         print(f"Fallback Found {clause_type}: {context[:50]}...")
                         break
     
-    return clauses[:30]
+    return clauses[:MAX_CLAUSES]
@@ -0,0 +1,130 @@
+##Opt-in cProfile + tracemalloc capture for a single job or question
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import nullcontext
+from pathlib import Path
+from threading import Lock
+
+from app.storage import job_dirs, job_file
+
+# Profile every job and question, not just requests sent with ?profile=1
+PROFILE_JOBS = os.environ.get("PROFILE_JOBS", "").lower() in ("1", "true", "yes")
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 20
+
+# Job ids become file names; anything but uuid-like ids is never profiled
+_SAFE_ID = re.compile(r"[\w-]+")
+
+# tracemalloc is process-wide; it runs while at least one profile is open
+_tracing_lock = Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def profiled(job_id: str, label: str, enabled: bool = False):
+    """
+    Context manager profiling its block when `enabled` or PROFILE_JOBS is set.
+
+    Writes `<job_id>.<label>.prof` (pstats), `.txt` (top functions) and `.json`
+    (summary with the top allocations) under DATA_DIR/profiles. When profiling
+    is off this is a plain nullcontext. A later profile of the same job and
+    label replaces the earlier one.
+    """
+    if not (enabled or PROFILE_JOBS) or not _SAFE_ID.fullmatch(job_id):
+        return nullcontext()
+    return _Profile(job_id, label)
+
+
+class _Profile:
+    def __init__(self, job_id: str, label: str):
+        self.job_id = job_id
+        self.label = label
+        self.profiler = cProfile.Profile()
+
+    def __enter__(self):
+        global _tracing_users, _started_tracing
+        with _tracing_lock:
+            if _tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            else:
+                tracemalloc.reset_peak()
+            _tracing_users += 1
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global _tracing_users, _started_tracing
+        self.profiler.disable()
+        wall = time.perf_counter() - self.started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+        try:
+            self._dump(wall, peak, snapshot)
+        except Exception as e:
+            print(f"Could not write profile for {self.job_id}: {e}")
+        return False
+
+    def _dump(self, wall: float, peak: int, snapshot) -> None:
+        self.profiler.dump_stats(str(self._path(".prof")))
+
+        text = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=text)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        self._path(".txt").write_text(text.getvalue())
+
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        summary = {
+            "job_id": self.job_id,
+            "label": self.label,
+            "created": time.time(),
+            "wall_seconds": round(wall, 4),
+            "peak_bytes": peak,
+            "top_functions": [
+                {
+                    "function": f"{os.path.basename(filename)}:{line}({name})",
+                    "calls": calls,
+                    "tottime": round(tottime, 4),
+                    "cumtime": round(cumtime, 4),
+                }
+                for (filename, line, name), (_, calls, tottime, cumtime, _) in functions[:PROFILE_TOP_FUNCTIONS]
+            ],
+            "top_allocations": [
+                {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+            ],
+        }
+        self._path(".json").write_text(json.dumps(summary, indent=2))
+
+    def _path(self, suffix: str) -> Path:
+        path = job_file("profiles", self.job_id, f"{self.job_id}.{self.label}{suffix}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+def read_profiles(job_id: str) -> dict[str, dict]:
+    """Summaries written for a job, keyed by label ("analyze", "explain")."""
+    if not _SAFE_ID.fullmatch(job_id):
+        return {}
+    summaries = {}
+    # The configured layout's directory comes first in job_dirs; read it last so it wins
+    paths = [path for out in reversed(job_dirs("profiles", job_id)) for path in sorted(out.glob(f"{job_id}.*.json"))]
+    for path in paths:
+        try:
+            summary = json.loads(path.read_text())
+        except ValueError:
+            continue
+        summaries[summary.get("label", path.stem.split(".", 1)[-1])] = summary
+    return summaries
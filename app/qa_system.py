@@ -1,36 +1,20 @@
-from app.knowledge_base import LEGAL_KNOWLEDGE_BASE
+from app.knowledge_base import LEGAL_KNOWLEDGE_BASE, QUESTION_CLAUSE_KEYWORDS
+from app.keyword_matcher import get_keyword_matcher
+from app.doc_index import get_document_index
+from app.retrieval import build_query, get_bm25_index
 from app.llm_generator import get_llm_generator
 import re
 
 def parse_question(question):
-    question_lower = question.lower()
+    hits = get_keyword_matcher().scan(question.lower())
     
-   
-    general_patterns = [
-        'what is the contract about', 'what is this contract', 'contract about', 'contract summary',
-        'explain the contract', 'what are the risks', 'contract risks', 'overall risks',
-        'what does this contract', 'contract purpose', 'contract overview', 'contract details',
-        'what is this agreement', 'agreement about', 'what does the agreement', 'agreement summary',
-        'tell me about this contract', 'describe the contract', 'contract analysis'
-    ]
-    
-    if any(phrase in question_lower for phrase in general_patterns):
+    if hits.get('question:GENERAL_CONTRACT'):
         return 'GENERAL_CONTRACT'
     
-    if any(word in question_lower for word in ['assignment', 'assign', 'transfer']):
-        return 'Anti-Assignment'
-    elif any(word in question_lower for word in ['governing', 'law', 'jurisdiction']):
-        return 'Governing Law'
-    elif any(word in question_lower for word in ['termination', 'terminate', 'end']):
-        return 'Termination'
-    elif any(word in question_lower for word in ['confidential', 'proprietary', 'secret']):
-        return 'Confidentiality'
-    elif any(word in question_lower for word in ['indemnify', 'indemnification', 'liability']):
-        return 'Indemnification'
-    elif any(word in question_lower for word in ['force majeure', 'act of god', 'disaster']):
-        return 'Force Majeure'
-    else:
-        return 'GENERAL_QUESTION'  
+    for clause_type in QUESTION_CLAUSE_KEYWORDS:
+        if hits.get(f'question:{clause_type}'):
+            return clause_type
+    return 'GENERAL_QUESTION'  
 
 def get_policy_explanation(clause_type):
     if clause_type in LEGAL_KNOWLEDGE_BASE:
@@ -43,7 +27,20 @@ def retrieve_clause(clause_type, detected_clauses):
             return clause
     return None
 
-def generate_contract_summary(detected_clauses, question):
+def summarize_clauses(detected_clauses):
+    """Rule-based GENERAL_CONTRACT summary; the analysis worker stores it with the result."""
+    if not detected_clauses:
+        return "No contract clauses were detected. Please ensure the contract was properly analyzed."
+    clause_groups = {}
+    for clause in detected_clauses:
+        clause_groups.setdefault(clause.get('type', 'Other'), []).append(clause)
+    return _generate_rule_based_summary(clause_groups)
+
+def is_summary_question(question):
+    """Questions generate_contract_summary answers from the stored summary, without the model."""
+    return question.lower().strip() in ['what is the contract about', 'what is this contract about', 'contract summary']
+
+def generate_contract_summary(detected_clauses, question, should_stop=None, trace=None, summary=None):
     """Generate a comprehensive contract summary using detected clauses and LLM."""
     if not detected_clauses:
         return "No contract clauses were detected. Please ensure the contract was properly analyzed."
@@ -55,8 +52,8 @@ def generate_contract_summary(detected_clauses, question):
             clause_groups[clause_type] = []
         clause_groups[clause_type].append(clause)
     
-    if question.lower().strip() in ['what is the contract about', 'what is this contract about', 'contract summary']:
-        return _generate_rule_based_summary(clause_groups)
+    if is_summary_question(question):
+        return summary or _generate_rule_based_summary(clause_groups)
     
     context = "Contract Analysis Summary:\n\n"
     context += f"Total clauses detected: {len(detected_clauses)}\n\n"
@@ -73,7 +70,7 @@ def generate_contract_summary(detected_clauses, question):
     prompt = f"{context}\n\nQuestion: {question}\n\nPlease provide a comprehensive answer based on the contract analysis above:"
     
     try:
-        llm_answer = llm_generator.generate_explanation(prompt, question)
+        llm_answer = llm_generator.generate_explanation(prompt, question, should_stop=should_stop, trace=trace)
         if llm_answer and llm_answer != "No explanation available" and len(llm_answer.strip()) > 20:
             return llm_answer
     except Exception as e:
@@ -81,6 +78,29 @@ def generate_contract_summary(detected_clauses, question):
     
     return _generate_fallback_summary(clause_groups, question)
 
+def generate_rule_based_answer(clause_type, detected_clauses, question, document_text="", job_id=None,
+                               summary=None):
+    """
+    Answer without the Q&A model, from rules and BM25 retrieval only.
+    
+    Used for the fast answer tier and when inference is busy or past its deadline.
+    `summary` is the GENERAL_CONTRACT summary stored with the result, if any.
+    """
+    if clause_type == 'GENERAL_CONTRACT':
+        return summary or summarize_clauses(detected_clauses)
+    
+    if clause_type in LEGAL_KNOWLEDGE_BASE:
+        clause = retrieve_clause(clause_type, detected_clauses)
+        return generate_answer(clause['text'] if clause else "", get_policy_explanation(clause_type), question)
+    
+    if document_text:
+        doc = get_document_index(document_text, job_id)
+        hits = get_bm25_index(doc, job_id).search(build_query(question), k=3)
+        if hits:
+            return f"**Answer:** {doc.join(i for score, i in hits)}\n\n*Source: Retrieval*"
+    
+    return "I can help you understand this contract. Try asking about specific clauses like 'What are the risks with the assignment clause?' or 'Tell me about the termination clause.'"
+
 def _generate_rule_based_summary(clause_groups):
     """Generate a simple, reliable summary using rule-based approach."""
     summary = "**Contract Summary**\n\n"
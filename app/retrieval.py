@@ -0,0 +1,245 @@
+##BM25 sentence retrieval over a per-document inverted index
+import hashlib
+import heapq
+import math
+import os
+import re
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from app.doc_index import DocumentIndex
+from app.knowledge_base import LEGAL_TERMS
+from app.keyword_matcher import get_keyword_matcher
+from app.storage import job_file
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Weight of terms pulled in through LEGAL_TERMS relative to the question's own words
+EXPANSION_WEIGHT = 0.5
+
+# Retrieve-then-read windows: whitespace tokens per chunk, overlap between chunks,
+# and how many chunks are handed to the Q&A model per question
+QA_CHUNK_WORDS = int(os.environ.get("QA_CHUNK_WORDS", "200"))
+QA_CHUNK_OVERLAP = int(os.environ.get("QA_CHUNK_OVERLAP", "50"))
+QA_TOP_CHUNKS = int(os.environ.get("QA_TOP_CHUNKS", "3"))
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()
+
+
+class BM25Index:
+    """
+    Inverted index over the long sentences of a DocumentIndex, scored with BM25.
+
+    Postings map a term to (sentence id, term frequency) pairs, so a query only
+    touches the sentences that contain one of its terms.
+    """
+
+    def __init__(self, postings: dict, doc_len: dict, text_hash: str = ""):
+        self.postings = postings
+        self.doc_len = doc_len
+        self.text_hash = text_hash
+        self.n = len(doc_len)
+        self.avgdl = (sum(doc_len.values()) / self.n) if self.n else 0.0
+
+    @classmethod
+    def build(cls, doc: DocumentIndex) -> "BM25Index":
+        return cls.from_terms(((i, tokenize(doc.lowered[i])) for i in doc.long_ids), text_hash(doc.text))
+
+    @classmethod
+    def from_terms(cls, items, text_hash: str = "") -> "BM25Index":
+        """Index (id, terms) pairs, e.g. sentences or chunks of a document."""
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_len: dict[int, int] = {}
+        for i, terms in items:
+            doc_len[i] = len(terms)
+            counts: dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((i, tf))
+        return cls(postings, doc_len, text_hash)
+
+    def search(self, query: dict[str, float], k: int = 8) -> list[tuple[float, int]]:
+        """Top-k (score, sentence id) pairs for a weighted query, best first."""
+        if not self.n:
+            return []
+        scores: dict[int, float] = {}
+        for term, weight in query.items():
+            hits = self.postings.get(term)
+            if not hits:
+                continue
+            idf = math.log(1 + (self.n - len(hits) + 0.5) / (len(hits) + 0.5))
+            for i, tf in hits:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[i] / self.avgdl)
+                scores[i] = scores.get(i, 0.0) + weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return heapq.nlargest(k, ((score, i) for i, score in scores.items()))
+
+    def save(self, path: Path) -> None:
+        """
+        Write the index as integer columns: postings of every term back to back,
+        with each term's start offset, and the terms as one newline-joined string.
+        """
+        terms = list(self.postings)
+        starts = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self.postings[term]) for term in terms], out=starts[1:])
+        hits = [hit for term in terms for hit in self.postings[term]]
+        pairs = np.asarray(hits, dtype=np.int32).reshape(-1, 2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8), starts=starts,
+                ids=pairs[:, 0], tfs=pairs[:, 1],
+                doc_ids=np.fromiter(self.doc_len.keys(), dtype=np.int32, count=len(self.doc_len)),
+                doc_lens=np.fromiter(self.doc_len.values(), dtype=np.int32, count=len(self.doc_len)),
+                text_hash=np.array(self.text_hash),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as data:
+            starts = data["starts"]
+            terms = data["terms"].tobytes().decode("utf-8").split("\n") if len(starts) > 1 else []
+            postings = _PostingColumns(terms, starts, data["ids"], data["tfs"])
+            doc_len = dict(zip(data["doc_ids"].tolist(), data["doc_lens"].tolist()))
+            text_hash = str(data["text_hash"])
+        return cls(postings, doc_len, text_hash)
+
+
+class _PostingColumns(Mapping):
+    """Postings of a saved BM25Index, decoded per term on first lookup, since a query touches few terms."""
+
+    def __init__(self, terms: list[str], starts: np.ndarray, ids: np.ndarray, tfs: np.ndarray):
+        self._rows = {term: t for t, term in enumerate(terms)}
+        self._starts, self._ids, self._tfs = starts, ids, tfs
+        self._decoded: dict[str, list[tuple[int, int]]] = {}
+
+    def __getitem__(self, term: str) -> list[tuple[int, int]]:
+        hits = self._decoded.get(term)
+        if hits is None:
+            t = self._rows[term]
+            start, end = self._starts[t], self._starts[t + 1]
+            hits = list(zip(self._ids[start:end].tolist(), self._tfs[start:end].tolist()))
+            self._decoded[term] = hits
+        return hits
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def build_query(question: str) -> dict[str, float]:
+    """Question terms plus their LEGAL_TERMS expansions, as term -> weight."""
+    question_lower = question.lower()
+    query: dict[str, float] = {}
+
+    hits = get_keyword_matcher().scan(question_lower)
+    for term, variations in LEGAL_TERMS.items():
+        if hits.get(f"legal:{term}"):
+            for v in variations:
+                for token in tokenize(v):
+                    query[token] = max(query.get(token, 0.0), EXPANSION_WEIGHT)
+
+    if "what is" in question_lower or "about" in question_lower:
+        for term in ['agreement', 'contract', 'document', 'terms', 'conditions', 'purpose']:
+            query[term] = max(query.get(term, 0.0), EXPANSION_WEIGHT)
+
+    for term in tokenize(question_lower):
+        if len(term) > 2:
+            query[term] = 1.0
+    return query
+
+
+def bm25_index_path(job_id: str) -> Path:
+    return job_file("results", job_id, f"{job_id}.bm25.npz")
+
+
+def get_bm25_index(doc: DocumentIndex, job_id: str | None = None) -> BM25Index:
+    """
+    BM25 index for a document, built once and persisted next to the job result.
+
+    The analysis worker builds it when a job finishes, so questions only load
+    `results/<job_id>.bm25.npz`; jobs without one build and write it here.
+    The index is kept on the DocumentIndex so repeated questions reuse it.
+    """
+    if doc.bm25 is not None:
+        return doc.bm25
+
+    index = None
+    if job_id:
+        path = bm25_index_path(job_id)
+        if path.exists():
+            try:
+                stored = BM25Index.load(path)
+                if stored.text_hash == text_hash(doc.text):
+                    index = stored
+            except Exception as e:
+                print(f"Could not load BM25 index for {job_id}: {e}")
+
+    if index is None:
+        index = BM25Index.build(doc)
+        if job_id:
+            try:
+                index.save(bm25_index_path(job_id))
+            except Exception as e:
+                print(f"Could not save BM25 index for {job_id}: {e}")
+
+    doc.bm25 = index
+    return index
+
+
+class ChunkIndex:
+    """
+    Overlapping fixed-size windows over the whole document, indexed with BM25.
+
+    Each chunk is sized to fit a single Q&A model pass, so reading the top-k
+    chunks costs the same whatever the document length.
+    """
+
+    def __init__(self, text: str, size: int = QA_CHUNK_WORDS, overlap: int = QA_CHUNK_OVERLAP):
+        self.text = text
+        self.spans: list[tuple[int, int]] = []
+
+        words = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+        stride = max(1, size - overlap)
+        for first in range(0, max(len(words), 1), stride):
+            window = words[first:first + size]
+            if not window:
+                break
+            self.spans.append((window[0][0], window[-1][1]))
+            if first + size >= len(words):
+                break
+
+        self.bm25 = BM25Index.from_terms((i, tokenize(self.chunk(i))) for i in range(len(self.spans)))
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def chunk(self, i: int) -> str:
+        start, end = self.spans[i]
+        return self.text[start:end]
+
+    def top_chunks(self, question: str, k: int = QA_TOP_CHUNKS) -> list[str]:
+        """The k best-matching chunks for a question, falling back to the opening chunk."""
+        hits = self.bm25.search(build_query(question), k=k)
+        if not hits:
+            return [self.chunk(0)] if self.spans else []
+        return [self.chunk(i) for score, i in hits]
+
+
+def get_chunk_index(doc: DocumentIndex) -> ChunkIndex:
+    """Chunk index for a document, built once and kept on its DocumentIndex."""
+    if doc.chunks is None:
+        doc.chunks = ChunkIndex(doc.text)
+    return doc.chunks
@@ -0,0 +1,143 @@
+##Where per-job files live under DATA_DIR: flat directories or sharded by job id
+import argparse
+import os
+from pathlib import Path
+
+# "flat": results/<job_id>.json; "sharded": results/ab/cd/<job_id>.json for job ids starting "abcd"
+DATA_LAYOUT = os.environ.get("DATA_LAYOUT", "flat")
+LAYOUTS = ("flat", "sharded")
+
+# Directories holding files named after their job: <job_id>.pdf, <job_id>_highlighted.pdf,
+# <job_id>.json, <job_id>.text, <job_id>.annoatations.json, <job_id>.analyze.prof, pins/<job_id>
+JOB_KINDS = ("uploads", "results", "annotations", "profiles", "pins")
+
+# Files still being written; their writer renames them into place
+_IN_PROGRESS = (".tmp", ".blocks")
+
+
+def data_dir() -> Path:
+    return Path(os.environ.get("DATA_DIR", "data"))
+
+
+def job_id_of(filename: str) -> str:
+    return filename.split(".", 1)[0].removesuffix("_highlighted")
+
+
+def _job_dir(kind: str, job_id: str, layout: str, base: Path) -> Path:
+    if layout == "sharded":
+        return base / kind / job_id[:2] / job_id[2:4]
+    return base / kind
+
+
+def job_dirs(kind: str, job_id: str, base: Path | None = None) -> list[Path]:
+    """A job's directory for `kind` in the configured layout, then in the other one."""
+    base = data_dir() if base is None else base
+    layouts = [DATA_LAYOUT] + [layout for layout in LAYOUTS if layout != DATA_LAYOUT]
+    return [_job_dir(kind, job_id, layout, base) for layout in layouts]
+
+
+def job_file(kind: str, job_id: str, name: str, base: Path | None = None) -> Path:
+    """
+    Path of one of a job's files, for reading or writing.
+
+    This is the configured layout's path unless the file only exists in the
+    other layout, as happens while a migration is under way. A file can also
+    exist in both: a writer that resolved the old path just before migrate
+    moved the file recreates it there. Then the newer copy is returned, so
+    readers and later writers follow the latest write until the next migrate
+    run removes the older one. Two stats per call.
+    """
+    directories = job_dirs(kind, job_id, base)
+    found, newest = directories[0] / name, None
+    for directory in directories:
+        try:
+            mtime = (directory / name).stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        # Ties go to the configured layout, which comes first
+        if newest is None or mtime > newest:
+            found, newest = directory / name, mtime
+    return found
+
+
+def iter_job_files(kind: str, base: Path | None = None):
+    """Every file stored for `kind`, in either layout, as os.DirEntry objects."""
+    root = (data_dir() if base is None else base) / kind
+    if not root.is_dir():
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+
+def migrate(layout: str, base: Path | None = None, dry_run: bool = False) -> dict:
+    """
+    Move every job file into `layout`, safe to run while the API serves requests.
+
+    Each move is an os.replace within DATA_DIR, and job_file finds a file in
+    either layout, so readers never miss one. A write that raced a move leaves
+    a copy in each layout; job_file serves the newer one meanwhile, and the
+    next run keeps it and removes the other. Returns counts of moved and
+    removed files.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}; expected one of {', '.join(LAYOUTS)}")
+    base = data_dir() if base is None else base
+    counts = {"moved": 0, "removed_stale": 0, "kept": 0}
+    for kind in JOB_KINDS:
+        for entry in list(iter_job_files(kind, base)):
+            if entry.name.endswith(_IN_PROGRESS):
+                continue
+            source = Path(entry.path)
+            dest = _job_dir(kind, job_id_of(entry.name), layout, base) / entry.name
+            if source == dest:
+                counts["kept"] += 1
+                continue
+            try:
+                if dest.stat().st_mtime_ns >= entry.stat().st_mtime_ns:
+                    counts["removed_stale"] += 1
+                    if not dry_run:
+                        source.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                pass
+            counts["moved"] += 1
+            if not dry_run:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, dest)
+        if layout == "flat" and not dry_run:
+            _remove_empty_dirs(base / kind)
+    return counts
+
+
+def _remove_empty_dirs(root: Path) -> None:
+    if not root.is_dir():
+        return
+    for directory, _, _ in sorted(os.walk(root), key=lambda item: len(item[0]), reverse=True):
+        if Path(directory) != root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Move job files under DATA_DIR into the flat or sharded layout")
+    ap.add_argument("--to", choices=LAYOUTS, default="sharded", help="target layout (default: sharded)")
+    ap.add_argument("--dry-run", action="store_true", help="only count the files that would move")
+    args = ap.parse_args(argv)
+    if args.to != DATA_LAYOUT:
+        print(f"Note: DATA_LAYOUT is {DATA_LAYOUT!r}; set DATA_LAYOUT={args.to} so new files are written there too")
+    counts = migrate(args.to, dry_run=args.dry_run)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {counts['moved']} files; {counts['removed_stale']} stale copies removed, "
+          f"{counts['kept']} already in place ({data_dir()})")
+
+
+if __name__ == "__main__":
+    main()
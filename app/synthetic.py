@@ -0,0 +1,118 @@
+##Synthetic contracts of any length for benchmarks and load tests
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+
+# One paragraph per clause type, worded so the regex detector and the Q&A
+# context builders find them the way they would in a real contract
+CLAUSE_PARAGRAPHS = {
+    "Parties": "This Agreement is made between {a}, a Delaware corporation (the \"Company\"), and {b}, "
+               "a California company (the \"Contractor\"). Each party represents that it has authority to sign.",
+    "Effective Date": "This Agreement takes effect on the Effective Date of {date} and commencement of "
+                      "services shall begin within thirty days thereafter.",
+    "Payment": "The Company shall pay the Contractor a fee of ${amount} per month. Payment is due within "
+               "thirty days of each invoice, and late amounts bear interest at one percent per month.",
+    "Governing Law": "The governing law of this Agreement is the law of the State of {state}, and the parties "
+                     "submit to the exclusive jurisdiction of its courts.",
+    "Termination": "Either party may terminate this Agreement on sixty days written notice. Termination for "
+                   "material breach is effective immediately, and expiration does not release accrued payment obligations.",
+    "Confidentiality": "Each party shall keep the other's confidential and proprietary information secret and "
+                       "use it only to perform this Agreement, for five years after termination.",
+    "Anti-Assignment": "Neither party may make any assignment or transfer of this Agreement without the prior "
+                       "written consent of the other party, which shall not be unreasonably withheld.",
+    "Indemnification": "The Contractor shall indemnify, defend and hold harmless the Company from all claims, "
+                       "damages and liability arising from the Contractor's negligence.",
+    "Force Majeure": "Neither party is liable for delay caused by force majeure, including any act of God, "
+                     "war, strike or failure of public utilities.",
+    "Dispute Resolution": "Any dispute arising under this Agreement shall be settled by binding arbitration "
+                          "in {city} under the rules of the American Arbitration Association.",
+    "Severability": "If any provision of this Agreement is held invalid, the remaining provisions remain in "
+                    "full force; this severability applies to every section.",
+    "Entire Agreement": "This document is the entire agreement of the parties and supersedes all prior "
+                        "understandings on its subject matter.",
+    "Amendment": "No amendment or modification of this Agreement is binding unless in writing and signed "
+                 "by both parties.",
+    "Waiver": "No waiver of any breach is a waiver of any other breach, and failure to enforce a term does "
+              "not waive it.",
+    "Notices": "Every notice or notification under this Agreement must be in writing and delivered to the "
+               "address of the receiving party set out above.",
+    "Insurance": "The Contractor shall maintain general liability insurance with coverage of at least "
+                 "${amount} per occurrence during the term.",
+}
+
+FILLER = [
+    "The Contractor shall perform the services described in each statement of work with due care.",
+    "Deliverables shall be provided in the formats reasonably requested by the Company.",
+    "Each statement of work sets out milestones, acceptance criteria and the responsible personnel.",
+    "The Company shall give the Contractor reasonable access to its premises and systems as needed.",
+    "Status reports shall be delivered every two weeks and reviewed at the following meeting.",
+    "Personnel assigned to the services shall be suitably qualified and experienced.",
+    "Changes to the scope of services shall follow the change control procedure in Schedule B.",
+    "Records relating to the services shall be retained for three years after completion.",
+]
+
+_NAMES = ["Acme Holdings Inc.", "Blue Harbor LLC", "Northwind Traders Corp.", "Summit Analytics Ltd.",
+          "Granite Peak Partners", "Orchid Logistics Inc."]
+_STATES = ["Delaware", "New York", "California", "Texas", "Illinois"]
+_CITIES = ["Wilmington", "New York", "San Francisco", "Austin", "Chicago"]
+
+
+def contract_paragraphs(pages: int, seed: int = 0, paragraphs_per_page: int = 6) -> list[list[str]]:
+    """Paragraphs for each page: a title, every clause type spread across the document, and filler."""
+    rng = random.Random(seed)
+    fields = {
+        "a": rng.choice(_NAMES), "b": rng.choice(_NAMES), "state": rng.choice(_STATES),
+        "city": rng.choice(_CITIES), "amount": f"{rng.randint(1, 500) * 1000:,}",
+        "date": f"{rng.choice(['January', 'March', 'June', 'October'])} {rng.randint(1, 28)}, 20{rng.randint(18, 25)}",
+    }
+    clauses = [text.format(**fields) for text in CLAUSE_PARAGRAPHS.values()]
+
+    # Short documents carry every clause type; longer ones give each clause a page
+    # and restate it every len(clauses) pages, like schedules repeating terms
+    layout = []
+    for page in range(pages):
+        paragraphs = []
+        if page == 0:
+            paragraphs.append("MASTER SERVICES AGREEMENT")
+        if pages < len(clauses):
+            paragraphs.extend(clauses[page::pages])
+        else:
+            paragraphs.append(clauses[page % len(clauses)])
+        while len(paragraphs) < paragraphs_per_page:
+            paragraphs.append(" ".join(rng.sample(FILLER, 3)))
+        layout.append(paragraphs)
+    return layout
+
+
+def generate_contract(path: str | Path, pages: int, seed: int = 0) -> Path:
+    """Write a synthetic contract PDF of `pages` pages (1 to 1000 or more) and return its path."""
+    if pages < 1:
+        raise ValueError("pages must be at least 1")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for number, paragraphs in enumerate(contract_paragraphs(pages, seed), start=1):
+        page = doc.new_page(width=612, height=792)
+        # insert_textbox writes nothing when the text overflows, so shrink until it fits
+        for fontsize in (10, 9, 8, 7, 6):
+            if page.insert_textbox(fitz.Rect(72, 72, 540, 720), "\n\n".join(paragraphs), fontsize=fontsize) >= 0:
+                break
+        page.insert_text((290, 760), str(number), fontsize=9)
+    doc.save(str(path), garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic contract PDF for benchmarking")
+    ap.add_argument("output", help="PDF file to write")
+    ap.add_argument("--pages", type=int, default=10, help="number of pages (default: 10)")
+    ap.add_argument("--seed", type=int, default=0, help="random seed for names, dates and filler")
+    args = ap.parse_args(argv)
+    print(f"Wrote {generate_contract(args.output, args.pages, args.seed)}")
+
+
+if __name__ == "__main__":
+    main()
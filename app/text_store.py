@@ -0,0 +1,151 @@
+##Compressed per-job store of extracted page text with a page-offset table
+import mmap
+import os
+import shutil
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+from app.storage import job_file
+
+_MAGIC = b"CLAWSTXT1"
+_COUNT = struct.Struct("<I")
+
+
+def text_store_path(job_id: str) -> Path:
+    return job_file("results", job_id, f"{job_id}.text")
+
+
+def write_text_store(path: Path, page_texts: list[str]) -> None:
+    """
+    Write page texts as independently zlib-compressed blocks.
+
+    Layout: magic, page count, the byte offset of every block, the character
+    offset of every page in the joined text, then the blocks themselves.
+    Pages are joined with a newline, like the text the worker analyzes.
+    """
+    with TextStoreWriter(path) as writer:
+        for text in page_texts:
+            writer.add_page(text)
+
+
+class TextStoreWriter:
+    """
+    Incremental writer for the write_text_store layout.
+
+    Each page is compressed and spooled to a side file as it is added, so
+    only the offset tables stay in memory; close() writes the header and
+    copies the blocks after it. Used as a context manager, nothing is left
+    behind if the block raises.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._blocks_path = path.with_suffix(path.suffix + ".blocks")
+        self._blocks = open(self._blocks_path, "wb")
+        self._block_sizes = array("Q")
+        self._char_offsets = array("Q", [0])
+
+    def add_page(self, text: str) -> None:
+        block = zlib.compress(text.encode("utf-8"), 6)
+        self._blocks.write(block)
+        self._block_sizes.append(len(block))
+        self._char_offsets.append(self._char_offsets[-1] + len(text) + 1)
+
+    def close(self) -> None:
+        n = len(self._block_sizes)
+        block_offsets = array("Q", [len(_MAGIC) + _COUNT.size + 2 * 8 * (n + 1)])
+        for size in self._block_sizes:
+            block_offsets.append(block_offsets[-1] + size)
+
+        self._blocks.close()
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f, open(self._blocks_path, "rb") as blocks:
+            f.write(_MAGIC)
+            f.write(_COUNT.pack(n))
+            f.write(struct.pack(f"<{n + 1}Q", *block_offsets))
+            f.write(struct.pack(f"<{n + 1}Q", *self._char_offsets))
+            shutil.copyfileobj(blocks, f)
+        os.replace(tmp, self.path)
+        os.remove(self._blocks_path)
+
+    def abort(self) -> None:
+        self._blocks.close()
+        try:
+            os.remove(self._blocks_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class TextStore:
+    """
+    Read-only, memory-mapped view of a job's stored text.
+
+    Only the header is parsed on open; pages are decompressed on first use,
+    so callers that need a single page never inflate the whole document.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(_MAGIC)] != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a CLAWS text store: {path}")
+
+        pos = len(_MAGIC)
+        (n,) = _COUNT.unpack_from(self._mm, pos)
+        pos += _COUNT.size
+        self._block_offsets = struct.unpack_from(f"<{n + 1}Q", self._mm, pos)
+        pos += 8 * (n + 1)
+        # Character offset where each page starts in full_text(), plus the end
+        self.page_offsets = struct.unpack_from(f"<{n + 1}Q", self._mm, pos)
+        self._pages: dict[int, str] = {}
+        self._full_text: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.page_offsets) - 1
+
+    def page(self, page_num: int) -> str:
+        """Text of a page, numbered from 1 like clause pages."""
+        idx = page_num - 1
+        if idx not in self._pages:
+            self._pages[idx] = self._decompress(idx)
+        return self._pages[idx]
+
+    def full_text(self) -> str:
+        if self._full_text is None:
+            self._full_text = self.read_text()
+        return self._full_text
+
+    def read_text(self) -> str:
+        """The joined text, built without caching it or any of its pages."""
+        return "\n".join(self._decompress(idx) for idx in range(len(self)))
+
+    def _decompress(self, idx: int) -> str:
+        block = self._mm[self._block_offsets[idx]:self._block_offsets[idx + 1]]
+        return zlib.decompress(block).decode("utf-8")
+
+    def page_for_offset(self, offset: int) -> int:
+        """Page number containing a character offset of full_text()."""
+        return max(1, min(len(self), bisect_right(self.page_offsets, offset)))
+
+    def page_data(self) -> list[tuple[int, None, str]]:
+        """(page_index, page, page_text) tuples for clause detection, without fitz pages."""
+        return [(i, None, self.page(i)) for i in range(1, len(self) + 1)]
+
+    def close(self) -> None:
+        self._mm.close()
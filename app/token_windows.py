@@ -0,0 +1,100 @@
+##Document text tokenized once into overlapping model-sized windows
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.retrieval import BM25Index, build_query, text_hash, tokenize
+from app.storage import job_file
+
+# Context tokens per window and tokens shared between neighbouring windows;
+# 320 context tokens leave room for the question inside RoBERTa's 512 limit
+QA_WINDOW_TOKENS = int(os.environ.get("QA_WINDOW_TOKENS", "320"))
+QA_WINDOW_OVERLAP = int(os.environ.get("QA_WINDOW_OVERLAP", "64"))
+
+
+class TokenWindows:
+    """
+    Token ids and character offsets for a whole document, cut into stride windows.
+
+    Built at analysis time with the fast tokenizer so the Q&A path only has
+    to encode the question. Ids are stored as uint16 when the vocabulary fits.
+    """
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, windows: np.ndarray, text_hash: str):
+        self.ids = ids
+        self.offsets = offsets
+        self.windows = windows
+        self.text_hash = text_hash
+        self._bm25 = None
+
+    @classmethod
+    def build(cls, tokenizer, text: str,
+              size: int = QA_WINDOW_TOKENS, overlap: int = QA_WINDOW_OVERLAP) -> "TokenWindows":
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+        ids = np.asarray(encoded["input_ids"], dtype=dtype)
+        offsets = np.asarray(encoded["offset_mapping"], dtype=np.int32).reshape(-1, 2)
+
+        spans = []
+        stride = max(1, size - overlap)
+        for start in range(0, len(ids), stride):
+            end = min(start + size, len(ids))
+            spans.append((start, end))
+            if end == len(ids):
+                break
+        windows = np.asarray(spans, dtype=np.int32).reshape(-1, 2)
+        return cls(ids, offsets, windows, text_hash(text))
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def window_text(self, text: str, w: int) -> str:
+        start, end = self.windows[w]
+        return text[self.offsets[start][0]:self.offsets[end - 1][1]]
+
+    def window_ids(self, w: int) -> list[int]:
+        start, end = self.windows[w]
+        return self.ids[start:end].tolist()
+
+    def top_windows(self, text: str, question: str, k: int) -> list[int]:
+        """Ids of the k windows that best match the question, falling back to the first."""
+        if self._bm25 is None:
+            self._bm25 = BM25Index.from_terms(
+                (w, tokenize(self.window_text(text, w))) for w in range(len(self.windows))
+            )
+        hits = self._bm25.search(build_query(question), k=k)
+        if not hits:
+            return [0] if len(self.windows) else []
+        return [w for score, w in hits]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, ids=self.ids, offsets=self.offsets, windows=self.windows,
+                     text_hash=np.array(self.text_hash))
+
+    @classmethod
+    def load(cls, path: Path) -> "TokenWindows":
+        with np.load(path) as data:
+            return cls(data["ids"], data["offsets"], data["windows"], str(data["text_hash"]))
+
+
+def token_windows_path(job_id: str) -> Path:
+    return job_file("results", job_id, f"{job_id}.tokens.npz")
+
+
+def get_token_windows(doc, job_id: str | None) -> TokenWindows | None:
+    """Pre-tokenized windows stored for this job's text, or None if there are none."""
+    if doc.token_windows is None:
+        doc.token_windows = False
+        if job_id:
+            path = token_windows_path(job_id)
+            if path.exists():
+                try:
+                    windows = TokenWindows.load(path)
+                    if windows.text_hash == text_hash(doc.text):
+                        doc.token_windows = windows
+                except Exception as e:
+                    print(f"Could not load token windows for {job_id}: {e}")
+    return doc.token_windows or None
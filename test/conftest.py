@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _scratch_data_dir(tmp_path_factory):
+    # Jobs created by the tests go to a scratch DATA_DIR, not the repository's data/
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATA_DIR", str(tmp_path_factory.mktemp("data")))
+        yield
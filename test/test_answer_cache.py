@@ -0,0 +1,49 @@
+import time
+import pytest
+from app.answer_cache import AnswerCache, answer_key, normalize_question
+
+ANSWER = {"answer": "Either party may terminate with notice.", "clause_text": "", "clause_type": "Termination", "page": 2}
+
+def test_normalized_questions_share_a_key():
+    """Test that case, punctuation and spacing do not change the key."""
+    assert normalize_question("  What are the Termination terms?? ") == "what are the termination terms"
+    assert answer_key("doc", "What are the termination terms?", "m1") == answer_key("doc", "what are the termination terms", "m1")
+    assert answer_key("doc", "termination", "m1") != answer_key("doc", "termination", "m2")
+
+def test_memory_then_disk_hit(tmp_path):
+    """Test the in-process hit and the on-disk hit from a fresh cache."""
+    cache = AnswerCache(tmp_path)
+    assert cache.get("k1") is None
+    cache.put("k1", ANSWER)
+    assert cache.get("k1") == ANSWER
+
+    fresh = AnswerCache(tmp_path)
+    assert fresh.get("k1") == ANSWER
+    assert fresh.stats()["hits_disk"] == 1
+    assert cache.stats()["hits_memory"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_ttl_expiry(tmp_path):
+    """Test that expired entries are treated as misses."""
+    cache = AnswerCache(tmp_path, ttl=0.01)
+    cache.put("k1", ANSWER)
+    time.sleep(0.02)
+    assert cache.get("k1") is None
+    assert not list(tmp_path.glob("*/*.json"))
+
+def test_size_based_eviction(tmp_path):
+    """Test the memory entry cap and the disk byte budget."""
+    cache = AnswerCache(tmp_path, max_entries=2, max_disk_bytes=400)
+    for i in range(5):
+        cache.put(f"k{i}", ANSWER)
+    assert cache.stats()["entries_memory"] == 2
+    assert cache.stats()["disk_bytes"] <= 400
+    assert AnswerCache(tmp_path).get("k4") == ANSWER
+
+def test_overwrite_counts_one_entry(tmp_path):
+    """Test that rewriting a key replaces its bytes in the disk total instead of adding to them."""
+    cache = AnswerCache(tmp_path, max_disk_bytes=10_000)
+    for i in range(50):
+        cache.put("k1", {**ANSWER, "answer": "x" * (i % 7)})
+    assert cache.stats()["disk_bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*/*.json"))
+    assert cache.stats()["evictions"] == 0
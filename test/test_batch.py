@@ -0,0 +1,72 @@
+import json
+import shutil
+import sqlite3
+
+import fitz
+
+from app.batch import collect_pdfs, run_batch
+
+
+def _make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def _archive(tmp_path):
+    archive = tmp_path / "archive"
+    (archive / "2019").mkdir(parents=True)
+    _make_pdf(archive / "a.pdf", "This agreement is governed by the governing law of Delaware.")
+    _make_pdf(archive / "2019" / "b.pdf", "Termination of this contract requires notice.")
+    # Same content as a.pdf under another name: analyzed once
+    shutil.copy(archive / "a.pdf", archive / "2019" / "copy.pdf")
+    (archive / "notes.txt").write_text("not a pdf")
+    return archive
+
+
+def test_collect_pdfs_recurses(tmp_path):
+    archive = _archive(tmp_path)
+    assert [p.name for p in collect_pdfs(str(archive))] == ["b.pdf", "copy.pdf", "a.pdf"]
+    assert [p.name for p in collect_pdfs(str(archive / "*.pdf"))] == ["a.pdf"]
+
+
+def test_jsonl_output_resumes(tmp_path):
+    archive = _archive(tmp_path)
+    output = tmp_path / "out.jsonl"
+    totals = run_batch(str(archive), str(output), workers=1)
+    assert (totals["analyzed"], totals["skipped"], totals["pages"]) == (2, 1, 2)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {r["status"] for r in records} == {"done"}
+    assert all(r["clauses"] for r in records)
+    assert not list(archive.rglob("*_highlighted.pdf"))
+
+    # An interrupted write leaves a partial line; the next run skips finished files
+    with open(output, "a") as f:
+        f.write('{"path": "trunc')
+    totals = run_batch(str(archive), str(output), workers=1)
+    assert (totals["analyzed"], totals["skipped"]) == (0, 3)
+
+
+def test_sqlite_output_and_highlights(tmp_path):
+    archive = _archive(tmp_path)
+    output = tmp_path / "out.db"
+    run_batch(str(archive), str(output), workers=2, highlight_dir=str(tmp_path / "hl"))
+    rows = sqlite3.connect(str(output)).execute("SELECT status, pages, highlighted FROM results").fetchall()
+    assert len(rows) == 2
+    assert all(status == "done" and pages == 1 and highlighted for status, pages, highlighted in rows)
+    assert len(list((tmp_path / "hl").glob("*_highlighted.pdf"))) == 2
+
+
+def test_unreadable_pdf_is_an_error_and_retried(tmp_path):
+    archive = _archive(tmp_path)
+    (archive / "broken.pdf").write_bytes(b"%PDF-1.4\n%EOF\n")
+    output = tmp_path / "out.jsonl"
+    totals = run_batch(str(archive), str(output), workers=1)
+    assert (totals["analyzed"], totals["errors"]) == (2, 1)
+    broken = [json.loads(line) for line in output.read_text().splitlines() if "broken" in line]
+    assert broken[0]["status"] == "error" and "Cannot open" in broken[0]["error"]
+
+    totals = run_batch(str(archive), str(output), workers=1)
+    assert (totals["analyzed"], totals["errors"], totals["skipped"]) == (0, 1, 3)
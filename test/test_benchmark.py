@@ -0,0 +1,41 @@
+import fitz
+
+from app.benchmark import bench_result_serving, compare, run_benchmark
+from app.parser import _detect_legal_clauses_fallback
+from app.synthetic import CLAUSE_PARAGRAPHS, generate_contract
+
+
+def test_synthetic_contract_pages_and_clauses(tmp_path):
+    path = generate_contract(tmp_path / "contract.pdf", 3)
+    doc = fitz.open(str(path))
+    page_data = [(i, None, page.get_text()) for i, page in enumerate(doc, start=1)]
+    doc.close()
+    assert len(page_data) == 3
+    assert all(text.strip() for _, _, text in page_data)
+
+    clauses = _detect_legal_clauses_fallback("\n".join(t for _, _, t in page_data), page_data)
+    detected = {c["type"] for c in clauses}
+    assert {"Governing Law", "Termination", "Indemnification", "Force Majeure"} <= detected
+    assert len(detected) >= len(CLAUSE_PARAGRAPHS) - 1
+
+
+def test_run_benchmark_reports_each_stage(tmp_path):
+    report = run_benchmark([2], stages=["extract", "detect", "context_builders"], repeat=1,
+                           corpus_dir=str(tmp_path))
+    assert set(report["results"]["2"]) == {"extract", "detect", "context_builders"}
+    assert (tmp_path / "contract_2p.pdf").exists()
+
+
+def test_compare_flags_slowdowns_above_noise():
+    baseline = {"results": {"100": {"detect": 1.0, "extract": 0.001}}}
+    current = {"results": {"100": {"detect": 1.5, "extract": 0.004}, "1000": {"detect": 9.0}}}
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert [(r["pages"], r["stage"]) for r in regressions] == [(100, "detect")]
+    assert regressions[0]["change"] == 0.5
+    assert compare(current, baseline, tolerance=0.6) == []
+
+
+def test_result_serving_benchmark():
+    timings = bench_result_serving(pages=3, number=3)
+    assert set(timings) == {"polled", "done"}
+    assert all(set(t) == {"reparse", "current"} and t["current"] > 0 for t in timings.values())
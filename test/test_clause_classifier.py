@@ -0,0 +1,73 @@
+from app import main
+from app.clause_classifier import candidate_context, clause_question, confirm_clauses
+from app.llm_generator import LLMGenerator
+from app.parser import _detect_legal_clauses_fallback
+
+PAGE = ("The governing law of this Agreement is the law of the State of Delaware. "
+        "All notices must be sent to the registered address of the recipient. "
+        "Each party shall indemnify the other against all third party claims.")
+
+
+def _candidates():
+    return _detect_legal_clauses_fallback(PAGE, [(1, None, PAGE)])
+
+
+def test_candidate_context_surrounds_regex_hit():
+    clause = {"type": "Governing Law", "text": "governing law", "page": 1}
+    assert "governing law of this Agreement is the law of the State of Delaware" in candidate_context(clause, PAGE)
+    assert '"Governing Law"' in clause_question("Governing Law")
+
+
+def test_model_confirms_and_rejects():
+    def run_batch(questions, contexts):
+        return [("the law of the State of Delaware", 0.9) if '"Governing Law"' in q else ("", 0.5)
+                for q in questions]
+
+    candidates = _candidates()
+    clauses, detection = confirm_clauses(candidates, lambda page: PAGE, run_batch)
+    assert [c["type"] for c in clauses] == ["Governing Law"]
+    assert clauses[0]["text"] == "the law of the State of Delaware"
+    assert clauses[0]["score"] == 0.9
+    assert detection["status"] == "confirmed"
+    assert detection["rejected"] == len(candidates) - 1
+
+
+def test_budget_leaves_rest_unchecked():
+    calls = []
+
+    def run_batch(questions, contexts):
+        calls.append(questions)
+        return [("", 0.0)] * len(questions)
+
+    candidates = _candidates()
+    clauses, detection = confirm_clauses(candidates, lambda page: PAGE, run_batch,
+                                         budget_seconds=0.0, batch_size=1)
+    assert calls == []
+    assert clauses == candidates
+    assert detection["status"] == "partial"
+    assert detection["unchecked"] == len(candidates)
+
+
+def test_no_model_keeps_regex_results():
+    candidates = _candidates()
+    clauses, detection = confirm_clauses(candidates, lambda page: PAGE, lambda q, c: None)
+    assert clauses == candidates
+    assert detection["status"] == "unavailable"
+
+
+def test_confirmation_never_loads_the_model(tmp_path, monkeypatch):
+    """Test that confirmation is skipped without a loaded model and failed loads are not retried."""
+    monkeypatch.setenv("QA_MODEL_DIR", str(tmp_path / "missing"))
+    generator = LLMGenerator()
+    loads = []
+    monkeypatch.setattr(generator, "load_tokenizer", lambda: loads.append("tokenizer") or False)
+    assert generator.answer_pairs(["q"], ["c"]) is None
+    assert loads == []
+    assert not generator.load_model() and not generator.load_model()
+    assert loads == ["tokenizer"]
+
+    monkeypatch.setattr(main, "get_llm_generator", lambda: generator)
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 30)
+    detection = main._initial_detection(_candidates())
+    assert detection["status"] == "unavailable"
+    assert detection["unchecked"] == len(_candidates())
@@ -0,0 +1,41 @@
+import json
+
+from app.clause_columns import pack_clauses, unpack_clauses
+from app.parser import _detect_legal_clauses_fallback
+
+PAGES = {
+    1: "This Agreement is made between Company A and Company B, each a party hereto.",
+    2: "Termination of this Agreement requires sixty days written notice to the other party.",
+}
+
+
+def _clauses():
+    return _detect_legal_clauses_fallback("", [(page, None, text) for page, text in PAGES.items()])
+
+
+def test_round_trip_rebuilds_text():
+    """Test that clause text comes back from the page spans, not from the stored columns."""
+    clauses = _clauses()
+    columns = pack_clauses(clauses)
+    assert "text" not in json.dumps(columns)
+    unpacked = unpack_clauses(columns, PAGES.get)
+    assert [c["text"] for c in unpacked] == [c["text"] for c in clauses]
+    assert [(c["type"], c["page"], c["score"]) for c in unpacked] == [(c["type"], c["page"], c["score"]) for c in clauses]
+
+
+def test_fields_and_pagination_skip_text():
+    """Test that pages are not read unless text is requested, and offset/limit slice the clauses."""
+    clauses = _clauses()
+    columns = pack_clauses(clauses)
+
+    def no_pages(page):
+        raise AssertionError("page text read without text requested")
+
+    window = unpack_clauses(columns, no_pages, fields=("type", "page"), offset=1, limit=2)
+    assert window == [{"type": c["type"], "page": c["page"]} for c in clauses[1:3]]
+
+
+def test_legacy_clause_lists():
+    """Test that results stored as plain clause dicts are still served."""
+    legacy = [{"type": "Parties", "text": "between A and B", "page": 1, "bbox": [0, 0, 0, 0], "score": 0.8}]
+    assert unpack_clauses(legacy, fields=("type", "text")) == [{"type": "Parties", "text": "between A and B"}]
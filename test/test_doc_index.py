@@ -0,0 +1,32 @@
+import pytest
+from app.doc_index import DocumentIndex, get_document_index, drop_document_index
+
+SAMPLE = "This Agreement is made between Company A and Company B. Payment is due monthly! Short one? Either party may terminate with notice."
+
+def test_sentences_and_offsets():
+    """Test that sentences are split once with offsets into the original text."""
+    doc = DocumentIndex(SAMPLE)
+    assert len(doc) == 4
+    for sentence, offset in zip(doc.sentences, doc.offsets):
+        assert SAMPLE[offset:offset + len(sentence)] == sentence
+    assert doc.lowered[1] == "payment is due monthly"
+    assert "payment" in doc.tokens[1]
+
+def test_long_sentences_and_matching():
+    """Test the >20 character cut-off and keyword matching."""
+    doc = DocumentIndex(SAMPLE)
+    assert [doc.sentences[i] for i in doc.long_ids] == [
+        "This Agreement is made between Company A and Company B",
+        "Payment is due monthly",
+        "Either party may terminate with notice",
+    ]
+    assert doc.matching(["terminate", "payment"]) == [1, 3]
+    assert doc.matching(["terminate", "payment"], limit=1) == [1]
+    assert doc.matching(["short"], doc.long_ids) == []
+
+def test_index_cached_per_job():
+    """Test that repeated questions for a job reuse the same index."""
+    first = get_document_index(SAMPLE, "job-1")
+    assert get_document_index(SAMPLE, "job-1") is first
+    drop_document_index("job-1")
+    assert get_document_index(SAMPLE, "job-1") is not first
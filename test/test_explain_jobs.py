@@ -0,0 +1,24 @@
+from app.inference import ExplainJobs
+from app.main import QARequest
+
+
+def test_jobs_are_shared_between_workers(tmp_path):
+    """Test that another API worker can poll a job and cancel it, and the worker running it stops."""
+    running, other = ExplainJobs(state_dir=tmp_path), ExplainJobs(state_dir=tmp_path)
+    job = running.new(QARequest(question="Who pays?", job_id="job-1"), 30)
+    running.add(job)
+    job.start()
+
+    seen = other.get(job.id)
+    assert seen.status == "running"
+    assert seen.request == {"question": "Who pays?", "job_id": "job-1", "deadline_seconds": None}
+    assert not job.should_stop()
+
+    seen.finish("cancelled", None)
+    assert job.should_stop()
+    # The running worker's late answer does not replace the cancellation
+    job.finish("done", {"answer": "The Company"})
+    assert running.get(job.id).to_dict() == {"explain_id": job.id, "status": "cancelled", "response": None}
+    assert other.get(job.id).status == "cancelled"
+    assert other.get("does-not-exist") is None
+    assert other.get("../escape") is None
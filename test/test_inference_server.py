@@ -0,0 +1,61 @@
+import time
+from threading import Event, Thread
+
+from app.inference_server import RemoteLLMGenerator, serve
+
+
+class EchoGenerator:
+    """Stand-in for the model: echoes the question, or waits to be stopped."""
+
+    def __init__(self):
+        self.stopped = Event()
+
+    def generate_explanation(self, clause_text, question, job_id=None, should_stop=None, trace=None,
+                             topic_contexts=None):
+        if question == "slow":
+            while not should_stop():
+                time.sleep(0.01)
+            self.stopped.set()
+            return "too late"
+        trace.append("relevant_clauses")
+        return f"{question} ({job_id}, {sorted(topic_contexts or {})})"
+
+    def generate_explanations(self, clause_text, questions, job_id=None, should_stop=None, traces=None,
+                              topic_contexts=None):
+        traces.extend(["relevant_clauses"] for _ in questions)
+        return [q.upper() for q in questions]
+
+
+def _start(tmp_path):
+    generator = EchoGenerator()
+    socket_path = str(tmp_path / "inference.sock")
+    ready = Event()
+    Thread(target=serve, args=(socket_path, generator), kwargs={"ready": ready}, daemon=True).start()
+    assert ready.wait(5)
+    return generator, RemoteLLMGenerator(socket_path)
+
+
+def test_remote_calls_run_in_server(tmp_path):
+    _, remote = _start(tmp_path)
+    trace = []
+    answer = remote.generate_explanation("text", "who pays", "job-1", trace=trace,
+                                         topic_contexts={"payment_focused": "x"})
+    assert answer == "who pays (job-1, ['payment_focused'])"
+    assert trace == ["relevant_clauses"]
+
+    traces = []
+    assert remote.generate_explanations("text", ["a", "b"], traces=traces) == ["A", "B"]
+    assert traces == [["relevant_clauses"], ["relevant_clauses"]]
+
+
+def test_hanging_up_stops_the_server_call(tmp_path):
+    generator, remote = _start(tmp_path)
+    deadline = time.monotonic() + 0.2
+    answer = remote.generate_explanation("text", "slow", should_stop=lambda: time.monotonic() > deadline)
+    assert answer == "No explanation available"
+    assert generator.stopped.wait(5)
+
+
+def test_unreachable_server_falls_back(tmp_path):
+    remote = RemoteLLMGenerator(str(tmp_path / "missing.sock"))
+    assert remote.generate_explanation("text", "q") == "No explanation available"
@@ -0,0 +1,61 @@
+import os
+
+from app.janitor import Janitor
+
+DAY = 24 * 3600
+NOW = 1_000_000_000.0
+
+
+def _job(data_dir, job_id, age_days, size=1000):
+    files = [data_dir / "uploads" / f"{job_id}.pdf", data_dir / "uploads" / f"{job_id}_highlighted.pdf",
+             data_dir / "results" / f"{job_id}.json", data_dir / "results" / f"{job_id}.text"]
+    for path in files:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * (size // len(files)))
+        os.utime(path, (NOW - age_days * DAY, NOW - age_days * DAY))
+    return files
+
+
+def test_ttl_removes_every_file_of_expired_jobs(tmp_path):
+    """Test that expired jobs lose all their files and pinned or active jobs are kept."""
+    old = _job(tmp_path, "old", 10)
+    _job(tmp_path, "pinned", 10)
+    _job(tmp_path, "running", 10)
+    _job(tmp_path, "fresh", 1)
+    janitor = Janitor(tmp_path, ttl=7 * DAY, max_bytes=0)
+    janitor.pin("pinned")
+
+    assert janitor.sweep(active={"running"}, now=NOW) == ["old"]
+    assert not any(path.exists() for path in old)
+    stats = janitor.stats()
+    assert stats["jobs_evicted"] == 1 and stats["bytes_reclaimed"] == 1000
+    assert stats["jobs"] == 3 and stats["bytes_used"] == 3000
+
+    janitor.unpin("pinned")
+    assert janitor.sweep(active={"running"}, now=NOW) == ["pinned"]
+
+
+def test_budget_evicts_least_recently_accessed(tmp_path):
+    """Test that an over-budget data dir drops the oldest jobs until it is under 90% of the budget."""
+    for job_id, age in (("a", 5), ("b", 4), ("c", 3), ("d", 2), ("e", 1)):
+        _job(tmp_path, job_id, age)
+    janitor = Janitor(tmp_path, ttl=0, max_bytes=4000)
+    # Reading "a" makes it the most recently accessed job
+    janitor.touch("a", tmp_path / "results" / "a.json")
+
+    assert janitor.sweep(now=NOW + 1) == ["b", "c"]
+    assert janitor.stats()["bytes_used"] == 3000
+    assert janitor.sweep(now=NOW + 1) == []
+
+
+def test_jobs_in_progress_elsewhere_are_kept(tmp_path):
+    """Test that a job another API worker is still running keeps its files, whatever its age."""
+    _job(tmp_path, "old", 10)
+    running = _job(tmp_path, "running-elsewhere", 10)
+    running[2].write_text('{"clause_count":0,"job_id":"running-elsewhere","status":"processing"}')
+    os.utime(running[2], (NOW - 10 * DAY, NOW - 10 * DAY))
+    janitor = Janitor(tmp_path, ttl=7 * DAY, max_bytes=0)
+    assert janitor.enabled and not Janitor(tmp_path, ttl=0, max_bytes=0).enabled
+
+    assert janitor.sweep(now=NOW) == ["old"]
+    assert all(path.exists() for path in running)
@@ -0,0 +1,36 @@
+from app import job_queue
+from app.job_queue import JobQueue
+
+
+def _drain(q):
+    return [q.get() for _ in range(q.qsize())]
+
+
+def test_shortest_job_first(monkeypatch):
+    """Test that small jobs overtake large ones and equal jobs keep arrival order."""
+    monkeypatch.setattr(job_queue.time, "monotonic", lambda: 100.0)
+    q = JobQueue()
+    q.put(("credit-agreement", 600, 0))
+    q.put(("nda", 2, 0))
+    q.put(("lease", 40, 0))
+    q.put(("nda-2", 2, 0))
+    assert _drain(q) == ["nda", "nda-2", "lease", "credit-agreement"]
+
+
+def test_aging_and_priority(monkeypatch):
+    """Test that a long wait or an explicit priority moves a large job ahead."""
+    now = [0.0]
+    monkeypatch.setattr(job_queue.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(job_queue, "JOB_AGING_PAGES_PER_SECOND", 5.0)
+    q = JobQueue()
+    q.put(("big", 600, 0))
+    now[0] = 60.0
+    q.put(("small-early", 2, 0))
+    now[0] = 200.0
+    q.put(("small-late", 2, 0))
+    assert _drain(q) == ["small-early", "big", "small-late"]
+
+    q.put(("big", 600, 0))
+    q.put(("urgent-big", 600, 10))
+    q.put(("small", 2, 0))
+    assert _drain(q) == ["urgent-big", "small", "big"]
@@ -0,0 +1,145 @@
+import gc
+import time
+import tracemalloc
+from threading import Event, Thread
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.job_queue import JobQueue
+from app.main import app
+from app.parser import stream_pdf
+from app.synthetic import generate_contract
+
+FAKE_PDF = {"pdf": ("sample.pdf", b"%PDF-1.4\n%EOF\n", "application/pdf")}
+
+
+def _wait(client, job_id):
+    for _ in range(400):
+        body = client.get(f"/result/{job_id}").json()
+        if body["status"] not in ("queued", "processing"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError(f"Job did not finish (last status={body['status']})")
+
+
+def test_cancel_queued_job(monkeypatch):
+    """Test that a queued job is cancelled at once, once, and only by the worker that queued it."""
+    # A queue no worker reads, so the job stays queued
+    monkeypatch.setattr(main, "_job_q", JobQueue())
+    client = TestClient(app)
+    job_id = client.post("/analyze", files=FAKE_PDF).json()["job_id"]
+    assert client.post(f"/redetect/{job_id}").json()["detail"] == "Job is still queued"
+    resp = client.delete(f"/jobs/{job_id}")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "cancelled"
+    assert client.get(f"/result/{job_id}").json()["status"] == "cancelled"
+    assert client.delete(f"/jobs/{job_id}").status_code == 409
+    assert client.delete("/jobs/does-not-exist").status_code == 404
+
+    # Queued by another worker process: this one holds no cancellation flag for it
+    main._write_result(main.Result(job_id="other-worker-job", status="queued"))
+    resp = client.delete("/jobs/other-worker-job")
+    assert resp.status_code == 409 and "another worker process" in resp.json()["detail"]
+
+
+def test_page_limit_gives_partial_result(monkeypatch, tmp_path):
+    """Test that a job over the page limit keeps the clauses of the pages it scanned, also when redetected."""
+    monkeypatch.setattr(main, "JOB_MAX_PAGES", 2)
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 0)
+    # No tokenizer download on the analysis thread, whatever the environment
+    monkeypatch.setattr(main, "_pretokenize", lambda job_id, text: None)
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 5)
+    with TestClient(app) as client:
+        files = {"pdf": ("contract.pdf", pdf_path.read_bytes(), "application/pdf")}
+        body = _wait(client, client.post("/analyze", files=files).json()["job_id"])
+        redetected = client.post(f"/redetect/{body['job_id']}").json()
+    assert body["status"] == "partial"
+    assert body["stop_reason"] == "page_limit"
+    assert body["pages_scanned"] == 2
+    assert body["clauses"] and all(c["page"] <= 2 for c in body["clauses"])
+    # Redetecting the scanned pages does not make the job complete
+    assert {k: redetected[k] for k in ("status", "stop_reason", "pages_scanned")} == \
+        {"status": "partial", "stop_reason": "page_limit", "pages_scanned": 2}
+
+
+def test_time_budget_covers_post_processing(monkeypatch, tmp_path):
+    """Test that a job past its time budget skips pre-tokenizing and topic contexts."""
+    monkeypatch.setattr(main, "JOB_TIME_BUDGET_SECONDS", 1e-9)
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 0)
+    calls = []
+    monkeypatch.setattr(main, "_pretokenize", lambda job_id, text: calls.append(job_id))
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 3)
+    with TestClient(app) as client:
+        files = {"pdf": ("contract.pdf", pdf_path.read_bytes(), "application/pdf")}
+        body = _wait(client, client.post("/analyze", files=files).json()["job_id"])
+    assert body["status"] == "partial"
+    assert body["stop_reason"] == "time_budget"
+    assert calls == []
+    assert "topic_contexts" not in main._read_contexts(body["job_id"])
+
+
+def test_budget_stops_between_pages(monkeypatch, tmp_path):
+    """Test that cancellation and the time budget are checked before each page."""
+    pdf_path = str(generate_contract(tmp_path / "contract.pdf", 6))
+    cancel = Event()
+    budget = main._JobBudget(cancel)
+    seen = []
+
+    def sink(text):
+        seen.append(text)
+        if len(seen) == 3:
+            cancel.set()
+
+    _, pages = stream_pdf(pdf_path, sink, highlight=False, should_stop=budget)
+    assert pages == 3 and len(seen) == 3
+    assert budget.reason == "cancelled"
+
+    monkeypatch.setattr(main, "JOB_TIME_BUDGET_SECONDS", 1e-9)
+    budget = main._JobBudget(Event())
+    _, pages = stream_pdf(pdf_path, lambda text: None, highlight=False, should_stop=budget)
+    assert pages == 0
+    assert budget.reason == "time_budget"
+
+
+def test_pin_job_and_storage_metrics(monkeypatch):
+    """Test pinning through the API and the janitor's usage in /metrics."""
+    monkeypatch.setattr(main, "_job_q", JobQueue())
+    client = TestClient(app)
+    job_id = client.post("/analyze", files=FAKE_PDF).json()["job_id"]
+    assert client.put(f"/jobs/{job_id}/pin").json() == {"job_id": job_id, "pinned": True}
+    assert main.get_janitor().is_pinned(job_id)
+    assert client.delete(f"/jobs/{job_id}/pin").json()["pinned"] is False
+    assert client.put("/jobs/does-not-exist/pin").status_code == 404
+    assert "bytes_reclaimed" in client.get("/metrics").json()["storage"]
+
+
+def test_worker_keeps_no_document_in_memory(monkeypatch, tmp_path):
+    """Test that the worker holds no document text or index once a job is done."""
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 0)
+    monkeypatch.setattr(main, "_pretokenize", lambda job_id, text: None)
+    monkeypatch.setattr(main, "_job_q", JobQueue())
+    # No lifespan: only the worker started below reads the queue
+    client = TestClient(app)
+    Thread(target=main._worker, daemon=True).start()
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 100)
+    files = {"pdf": ("contract.pdf", pdf_path.read_bytes(), "application/pdf")}
+    # The first job fills one-off caches (compiled patterns, imports)
+    _wait(client, client.post("/analyze", files=files).json()["job_id"])
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        job_id = client.post("/analyze", files=files).json()["job_id"]
+        # Status-only polls, so the API side reads no clause text into its page cache
+        while (status := client.get(f"/result/{job_id}", params={"fields": "status"}).json()["status"]) \
+                in ("queued", "processing"):
+            time.sleep(0.05)
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert status == "done"
+    # Post-processing peaks at O(document) (topic contexts index the whole text);
+    # afterwards only the last job's clauses stay referenced
+    assert retained < len(main._read_document_text(job_id)) // 2
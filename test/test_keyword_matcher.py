@@ -0,0 +1,31 @@
+import pytest
+from app.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+def test_overlapping_keywords_counted_per_category():
+    """Test that overlapping keywords are all found in one scan."""
+    matcher = KeywordMatcher({
+        "termination": ["term", "terminate", "termination"],
+        "payment": ["pay", "payment"],
+    })
+    hits = matcher.scan("terminate the termination and payment")
+    assert hits == {"termination": 4, "payment": 2}
+
+def test_matches_substring_semantics():
+    """Test that scan agrees with `any(keyword in text ...)` for each category."""
+    categories = {
+        "a": ["he", "she", "his", "hers"],
+        "b": ["hold harmless", "old"],
+        "c": ["zzz"],
+    }
+    matcher = KeywordMatcher(categories)
+    text = "ushers must hold harmless their household"
+    hits = matcher.scan(text)
+    for category, keywords in categories.items():
+        assert (category in hits) == any(k in text for k in keywords)
+
+def test_default_matcher_categories():
+    """Test the shared matcher built from the knowledge base lists."""
+    hits = get_keyword_matcher().scan("either party may terminate upon notice")
+    assert "topic:termination" in hits
+    assert "legal:parties" in hits
+    assert "question:Termination" in hits
@@ -0,0 +1,39 @@
+import tracemalloc
+
+from app.parser import analyze_pdf, stream_pdf
+from app.synthetic import generate_contract
+from app.text_store import TextStore, TextStoreWriter, write_text_store
+
+
+def _peak_bytes(pdf_path, store_path):
+    tracemalloc.start()
+    try:
+        with TextStoreWriter(store_path) as writer:
+            stream_pdf(str(pdf_path), writer.add_page, highlight=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def test_stream_matches_analyze(tmp_path):
+    """Test that streaming finds the same clauses and text as the in-memory path."""
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 40)
+    clauses, page_texts = analyze_pdf(str(pdf_path), highlight=False)
+    with TextStoreWriter(tmp_path / "streamed.text") as writer:
+        streamed, pages = stream_pdf(str(pdf_path), writer.add_page, highlight=False)
+    write_text_store(tmp_path / "listed.text", page_texts)
+    assert streamed == clauses
+    assert pages == 40
+    assert (tmp_path / "streamed.text").read_bytes() == (tmp_path / "listed.text").read_bytes()
+    assert TextStore(tmp_path / "streamed.text").full_text() == "\n".join(page_texts)
+
+
+def test_peak_memory_flat_in_page_count(tmp_path):
+    """Test that parsing 10x the pages does not take 10x the memory."""
+    small = generate_contract(tmp_path / "small.pdf", 20)
+    large = generate_contract(tmp_path / "large.pdf", 200)
+    _peak_bytes(small, tmp_path / "warmup.text")
+    small_peak = _peak_bytes(small, tmp_path / "small.text")
+    large_peak = _peak_bytes(large, tmp_path / "large.text")
+    assert large_peak < 2 * small_peak
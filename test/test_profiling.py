@@ -0,0 +1,30 @@
+from contextlib import nullcontext
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.profiling import profiled, read_profiles
+
+
+def test_profile_written_and_served(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    with profiled("job-1", "analyze", True):
+        sum(len(str(i)) for i in range(20000))
+
+    for suffix in (".prof", ".txt", ".json"):
+        assert (tmp_path / "profiles" / f"job-1.analyze{suffix}").exists()
+    summary = read_profiles("job-1")["analyze"]
+    assert summary["wall_seconds"] > 0
+    assert summary["peak_bytes"] > 0
+    assert summary["top_functions"] and summary["top_allocations"]
+
+    body = TestClient(app).get("/profile/job-1").json()
+    assert set(body["profiles"]) == {"analyze"}
+
+
+def test_profiling_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    assert isinstance(profiled("job-2", "explain"), nullcontext)
+    # Ids that are not plain file names are never profiled
+    assert isinstance(profiled("../job", "explain", True), nullcontext)
+    assert TestClient(app).get("/profile/job-2").status_code == 404
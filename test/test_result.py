@@ -1,5 +1,8 @@
 from fastapi.testclient import TestClient
+from app import main
 from app.main import app
+from app.retrieval import bm25_index_path
+from app.synthetic import generate_contract
 import time
 
 client = TestClient(app)
@@ -30,4 +33,39 @@ def test_result_known_job():
                 return
             time.sleep(0.05)
 
-        raise AssertionError(f"Job did not reach done status within timeout (last status={last_status})")
\ No newline at end of file
+        raise AssertionError(f"Job did not reach done status within timeout (last status={last_status})")
+
+
+def test_result_fields_and_pagination(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 0)
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 3)
+    files = {"pdf": ("contract.pdf", pdf_path.read_bytes(), "application/pdf")}
+
+    with TestClient(app) as client:
+        job_id = client.post("/analyze", files=files).json()["job_id"]
+        for _ in range(200):
+            full = client.get(f"/result/{job_id}").json()
+            if full["status"] == "done":
+                break
+            time.sleep(0.05)
+        assert full["clause_count"] == len(full["clauses"]) > 2
+        # Q&A material lives beside the result, out of every poll
+        assert "topic_contexts" not in full and "summary" not in full
+        assert main._read_contexts(job_id)["summary"]
+        assert bm25_index_path(job_id).exists()
+
+        res = client.get(f"/result/{job_id}", params={"fields": "status,clauses.type,clauses.page", "offset": 1, "limit": 2})
+        body = res.json()
+        assert set(body) == {"job_id", "status", "clauses", "clause_count"}
+        assert body["clauses"] == [{"type": c["type"], "page": c["page"]} for c in full["clauses"][1:3]]
+        assert client.get(f"/result/{job_id}", params={"fields": "clauses.bbox"}).status_code == 400
+
+
+def test_polled_result_served_as_stored(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    main._write_result(main.Result(job_id="polled-job", status="processing", doc_hash="abc"))
+    res = TestClient(app).get("/result/polled-job")
+    assert res.headers["content-type"] == "application/json"
+    assert res.content == main._result_path("polled-job").read_bytes()
+    assert res.json()["status"] == "processing" and res.json()["clauses"] == []
@@ -0,0 +1,48 @@
+import pytest
+from app.doc_index import DocumentIndex
+from app.retrieval import BM25Index, build_query, get_bm25_index
+
+SAMPLE = """
+This Agreement is entered into between Company A and Company B.
+Either party may terminate this Agreement upon thirty days written notice.
+The Licensee shall pay a monthly fee of one thousand dollars.
+All confidential information shall be protected by the receiving party.
+This Agreement shall be governed by the laws of California.
+"""
+
+def test_query_expansion():
+    """Test that legal term expansions are added with a lower weight."""
+    query = build_query("How can I cancel?")
+    assert query["cancel"] == 1.0
+    assert query["terminate"] < 1.0
+    assert "expire" in query
+
+def test_bm25_ranks_relevant_sentence_first():
+    """Test that the sentence sharing the question's terms ranks first."""
+    doc = DocumentIndex(SAMPLE)
+    index = BM25Index.build(doc)
+    hits = index.search(build_query("When can the agreement be terminated?"), k=3)
+    assert hits
+    assert "terminate" in doc.sentences[hits[0][1]]
+    assert [score for score, _ in hits] == sorted((score for score, _ in hits), reverse=True)
+
+def test_bm25_persisted_with_job(tmp_path, monkeypatch):
+    """Test that the index is written next to the job result and reloaded."""
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    built = get_bm25_index(DocumentIndex(SAMPLE), "job-bm25")
+    assert (tmp_path / "results" / "job-bm25.bm25.npz").exists()
+
+    loaded = get_bm25_index(DocumentIndex(SAMPLE), "job-bm25")
+    assert (loaded.postings, loaded.doc_len) == (built.postings, built.doc_len)
+    query = build_query("payment fee")
+    assert loaded.search(query) == built.search(query)
+
+def test_chunks_cover_whole_document():
+    """Test that overlapping chunks reach the end of a long document."""
+    from app.retrieval import ChunkIndex
+    text = " ".join(f"word{i}" for i in range(1000)) + " the termination fee applies"
+    chunks = ChunkIndex(text, size=100, overlap=20)
+    assert chunks.chunk(0).startswith("word0 ")
+    assert chunks.chunk(len(chunks) - 1).endswith("applies")
+    top = chunks.top_chunks("What is the termination fee?", k=2)
+    assert "termination fee" in top[0]
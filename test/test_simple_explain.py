@@ -1,5 +1,12 @@
+import json
 import pytest
+import time
+from threading import Event
 from fastapi.testclient import TestClient
+from app import main
+from app.answer_cache import AnswerCache, answer_key
+from app.inference import InferenceExecutor
+from app.llm_generator import model_version
 from app.main import app
 
 client = TestClient(app)
@@ -41,3 +48,92 @@ def test_health_endpoint():
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "ok"
+
+def test_explain_async_job():
+    """Test the async explain mode returns an id that can be polled."""
+    response = client.post("/explain?async=1", json={
+        "question": "What is this contract about?",
+        "job_id": "non-existent-job-id"
+    })
+    assert response.status_code == 200
+    explain_id = response.json()["explain_id"]
+
+    for _ in range(100):
+        body = client.get(f"/explain/{explain_id}").json()
+        if body["status"] == "done":
+            break
+        time.sleep(0.02)
+    assert body["status"] == "done"
+    assert "No contract analysis found" in body["response"]["answer"]
+
+def test_explain_unknown_async_job():
+    """Test polling an unknown explain id."""
+    response = client.get("/explain/does-not-exist")
+    assert response.status_code == 404
+
+def test_explain_stream():
+    """Test that the event stream ends with the finished job and unknown ids get 404."""
+    explain_id = client.post("/explain?async=1", json={
+        "question": "What is this contract about?",
+        "job_id": "non-existent-job-id"
+    }).json()["explain_id"]
+    response = client.get(f"/explain/{explain_id}/stream")
+    assert response.status_code == 200
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1]["status"] == "done"
+    assert client.get("/explain/does-not-exist/stream").status_code == 404
+
+def test_explain_fast_mode():
+    """Test the retrieval-only answer tier."""
+    response = client.post("/explain?mode=fast", json={
+        "question": "What is this contract about?",
+        "job_id": "non-existent-job-id"
+    })
+    assert response.status_code == 200
+    assert "No contract analysis found" in response.json()["answer"]
+
+def test_explain_invalid_mode():
+    """Test that unknown answer modes are rejected."""
+    response = client.post("/explain?mode=slow", json={
+        "question": "What is this contract about?",
+        "job_id": "non-existent-job-id"
+    })
+    assert response.status_code == 400
+
+def test_explain_batch_unknown_job():
+    """Test that batch answers come back in order for an unknown job."""
+    response = client.post("/explain_batch/non-existent-job-id", json={
+        "questions": ["What is this contract about?", "Tell me about termination"]
+    })
+    assert response.status_code == 200
+    answers = response.json()["answers"]
+    assert len(answers) == 2
+    assert all("No contract analysis found" in a["answer"] for a in answers)
+
+def test_cached_and_model_free_answers_skip_busy_inference(tmp_path, monkeypatch):
+    """Test that cached and model-free answers return at once while a model call holds the executor."""
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    cache = AnswerCache(tmp_path / "answers")
+    monkeypatch.setattr(main, "get_answer_cache", lambda: cache)
+    executor = InferenceExecutor(workers=1)
+    monkeypatch.setattr(main, "get_inference_executor", lambda: executor)
+    main._write_result(main.Result(job_id="cached-job", status="done", doc_hash="h" * 64,
+                                   clauses=[{"type": "Payment", "page": 1, "score": 1.0}],
+                                   detection={"status": "regex"}))
+    question = "How much is owed each month?"
+    cache.put(answer_key("h" * 64, question, model_version()),
+              {"answer": "Cached answer", "clause_type": "General Question"})
+    release = Event()
+    executor.submit(release.wait, 10)
+    try:
+        started = time.monotonic()
+        response = client.post("/explain", json={"question": question, "job_id": "cached-job",
+                                                 "deadline_seconds": 2})
+        assert response.json()["answer"] == "Cached answer"
+        response = client.post("/explain", json={"question": "Tell me about termination", "job_id": "cached-job",
+                                                 "deadline_seconds": 2})
+        assert response.json()["clause_type"] == "Termination"
+        assert response.json()["tier"] == "retrieval"
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
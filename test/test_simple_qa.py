@@ -1,5 +1,5 @@
 import pytest
-from app.qa_system import parse_question, get_policy_explanation, retrieve_clause
+from app.qa_system import parse_question, get_policy_explanation, retrieve_clause, generate_rule_based_answer, summarize_clauses
 
 def test_parse_question_general():
     """Test parsing of general contract questions."""
@@ -54,3 +54,10 @@ def test_retrieve_clause():
     # Test finding non-existing clause
     clause = retrieve_clause("Termination", detected_clauses)
     assert clause is None
+
+def test_rule_based_answer_uses_stored_summary():
+    """Test the GENERAL_CONTRACT fast answer reuses the summary computed at analysis time."""
+    clauses = [{'type': 'Termination', 'text': 'Either party may terminate.', 'page': 1}]
+    assert "Termination" in summarize_clauses(clauses)
+    assert generate_rule_based_answer('GENERAL_CONTRACT', clauses, "What is this contract about?",
+                                      summary="stored summary") == "stored summary"
@@ -0,0 +1,123 @@
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main, storage
+from app.janitor import Janitor
+from app.main import app
+from app.synthetic import generate_contract
+
+JOB_ID = "3fa2c9d0-0000-4000-8000-000000000000"
+
+
+def test_sharded_paths_and_fallback(tmp_path, monkeypatch):
+    """Test that sharded paths nest by job id and files still in the other layout are found."""
+    monkeypatch.setattr(storage, "DATA_LAYOUT", "sharded")
+    path = storage.job_file("results", JOB_ID, f"{JOB_ID}.json", tmp_path)
+    assert path == tmp_path / "results" / "3f" / "a2" / f"{JOB_ID}.json"
+
+    flat = tmp_path / "results" / f"{JOB_ID}.text"
+    flat.parent.mkdir(parents=True)
+    flat.write_bytes(b"text")
+    assert storage.job_file("results", JOB_ID, f"{JOB_ID}.text", tmp_path) == flat
+
+    monkeypatch.setattr(storage, "DATA_LAYOUT", "flat")
+    assert storage.job_file("results", JOB_ID, f"{JOB_ID}.json", tmp_path) == tmp_path / "results" / f"{JOB_ID}.json"
+
+
+def test_migrate_both_ways(tmp_path):
+    """Test that migration moves every job file, keeps the newer of two copies, and can be undone."""
+    names = {"uploads": [f"{JOB_ID}.pdf", f"{JOB_ID}_highlighted.pdf"],
+             "results": [f"{JOB_ID}.json", f"{JOB_ID}.text", f"{JOB_ID}.json.tmp"],
+             "pins": [JOB_ID]}
+    for kind, files in names.items():
+        for name in files:
+            path = tmp_path / kind / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"flat {name}")
+    # A write in the new layout that raced the migration, newer than the flat copy
+    newer = tmp_path / "results" / "3f" / "a2" / f"{JOB_ID}.json"
+    newer.parent.mkdir(parents=True)
+    newer.write_text("sharded")
+    stamp = time.time()
+    os.utime(tmp_path / "results" / f"{JOB_ID}.json", (stamp - 10, stamp - 10))
+
+    assert storage.migrate("sharded", tmp_path, dry_run=True)["moved"] == 4
+    assert (tmp_path / "uploads" / f"{JOB_ID}.pdf").exists()
+
+    counts = storage.migrate("sharded", tmp_path)
+    assert counts == {"moved": 4, "removed_stale": 1, "kept": 1}
+    assert newer.read_text() == "sharded"
+    assert (tmp_path / "pins" / "3f" / "a2" / JOB_ID).exists()
+    # Files still being written are left to their writer
+    assert (tmp_path / "results" / f"{JOB_ID}.json.tmp").exists()
+    assert sorted(p.name for p in (tmp_path / "results").iterdir()) == ["3f", f"{JOB_ID}.json.tmp"]
+
+    assert storage.migrate("flat", tmp_path) == {"moved": 5, "removed_stale": 0, "kept": 0}
+    assert (tmp_path / "results" / f"{JOB_ID}.json").read_text() == "sharded"
+    assert not (tmp_path / "results" / "3f").exists()
+
+
+def test_write_during_migration(tmp_path, monkeypatch):
+    """Test that a write landing in the old layout after its file moved is served, then migrated."""
+    monkeypatch.setattr(storage, "DATA_LAYOUT", "sharded")
+    name = f"{JOB_ID}.json"
+    flat = tmp_path / "results" / name
+    flat.parent.mkdir(parents=True)
+    flat.write_text("before")
+    stamp = time.time() - 10
+    os.utime(flat, (stamp, stamp))
+
+    # The writer resolves the path, migrate moves the file, then the write lands
+    path = storage.job_file("results", JOB_ID, name, tmp_path)
+    assert path == flat
+    assert storage.migrate("sharded", tmp_path)["moved"] == 1
+    path.write_text("after")
+
+    assert storage.job_file("results", JOB_ID, name, tmp_path).read_text() == "after"
+    assert storage.migrate("sharded", tmp_path) == {"moved": 1, "removed_stale": 0, "kept": 1}
+    sharded = tmp_path / "results" / "3f" / "a2" / name
+    assert storage.job_file("results", JOB_ID, name, tmp_path) == sharded
+    assert sharded.read_text() == "after" and not flat.exists()
+
+
+def test_janitor_sweeps_sharded_layout(tmp_path, monkeypatch):
+    """Test that the janitor sees and deletes job files in both layouts at once."""
+    monkeypatch.setattr(storage, "DATA_LAYOUT", "sharded")
+    old = [tmp_path / "uploads" / "3f" / "a2" / f"{JOB_ID}.pdf", tmp_path / "results" / f"{JOB_ID}.json"]
+    for path in old:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1, 1))
+    janitor = Janitor(tmp_path, ttl=3600, max_bytes=0)
+    janitor.pin(JOB_ID)
+    assert (tmp_path / "pins" / "3f" / "a2" / JOB_ID).exists()
+    assert janitor.sweep() == []
+    janitor.unpin(JOB_ID)
+    assert janitor.sweep() == [JOB_ID]
+    assert not any(path.exists() for path in old)
+
+
+def test_job_in_sharded_layout(tmp_path, monkeypatch):
+    """Test that a job analyzed with DATA_LAYOUT=sharded is stored sharded and served from there."""
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(storage, "DATA_LAYOUT", "sharded")
+    monkeypatch.setattr(main, "CLAUSE_CONFIRM_BUDGET_SECONDS", 0)
+    pdf_path = generate_contract(tmp_path / "contract.pdf", 2)
+    with TestClient(app) as client:
+        files = {"pdf": ("contract.pdf", pdf_path.read_bytes(), "application/pdf")}
+        job_id = client.post("/analyze", files=files).json()["job_id"]
+        for _ in range(400):
+            body = client.get(f"/result/{job_id}").json()
+            if body["status"] not in ("queued", "processing"):
+                break
+            time.sleep(0.05)
+        assert body["status"] == "done" and body["clauses"]
+        assert client.get(f"/pdf/{job_id}").status_code == 200
+
+    shard = (job_id[:2], job_id[2:4])
+    assert (tmp_path / "data" / "uploads" / shard[0] / shard[1] / f"{job_id}.pdf").exists()
+    assert (tmp_path / "data" / "uploads" / shard[0] / shard[1] / f"{job_id}_highlighted.pdf").exists()
+    assert (tmp_path / "data" / "results" / shard[0] / shard[1] / f"{job_id}.json").exists()
+    assert not (tmp_path / "data" / "results" / f"{job_id}.json").exists()
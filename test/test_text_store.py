@@ -0,0 +1,39 @@
+import pytest
+from app.text_store import TextStore, write_text_store
+from app.parser import redetect_clauses
+
+PAGES = [
+    "This Agreement is made between Company A and Company B.",
+    "Termination of this Agreement requires written notice.",
+    "The governing law of this Agreement is California law.",
+]
+
+def test_text_store_round_trip(tmp_path):
+    """Test that pages and the joined text come back from the store."""
+    path = tmp_path / "job.text"
+    write_text_store(path, PAGES)
+    store = TextStore(path)
+    assert len(store) == 3
+    assert store.page(2) == PAGES[1]
+    assert store.full_text() == "\n".join(PAGES)
+    store.close()
+
+def test_page_for_offset(tmp_path):
+    """Test mapping character offsets of the full text back to pages."""
+    path = tmp_path / "job.text"
+    write_text_store(path, PAGES)
+    store = TextStore(path)
+    text = store.full_text()
+    assert store.page_for_offset(0) == 1
+    assert store.page_for_offset(text.index("Termination")) == 2
+    assert store.page_for_offset(text.index("California")) == 3
+    store.close()
+
+def test_redetect_from_store(tmp_path):
+    """Test that clause detection runs on stored text without a PDF."""
+    path = tmp_path / "job.text"
+    write_text_store(path, PAGES)
+    clauses = redetect_clauses(TextStore(path))
+    by_type = {clause["type"]: clause["page"] for clause in clauses}
+    assert by_type["Governing Law"] == 3
+    assert by_type["Termination"] == 2
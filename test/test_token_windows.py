@@ -0,0 +1,47 @@
+import re
+import pytest
+from app.llm_generator import LLMGenerator
+from app.token_windows import TokenWindows
+
+class WhitespaceTokenizer:
+    """Tiny stand-in for a fast tokenizer: one token per word, with offsets."""
+    def __len__(self):
+        return 1000
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False, verbose=True):
+        spans = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+        return {"input_ids": [i % 1000 for i in range(len(spans))], "offset_mapping": spans}
+
+TEXT = " ".join(f"w{i}" for i in range(50)) + " termination requires notice"
+
+def test_windows_overlap_and_cover_text():
+    """Test that stride windows overlap and map back to the original text."""
+    windows = TokenWindows.build(WhitespaceTokenizer(), TEXT, size=20, overlap=5)
+    assert windows.ids.dtype.name == "uint16"
+    assert windows.window_text(TEXT, 0).startswith("w0 ")
+    assert windows.window_text(TEXT, len(windows) - 1).endswith("notice")
+    assert windows.windows[1][0] == 15
+
+def test_windows_round_trip(tmp_path):
+    """Test that stored windows load back unchanged."""
+    windows = TokenWindows.build(WhitespaceTokenizer(), TEXT, size=20, overlap=5)
+    path = tmp_path / "job.tokens.npz"
+    windows.save(path)
+    loaded = TokenWindows.load(path)
+    assert loaded.text_hash == windows.text_hash
+    assert loaded.window_ids(2) == windows.window_ids(2)
+    assert loaded.top_windows(TEXT, "termination notice", 1) == [len(windows) - 1]
+
+def test_failed_tokenizer_load_is_remembered(tmp_path, monkeypatch):
+    """Test that a failed tokenizer load is not retried per job and the hub is never tried for pre-tokenizing."""
+    monkeypatch.setenv("QA_MODEL_DIR", str(tmp_path / "missing"))
+    generator = LLMGenerator()
+    assert generator.tokenizer_available()
+    assert not generator.load_tokenizer()
+    calls = []
+    monkeypatch.setattr("transformers.AutoTokenizer.from_pretrained", lambda *args, **kwargs: calls.append(args))
+    assert not generator.load_tokenizer()
+    assert calls == []
+
+    monkeypatch.delenv("QA_MODEL_DIR")
+    assert not LLMGenerator().tokenizer_available()
@@ -46,8 +46,16 @@ if uploaded is not None:
         body = r.json()
         last_status = body.get("status")
         placeholder.info(f"Current status: {last_status}")
+        if last_status == "cancelled":
+            placeholder.warning("Analysis was cancelled.")
+            break
+        if last_status == "error":
+            placeholder.error("Analysis failed. Try uploading the PDF again.")
+            break
 
-        if last_status == "done":
+        if last_status in ("done", "partial"):
+            if last_status == "partial":
+                placeholder.warning(f"Analysis stopped early ({body.get('stop_reason')}); showing the clauses found so far.")
     
             clauses = body.get("clauses", [])
             